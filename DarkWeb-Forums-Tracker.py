@@ -6,9 +6,34 @@ import time
 import os
 import argparse
 import random
+import heapq
+import bisect
+import threading
+import hashlib
+import zlib
+import io
+import re
+import json
+import email.utils
+import calendar
+import glob
+import gzip
+import functools
+import inspect
+import contextlib
+import cProfile
+import pstats
+import tracemalloc
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from array import array
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from queue import Queue, Empty
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import dingtalkchatbot.chatbot as cb
 from jinja2 import Template
+from lxml import etree
 
 # 版本信息
 __version__ = "V1.0.9b"
@@ -196,6 +221,81 @@ def load_config():
         'no_proxy': os.environ.get('NO_PROXY', proxy_config.get('no_proxy', ''))
     }
     
+    # 加载HTML输出配置
+    config['html_output'] = {
+        'minify': os.environ.get('HTML_MINIFY', config.get('html_output', {}).get('minify', 'OFF'))
+    }
+    
+    # 加载近似重复检测配置
+    dedup_config = config.get('dedup', {})
+    config['dedup'] = {
+        'switch': os.environ.get('DEDUP_SWITCH', dedup_config.get('switch', 'ON')),
+        'window_days': int(dedup_config.get('window_days', 21)),
+        'max_distance': min(int(dedup_config.get('max_distance', 7)), SIMHASH_BANDS - 1)
+    }
+    
+    # 加载报告和feed条目排序配置
+    config['item_order'] = {
+        'order_by': os.environ.get('ITEM_ORDER_BY', config.get('item_order', {}).get('order_by', 'timestamp'))
+    }
+    
+    # 加载并发抓取和批量写入配置
+    fetch_config = config.get('fetch', {})
+    config['fetch'] = {
+        'workers': int(os.environ.get('FETCH_WORKERS', fetch_config.get('workers', 4))),
+        'batch_size': int(fetch_config.get('batch_size', 500)),
+        'flush_interval': float(fetch_config.get('flush_interval', 0.2))
+    }
+    
+    # 加载推送队列配置
+    queue_config = config.get('push_queue', {})
+    config['push_queue'] = {
+        'max_per_cycle': int(os.environ.get('PUSH_MAX_PER_CYCLE', queue_config.get('max_per_cycle', 30))),
+        'min_score': int(os.environ.get('PUSH_MIN_SCORE', queue_config.get('min_score', 0))),
+        'site_weights': queue_config.get('site_weights') or {}
+    }
+    
+    # 加载关注列表告警配置
+    watchlist_config = config.get('watchlist', {})
+    config['watchlist'] = {
+        'switch': os.environ.get('WATCHLIST_SWITCH', watchlist_config.get('switch', 'OFF')),
+        'file': os.environ.get('WATCHLIST_FILE', watchlist_config.get('file', 'watchlist.txt'))
+    }
+    
+    # 加载冷数据归档配置
+    archive_config = config.get('archive', {})
+    config['archive'] = {
+        'switch': os.environ.get('ARCHIVE_SWITCH', archive_config.get('switch', 'OFF')),
+        'hot_months': max(int(archive_config.get('hot_months', 2)), 1)
+    }
+    
+    # 加载运行指标配置
+    config['metrics'] = {
+        'textfile': os.environ.get('METRICS_TEXTFILE', config.get('metrics', {}).get('textfile', ''))
+    }
+    
+    # 加载本地查询API配置
+    api_config = config.get('api_server', {})
+    config['api_server'] = {
+        'switch': os.environ.get('API_SERVER_SWITCH', api_config.get('switch', 'OFF')),
+        'host': os.environ.get('API_SERVER_HOST', api_config.get('host', '127.0.0.1')),
+        'port': int(os.environ.get('API_SERVER_PORT', api_config.get('port', 8080))),
+        'cache_size': int(api_config.get('cache_size', 256))
+    }
+    
+    # 加载静态站点搜索索引配置
+    config['search_index'] = {
+        'switch': os.environ.get('SEARCH_INDEX_SWITCH', config.get('search_index', {}).get('switch', 'ON'))
+    }
+    
+    # 加载RSS feed输出配置
+    feed_config = config.get('rss_feed', {})
+    config['rss_feed'] = {
+        'formats': feed_config.get('formats', FEED_FORMATS),
+        'per_site': os.environ.get('RSS_FEED_PER_SITE', feed_config.get('per_site', 'ON')),
+        'per_category': os.environ.get('RSS_FEED_PER_CATEGORY', feed_config.get('per_category', 'OFF'))
+    }
+    
     config['push'] = push_config
     return config
 
@@ -208,173 +308,2167 @@ def should_sleep():
     if sleep_switch != 'ON':
         return False
     
-    # 判断当前时间（北京时间）是否在0-7点之间
-    # 获取当前UTC时间，转换为北京时间（UTC+8）
-    now_utc = datetime.utcnow()
-    # 转换为北京时间
-    now_bj = now_utc.hour + 8
-    # 处理跨天情况
-    if now_bj >= 24:
-        now_bj -= 24
+    # 判断当前时间（北京时间）是否在0-7点之间
+    # 获取当前UTC时间，转换为北京时间（UTC+8）
+    now_utc = datetime.utcnow()
+    # 转换为北京时间
+    now_bj = now_utc.hour + 8
+    # 处理跨天情况
+    if now_bj >= 24:
+        now_bj -= 24
+    
+    return now_bj < 7
+
+# 运行指标（Prometheus文本格式），通过查询API的/metrics或metrics.textfile导出
+
+# 直方图默认分桶（秒）
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 指标定义：名称 -> (类型, 说明)
+METRIC_DEFINITIONS = {
+    'tracker_fetch_duration_seconds': ('histogram', '抓取数据源feed的耗时（包括重试）'),
+    'tracker_fetch_bytes_total': ('counter', '抓取到的feed字节数'),
+    'tracker_fetch_responses_total': ('counter', '抓取feed的HTTP响应数（按状态码，连接失败为error）'),
+    'tracker_fetch_retries_total': ('counter', '抓取feed的重试次数'),
+    'tracker_http_429_total': ('counter', '收到HTTP 429限流响应的次数（数据源和推送渠道）'),
+    'tracker_entries_parsed_total': ('counter', 'feed中解析出的条目数'),
+    'tracker_new_items_total': ('counter', '新入库的条目数'),
+    'tracker_extract_duration_seconds': ('histogram', '每个数据源清理正文和提取字段的耗时'),
+    'tracker_db_write_duration_seconds': ('histogram', '写入线程每个批次的事务耗时'),
+    'tracker_db_write_batch_items': ('histogram', '写入线程每个批次的条数'),
+    'tracker_push_duration_seconds': ('histogram', '各推送渠道单条消息的发送耗时（包括重试）'),
+    'tracker_push_retries_total': ('counter', '各推送渠道的重试次数'),
+    'tracker_queue_depth': ('gauge', '队列中等待处理的数量'),
+    'tracker_report_duration_seconds': ('histogram', '报告、feed和搜索索引的生成耗时'),
+    'tracker_cycle_duration_seconds': ('histogram', '每轮检查全部数据源的耗时'),
+    'tracker_last_cycle_timestamp_seconds': ('gauge', '最近一轮检查完成的时间（Unix时间戳）'),
+}
+
+# 批次条数使用的分桶
+METRIC_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+class MetricsRegistry:
+    """
+    线程安全的指标注册表：计数器、仪表盘和直方图按标签组合分别记录，render()输出Prometheus文本格式
+    """
+    def __init__(self, definitions):
+        self._definitions = definitions
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+    
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+    
+    def observe(self, name, value, **labels):
+        buckets = METRIC_SIZE_BUCKETS if name == 'tracker_db_write_batch_items' else METRIC_BUCKETS
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                # 各分桶计数、总和、总数
+                histogram = self._values[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+    
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        labels = list(labels) + ([extra] if extra else [])
+        if not labels:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+    
+    def render(self):
+        with self._lock:
+            values = {key: (value[0][:], value[1], value[2]) if isinstance(value, list) else value for key, value in self._values.items()}
+        lines = []
+        for name, (metric_type, help_text) in self._definitions.items():
+            series = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in series:
+                if metric_type != 'histogram':
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+                    continue
+                bucket_counts, total, count = value
+                buckets = METRIC_SIZE_BUCKETS if name == 'tracker_db_write_batch_items' else METRIC_BUCKETS
+                for bound, bucket_count in zip(buckets, bucket_counts):
+                    lines.append(f"{name}_bucket{self._format_labels(labels, ('le', bound))} {bucket_count}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+METRICS = MetricsRegistry(METRIC_DEFINITIONS)
+
+# 分阶段性能分析（--profile）：各阶段用单调时钟计时，每轮输出汇总表和JSON trace
+PROFILE_DIR = 'profile'
+
+class StageProfiler:
+    """
+    未开启时stage()返回空上下文，几乎没有开销；开启后记录每个阶段的起止时间和所在线程，
+    可选用cProfile分析各抓取线程的函数调用、用tracemalloc记录内存分配
+    """
+    _null_stage = contextlib.nullcontext()
+    
+    def __init__(self):
+        self.enabled = False
+        self.use_cprofile = False
+        self.use_tracemalloc = False
+        self.output_dir = PROFILE_DIR
+        self._lock = threading.Lock()
+        self._spans = []
+        self._profiles = []
+        self._main_profile = None
+        self._cycle_start = None
+    
+    def configure(self, enabled=True, use_cprofile=False, use_tracemalloc=False, output_dir=PROFILE_DIR):
+        self.enabled = enabled
+        self.use_cprofile = enabled and use_cprofile
+        self.use_tracemalloc = enabled and use_tracemalloc
+        self.output_dir = output_dir
+    
+    def stage(self, name, **args):
+        if not self.enabled:
+            return self._null_stage
+        return self._span(name, args)
+    
+    @contextlib.contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+    
+    def record(self, name, start, duration, **args):
+        if self.enabled:
+            with self._lock:
+                self._spans.append((name, threading.current_thread().name, start, duration, args))
+    
+    def wrap(self, func):
+        """
+        开启cProfile时，返回在调用线程内单独做函数级分析的包装函数（cProfile只能分析启用它的线程）
+        """
+        if not self.use_cprofile:
+            return func
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+        return wrapper
+    
+    def start_cycle(self):
+        if not self.enabled:
+            return
+        self._spans, self._profiles = [], []
+        self._cycle_start = time.perf_counter()
+        if self.use_tracemalloc:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        if self.use_cprofile:
+            self._main_profile = cProfile.Profile()
+            self._main_profile.enable()
+    
+    def end_cycle(self, label='cycle'):
+        """
+        输出本轮各阶段的次数、总耗时、平均和最大耗时，写入profile/<label>_<时间>.json（Chrome trace格式，
+        可在chrome://tracing或Perfetto中查看时间线）；开启cProfile时同时写入.prof文件并输出耗时最多的函数
+        """
+        if not self.enabled or self._cycle_start is None:
+            return
+        wall_time = time.perf_counter() - self._cycle_start
+        with self._lock:
+            spans, profiles = self._spans, self._profiles
+            self._spans, self._profiles = [], []
+        
+        summary = {}
+        for name, _, _, duration, _ in spans:
+            stat = summary.setdefault(name, {'stage': name, 'count': 0, 'total': 0.0, 'max': 0.0})
+            stat['count'] += 1
+            stat['total'] += duration
+            stat['max'] = max(stat['max'], duration)
+        rows = sorted(summary.values(), key=lambda stat: stat['total'], reverse=True)
+        print(f"\n阶段耗时汇总（{label}，墙钟时间 {wall_time:.2f} 秒，并发阶段的占比合计可能超过100%）：")
+        print(f"{'阶段':<28}{'次数':>8}{'总耗时(s)':>12}{'平均(ms)':>12}{'最大(ms)':>12}{'占比':>9}")
+        for stat in rows:
+            print(f"{stat['stage']:<30}{stat['count']:>8}{stat['total']:>12.3f}{stat['total'] / stat['count'] * 1000:>12.1f}"
+                  f"{stat['max'] * 1000:>12.1f}{stat['total'] / wall_time * 100 if wall_time else 0:>9.1f}%")
+        
+        memory = None
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+            tracemalloc.stop()
+            memory = {'current_bytes': current, 'peak_bytes': peak,
+                      'top': [{'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count} for stat in top]}
+            print(f"内存：当前 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB")
+            for stat in top[:5]:
+                print(f"  {stat.traceback[0]}: {stat.size / 1024:.1f} KB（{stat.count} 个对象）")
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        file_prefix = os.path.join(self.output_dir, f"{label}_{time.strftime('%Y%m%d_%H%M%S')}")
+        if self._main_profile is not None:
+            self._main_profile.disable()
+            profiles.append(self._main_profile)
+            self._main_profile = None
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f'{file_prefix}.prof')
+            print(f"cProfile结果已保存：{file_prefix}.prof，累计耗时最多的函数：")
+            stats.sort_stats('cumulative').print_stats(15)
+        
+        thread_ids = {}
+        trace = {
+            'traceEvents': [
+                {'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': os.getpid(),
+                 'tid': thread_ids.setdefault(thread_name, len(thread_ids) + 1),
+                 'ts': round((start - self._cycle_start) * 1e6), 'dur': round(duration * 1e6), 'args': args}
+                for name, thread_name, start, duration, args in spans
+            ] + [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': thread_name}}
+                for thread_name, tid in thread_ids.items()
+            ],
+            'otherData': {'label': label, 'wall_time': wall_time, 'summary': rows, 'memory': memory}
+        }
+        with open(f'{file_prefix}.json', 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False, default=str)
+        print(f"性能trace已保存：{file_prefix}.json")
+        self._cycle_start = None
+
+PROFILER = StageProfiler()
+
+# 同时记录运行指标（直方图）和性能分析阶段
+@contextlib.contextmanager
+def observe_stage(stage, metric, **labels):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start_time
+        METRICS.observe(metric, duration, **labels)
+        PROFILER.record(stage, start_time, duration, **labels)
+
+# 装饰器：记录函数耗时（运行指标和性能分析阶段），标签值中的 {参数名} 替换为调用时的参数值
+def timed(metric, stage, **labels):
+    def decorator(func):
+        signature = inspect.signature(func)
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start_time
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                label_values = {name: value.format(**bound.arguments) for name, value in labels.items()}
+                METRICS.observe(metric, duration, **label_values)
+                PROFILER.record(stage.format(**label_values), start_time, duration)
+        return wrapper
+    return decorator
+
+# 将指标写入node_exporter textfile收集器目录（先写临时文件再替换，避免读到不完整的内容）
+def write_metrics_textfile(path=None):
+    path = path or load_config().get('metrics', {}).get('textfile')
+    if not path:
+        return
+    try:
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(METRICS.render())
+        os.replace(f'{path}.tmp', path)
+    except OSError as e:
+        print(f"写入指标文件失败：{str(e)}")
+
+# 初始化数据库
+
+# 数据库文件
+DATABASE_FILE = 'data_leaks.db'
+
+# 连接级别的性能参数：WAL模式下synchronous=NORMAL只在检查点时同步磁盘，64MB页缓存，256MB内存映射
+def configure_connection(conn):
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -65536")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+# 打开数据库连接
+def open_database(read_only=False):
+    """
+    WAL模式下读写互不阻塞：采集使用init_database()返回的唯一写连接，
+    报告生成使用独立连接，检索和外部查询使用只读连接
+    
+    Args:
+        read_only: 是否以只读方式打开
+    """
+    if read_only:
+        conn = sqlite3.connect(f'file:{DATABASE_FILE}?mode=ro', uri=True, timeout=30)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(DATABASE_FILE, timeout=30)
+    return configure_connection(conn)
+
+# 关闭数据库连接
+def close_database(conn, checkpoint=False):
+    """
+    Args:
+        checkpoint: 是否先把WAL日志合并回数据库文件并清空，
+                    程序退出前需要执行，保证提交到git的data_leaks.db包含全部数据
+    """
+    if checkpoint:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+def init_database():
+    conn = sqlite3.connect(DATABASE_FILE, timeout=30)
+    # WAL日志模式会持久化到数据库文件中
+    conn.execute("PRAGMA journal_mode = WAL")
+    configure_connection(conn)
+    cursor = conn.cursor()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        link TEXT,
+        pub_date TEXT,
+        author TEXT,
+        category TEXT,
+        content TEXT,
+        download_links TEXT,
+        site_name TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_timestamp ON items(timestamp)")
+    # 按天（北京时间）和站点预聚合的条目数，报告统计直接读取该表，由触发器维护
+    cursor.execute('''CREATE TABLE IF NOT EXISTS item_rollup (
+        day TEXT NOT NULL,
+        site_name TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, site_name)
+    ) WITHOUT ROWID''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_rollup_insert AFTER INSERT ON items BEGIN
+        INSERT INTO item_rollup (day, site_name, count)
+        VALUES (date(NEW.timestamp, '+8 hours'), COALESCE(NEW.site_name, ''), 1)
+        ON CONFLICT(day, site_name) DO UPDATE SET count = count + 1;
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_rollup_delete AFTER DELETE ON items BEGIN
+        UPDATE item_rollup SET count = count - 1
+        WHERE day = date(OLD.timestamp, '+8 hours') AND site_name = COALESCE(OLD.site_name, '');
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_rollup_update AFTER UPDATE OF timestamp, site_name ON items BEGIN
+        UPDATE item_rollup SET count = count - 1
+        WHERE day = date(OLD.timestamp, '+8 hours') AND site_name = COALESCE(OLD.site_name, '');
+        INSERT INTO item_rollup (day, site_name, count)
+        VALUES (date(NEW.timestamp, '+8 hours'), COALESCE(NEW.site_name, ''), 1)
+        ON CONFLICT(day, site_name) DO UPDATE SET count = count + 1;
+    END''')
+    # 删除计数（去重清理、归档到分段文件都会删除热库数据），与自增ID一起作为查询API的数据版本
+    cursor.execute('''CREATE TABLE IF NOT EXISTS item_changes (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        deleted INTEGER NOT NULL DEFAULT 0
+    )''')
+    cursor.execute("INSERT OR IGNORE INTO item_changes (id, deleted) VALUES (1, 0)")
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_changes_delete AFTER DELETE ON items BEGIN
+        UPDATE item_changes SET deleted = deleted + 1 WHERE id = 1;
+    END''')
+    # 已有数据库首次升级时回填预聚合表
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM item_rollup)")
+    if not cursor.fetchone()[0]:
+        rebuild_item_rollup(cursor)
+    # 报告渲染状态表：记录每个周期（日报/RSS）最后一次渲染时的最大条目ID和条目数
+    cursor.execute('''CREATE TABLE IF NOT EXISTS report_state (
+        period TEXT PRIMARY KEY,
+        last_item_id INTEGER,
+        item_count INTEGER,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    # 全文检索表：rowid与items.id一致，body保存清理掉HTML后的正文和下载链接
+    cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        title, body, tokenize = 'unicode61 remove_diacritics 2'
+    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = OLD.id;
+    END''')
+    # 检索文本需要先按中日韩二元组切分，由index_item_text写入，不再用触发器同步标题
+    cursor.execute("DROP TRIGGER IF EXISTS items_fts_update")
+    # 关注列表命中记录
+    cursor.execute('''CREATE TABLE IF NOT EXISTS watchlist_hits (
+        item_id INTEGER NOT NULL,
+        keyword TEXT NOT NULL,
+        field TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (item_id, keyword)
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_hits_keyword ON watchlist_hits(keyword)")
+    # 近似重复检测：SimHash指纹和转发聚类
+    ensure_column(cursor, 'items', 'simhash', 'INTEGER')
+    ensure_column(cursor, 'items', 'cluster_id', 'INTEGER')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_cluster ON items(cluster_id)")
+    # 将64位指纹拆成8段8位，海明距离不超过7的两个指纹至少有一段完全相同，按段精确查找候选
+    cursor.execute('''CREATE TABLE IF NOT EXISTS simhash_bands (
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        simhash INTEGER NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        PRIMARY KEY (band, value, item_id)
+    ) WITHOUT ROWID''')
+    # 按段查找时只读取时间窗口内的候选，索引同时包含指纹，不需要回表
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_simhash_bands_lookup ON simhash_bands(band, value, timestamp, simhash)")
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_simhash_delete AFTER DELETE ON items BEGIN
+        DELETE FROM simhash_bands WHERE item_id = OLD.id;
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_watchlist_delete AFTER DELETE ON items BEGIN
+        DELETE FROM watchlist_hits WHERE item_id = OLD.id;
+    END''')
+    # 发布时间（UTC时间戳），由pub_date解析得到
+    ensure_column(cursor, 'items', 'pub_ts', 'INTEGER')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_pub_ts ON items(pub_ts)")
+    # 规范化链接作为去重键
+    ensure_column(cursor, 'items', 'link_key', 'TEXT')
+    # MyBB永久链接 /Thread-标题 的去重键规则有变化，重新计算这部分数据的去重键
+    if not get_report_state(cursor, 'migration:link_key_mybb_thread'):
+        cursor.execute("UPDATE items SET link_key = NULL WHERE link GLOB '*/Thread-*'")
+        save_report_state(cursor, 'migration:link_key_mybb_thread', 0, cursor.rowcount)
+    backfill_link_keys(cursor)
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_link_key ON items(link_key)")
+    # 正文和下载链接压缩后单独存放，items表只保留报告和feed需要的字段
+    cursor.execute('''CREATE TABLE IF NOT EXISTS item_content (
+        item_id INTEGER PRIMARY KEY,
+        content BLOB,
+        download_links BLOB
+    )''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS items_content_delete AFTER DELETE ON items BEGIN
+        DELETE FROM item_content WHERE item_id = OLD.id;
+    END''')
+    migrate_item_content(cursor)
+    # 已归档到分段文件的链接去重键，归档后同一帖子不会重新入库
+    cursor.execute('''CREATE TABLE IF NOT EXISTS archived_links (
+        link_key TEXT PRIMARY KEY,
+        month TEXT NOT NULL
+    ) WITHOUT ROWID''')
+    conn.commit()
+    migrate_search_tokens(cursor)
+    backfill_search_index(cursor)
+    backfill_pub_ts(cursor)
+    return conn
+
+# 解析发布时间
+def parse_pub_ts(pub_date, parsed=None):
+    """
+    Args:
+        pub_date: feed中的发布时间字符串（RFC 822、ISO 8601等）
+        parsed: feedparser解析出的published_parsed（UTC struct_time），优先使用
+        
+    Returns:
+        int: UTC时间戳，无法解析时返回None
+    """
+    if parsed:
+        return calendar.timegm(parsed)
+    pub_date = (pub_date or '').strip()
+    if not pub_date:
+        return None
+    try:
+        return int(email.utils.parsedate_to_datetime(pub_date).timestamp())
+    except (TypeError, ValueError, IndexError):
+        pass
+    try:
+        pub_time = datetime.fromisoformat(pub_date.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    # 没有时区的时间按UTC处理
+    if pub_time.tzinfo is None:
+        return calendar.timegm(pub_time.timetuple())
+    return int(pub_time.timestamp())
+
+# 分批回填发布时间，回填进度记录在report_state中，无法解析的数据不会重复尝试
+def backfill_pub_ts(cursor, batch_size=5000):
+    state = get_report_state(cursor, 'backfill:pub_ts')
+    last_id = state[0] if state else 0
+    total = 0
+    while True:
+        cursor.execute("SELECT id, pub_date FROM items WHERE id > ? AND pub_ts IS NULL ORDER BY id LIMIT ?", (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("UPDATE items SET pub_ts = ? WHERE id = ?",
+                           [(pub_ts, item_id) for item_id, pub_ts in ((row[0], parse_pub_ts(row[1])) for row in rows) if pub_ts is not None])
+        last_id = rows[-1][0]
+        total += len(rows)
+        save_report_state(cursor, 'backfill:pub_ts', last_id, total)
+    if total:
+        print(f"发布时间回填完成，共检查 {total} 条")
+
+# 清理HTML标签和多余空白，得到纯文本
+def html_to_text(content):
+    text_content = re.sub(r'<[^>]+>', '', content or '')
+    return re.sub(r'\s+', ' ', text_content).strip()
+
+# 压缩、解压正文字段
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), 6) if text else None
+
+def decompress_text(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob else ''
+
+# 保存数据的正文和下载链接
+def save_item_content(cursor, item_id, content, download_links):
+    cursor.execute("INSERT OR REPLACE INTO item_content (item_id, content, download_links) VALUES (?, ?, ?)",
+                   (item_id, compress_text(content), compress_text(download_links)))
+
+# 读取数据的正文和下载链接
+def get_item_content(cursor, item_id):
+    """
+    Returns:
+        tuple: (content, download_links)，没有记录时返回空字符串
+    """
+    cursor.execute("SELECT content, download_links FROM item_content WHERE item_id = ?", (item_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return '', ''
+    return decompress_text(row[0]), decompress_text(row[1])
+
+# 将items表中的正文和下载链接迁移到压缩的item_content表，迁移进度记录在report_state中
+def migrate_item_content(cursor, batch_size=2000):
+    state = get_report_state(cursor, 'migration:item_content')
+    last_id = state[0] if state else 0
+    moved = 0
+    while True:
+        cursor.execute("""
+            SELECT id, content, download_links FROM items
+            WHERE id > ? AND (content IS NOT NULL OR download_links IS NOT NULL)
+            ORDER BY id LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany("INSERT OR REPLACE INTO item_content (item_id, content, download_links) VALUES (?, ?, ?)",
+                           [(item_id, compress_text(content), compress_text(download_links)) for item_id, content, download_links in rows])
+        cursor.executemany("UPDATE items SET content = NULL, download_links = NULL WHERE id = ?", [(row[0],) for row in rows])
+        last_id = rows[-1][0]
+        moved += len(rows)
+        save_report_state(cursor, 'migration:item_content', last_id, moved)
+    if moved:
+        # 回收迁移后items表释放的空间
+        cursor.execute("VACUUM")
+        print(f"正文迁移到item_content表完成，共 {moved} 条")
+
+# 冷数据分段：已结束的月份从热库导出到segments/下只写一次的月度SQLite文件，
+# 热库data_leaks.db只保留最近几个月，查询涉及已归档月份时按需附加分段文件
+SEGMENT_DIR = 'segments'
+# 分段文件与热库合并查询时使用的items列
+SEGMENT_ITEM_COLUMNS = "id, title, link, link_key, pub_date, pub_ts, author, category, site_name, timestamp, simhash, cluster_id"
+# SQLite默认最多附加10个数据库，超过时先分离本次查询不需要的分段
+MAX_ATTACHED_SEGMENTS = 8
+
+# 列出已有的分段文件
+def list_segments():
+    """
+    Returns:
+        dict: {YYYY-MM: [分段文件路径, ...]}，同一月份补充归档的数据保存为 items_YYYY-MM.N.db
+    """
+    segments = {}
+    for path in sorted(glob.glob(os.path.join(SEGMENT_DIR, 'items_*.db'))):
+        match = re.match(r'items_(\d{4}-\d{2})(?:\.\d+)?\.db$', os.path.basename(path))
+        if match:
+            segments.setdefault(match.group(1), []).append(path)
+    return segments
+
+# 分段文件附加到连接时使用的数据库名
+def segment_alias(path):
+    return 'seg_' + re.sub(r'\W', '_', os.path.basename(path)[:-3])
+
+# 日期范围（北京时间）涉及的月份
+def months_between(start_date, end_date):
+    months = []
+    month = datetime.strptime(start_date[:7], '%Y-%m')
+    while month.strftime('%Y-%m') <= end_date[:7]:
+        months.append(month.strftime('%Y-%m'))
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+# 将分段文件附加到当前连接
+def attach_segments(cursor, paths):
+    """
+    已附加的分段直接复用，附加数量超过上限时先分离本次不需要的分段
+    
+    Returns:
+        list: 分段文件对应的数据库名
+    """
+    cursor.execute("PRAGMA database_list")
+    attached = [row[1] for row in cursor.fetchall() if row[1].startswith('seg_')]
+    wanted = {segment_alias(path): path for path in paths}
+    missing = [alias for alias in wanted if alias not in attached]
+    if missing:
+        # ATTACH/DETACH不能在事务中执行
+        if cursor.connection.in_transaction:
+            cursor.connection.commit()
+        for alias in attached:
+            if len(attached) + len(missing) <= MAX_ATTACHED_SEGMENTS:
+                break
+            if alias not in wanted:
+                cursor.execute(f"DETACH DATABASE {alias}")
+                attached = [name for name in attached if name != alias]
+        for alias in missing:
+            cursor.execute(f"ATTACH DATABASE ? AS {alias}", (wanted[alias],))
+    return list(wanted)
+
+# 获取查询条目使用的表表达式
+def get_items_source(cursor, start_date=None, end_date=None, with_content=False):
+    """
+    日期范围（北京时间，YYYY-MM-DD）只涉及热库时返回items；
+    涉及已归档月份时附加对应的分段文件，返回与热库UNION ALL合并的子查询（别名仍为items），
+    外层的timestamp条件会下推到每个子查询，各自使用timestamp索引
+    
+    Args:
+        start_date: 开始日期，为空时包含全部分段
+        end_date: 结束日期（包含当天）
+        with_content: 是否附带压缩的content、download_links列（来自各自的item_content表）
+    """
+    segments = list_segments()
+    months = months_between(start_date, end_date) if start_date else sorted(segments)
+    paths = [path for month in months for path in segments.get(month, [])]
+    if not paths and not with_content:
+        return 'items'
+    schemas = ['main'] + (attach_segments(cursor, paths) if paths else [])
+    if with_content:
+        columns = ', '.join(f"i.{column}" for column in SEGMENT_ITEM_COLUMNS.split(', ')) + ", c.content, c.download_links"
+        parts = [f"SELECT {columns} FROM {schema}.items i LEFT JOIN {schema}.item_content c ON c.item_id = i.id" for schema in schemas]
+    else:
+        parts = [f"SELECT {SEGMENT_ITEM_COLUMNS} FROM {schema}.items" for schema in schemas]
+    return f"({' UNION ALL '.join(parts)}) AS items"
+
+# 将已结束月份的数据归档到分段文件
+def archive_closed_months(conn, hot_months=2):
+    """
+    热库保留最近hot_months个月（北京时间，按入库时间划分），更早的月份逐月导出到
+    segments/items_YYYY-MM.db（条目、压缩正文、全文检索和关注列表命中），
+    链接去重键记入archived_links，预聚合统计保持不变，最后从热库删除并VACUUM
+    
+    Returns:
+        int: 归档的条数
+    """
+    cursor = conn.cursor()
+    first_hot_month = datetime.strptime(beijing_today()[:7], '%Y-%m')
+    for _ in range(hot_months - 1):
+        first_hot_month = (first_hot_month - timedelta(days=1)).replace(day=1)
+    cutoff = beijing_day_start_utc(first_hot_month.strftime('%Y-%m-%d'))
+    cursor.execute("SELECT DISTINCT strftime('%Y-%m', timestamp, '+8 hours') FROM items WHERE timestamp < ? ORDER BY 1", (cutoff,))
+    months = [row[0] for row in cursor.fetchall()]
+    if not months:
+        return 0
+    
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    archived = 0
+    for month in months:
+        period_range = get_period_range("monthly", month)
+        where_clause, where_params = get_period_where(period_range['start_date'], period_range['end_date'])
+        # 分段文件只写一次，已有归档的月份再出现数据（例如--replay回放的历史数据）时另存为新的分段
+        existing = list_segments().get(month, [])
+        segment_file = os.path.join(SEGMENT_DIR, f'items_{month}.db' if not existing else f'items_{month}.{len(existing)}.db')
+        temp_file = f'{segment_file}.tmp'
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        
+        conn.commit()
+        cursor.execute("ATTACH DATABASE ? AS segment_new", (temp_file,))
+        try:
+            cursor.execute("PRAGMA segment_new.journal_mode = DELETE")
+            cursor.execute('''CREATE TABLE segment_new.items (
+                id INTEGER PRIMARY KEY,
+                title TEXT,
+                link TEXT,
+                link_key TEXT,
+                pub_date TEXT,
+                pub_ts INTEGER,
+                author TEXT,
+                category TEXT,
+                site_name TEXT,
+                timestamp TIMESTAMP,
+                simhash INTEGER,
+                cluster_id INTEGER
+            )''')
+            cursor.execute("CREATE TABLE segment_new.item_content (item_id INTEGER PRIMARY KEY, content BLOB, download_links BLOB)")
+            cursor.execute("CREATE TABLE segment_new.watchlist_hits (item_id INTEGER NOT NULL, keyword TEXT NOT NULL, field TEXT NOT NULL, created_at TIMESTAMP, PRIMARY KEY (item_id, keyword))")
+            cursor.execute("CREATE VIRTUAL TABLE segment_new.items_fts USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2')")
+            cursor.execute(f"INSERT INTO segment_new.items SELECT {SEGMENT_ITEM_COLUMNS} FROM main.items WHERE {where_clause} ORDER BY id", where_params)
+            count = cursor.rowcount
+            cursor.execute("INSERT INTO segment_new.item_content SELECT c.* FROM main.item_content c JOIN segment_new.items i ON i.id = c.item_id")
+            cursor.execute("INSERT INTO segment_new.watchlist_hits SELECT w.* FROM main.watchlist_hits w JOIN segment_new.items i ON i.id = w.item_id")
+            cursor.execute("INSERT INTO segment_new.items_fts (rowid, title, body) SELECT f.rowid, f.title, f.body FROM main.items_fts f JOIN segment_new.items i ON i.id = f.rowid")
+            cursor.execute("INSERT INTO segment_new.items_fts (items_fts) VALUES ('optimize')")
+            cursor.execute("CREATE INDEX segment_new.idx_items_timestamp ON items(timestamp)")
+            cursor.execute("CREATE INDEX segment_new.idx_items_link_key ON items(link_key)")
+            conn.commit()
+        finally:
+            cursor.execute("DETACH DATABASE segment_new")
+        os.replace(temp_file, segment_file)
+        
+        cursor.execute(f"INSERT OR IGNORE INTO archived_links (link_key, month) SELECT link_key, ? FROM items WHERE {where_clause} AND link_key IS NOT NULL",
+                       (month,) + tuple(where_params))
+        # 删除触发器会扣减预聚合统计，先加回对应的条数，归档前后统计不变
+        cursor.execute(f"""
+            INSERT INTO item_rollup (day, site_name, count)
+            SELECT date(timestamp, '+8 hours'), COALESCE(site_name, ''), COUNT(*) FROM items WHERE {where_clause} GROUP BY 1, 2
+            ON CONFLICT(day, site_name) DO UPDATE SET count = count + excluded.count
+        """, where_params)
+        cursor.execute(f"DELETE FROM items WHERE {where_clause}", where_params)
+        conn.commit()
+        archived += count
+        print(f"{month} 的 {count} 条数据已归档到 {segment_file}")
+    # 回收热库中归档数据占用的空间
+    cursor.execute("VACUUM")
+    return archived
+
+# 增量导出：每次运行新入库的数据追加为deltas/下的NDJSON.gz文件，文件写入后不再修改，
+# 文件名记录包含的条目ID范围，可以按顺序导入重建data_leaks.db
+DELTA_DIR = 'deltas'
+DELTA_FIELDS = SEGMENT_ITEM_COLUMNS.split(', ') + ['content', 'download_links']
+# 单个增量文件最多包含的条数，首次导出全部历史数据时按此拆分
+DELTA_MAX_ROWS = 50000
+
+# 列出已有的增量文件
+def list_delta_files():
+    """
+    Returns:
+        list: [(first_id, last_id, path), ...]，按ID顺序排列
+    """
+    deltas = []
+    for path in glob.glob(os.path.join(DELTA_DIR, '*', 'items_*.ndjson.gz')):
+        match = re.match(r'items_(\d+)-(\d+)\.ndjson\.gz$', os.path.basename(path))
+        if match:
+            deltas.append((int(match.group(1)), int(match.group(2)), path))
+    return sorted(deltas)
+
+# 导出上次导出之后新入库的数据
+def export_delta(cursor):
+    """
+    以已有增量文件中最大的条目ID为起点，导出热库和已归档分段中ID更大的数据，
+    正文解压为文本保存；gzip头不记录时间，相同数据生成的文件完全一致
+    
+    Returns:
+        list: 新生成的文件路径
+    """
+    last_exported = max((last_id for _, last_id, _ in list_delta_files()), default=0)
+    items_source = get_items_source(cursor, with_content=True)
+    delta_dir = os.path.join(DELTA_DIR, beijing_today()[:7])
+    files = []
+    while True:
+        cursor.execute(f"SELECT {', '.join(DELTA_FIELDS)} FROM {items_source} WHERE id > ? ORDER BY id LIMIT ?", (last_exported, DELTA_MAX_ROWS))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        os.makedirs(delta_dir, exist_ok=True)
+        delta_file = os.path.join(delta_dir, f'items_{rows[0][0]:010d}-{rows[-1][0]:010d}.ndjson.gz')
+        with gzip.GzipFile(f'{delta_file}.tmp', 'wb', mtime=0) as f:
+            for row in rows:
+                record = dict(zip(DELTA_FIELDS, row))
+                record['content'] = decompress_text(record['content'])
+                record['download_links'] = decompress_text(record['download_links'])
+                f.write((json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+        os.replace(f'{delta_file}.tmp', delta_file)
+        files.append(delta_file)
+        last_exported = rows[-1][0]
+        print(f"已导出 {len(rows)} 条数据到 {delta_file}")
+    if not files:
+        print("没有新入库的数据需要导出")
+    return files
+
+# 从增量文件导入数据
+def import_deltas(conn, paths=None):
+    """
+    按ID顺序导入增量文件，保留原条目ID；条目ID都不大于当前已分配的最大ID的文件直接跳过，
+    因此可以对已有数据库反复执行，只补齐缺少的部分。全文检索和近期数据的SimHash分段同时重建
+    
+    Args:
+        conn: 写连接
+        paths: 增量文件路径列表，默认deltas/下的全部文件
+        
+    Returns:
+        int: 新增的条数
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'items'")
+    last_id = cursor.fetchone()[0]
+    if paths:
+        deltas = []
+        for path in paths:
+            match = re.match(r'items_(\d+)-(\d+)\.ndjson\.gz$', os.path.basename(path))
+            deltas.append((int(match.group(1)), int(match.group(2)), path) if match else (0, float('inf'), path))
+        deltas.sort()
+    else:
+        deltas = list_delta_files()
+    dedup_config = load_config().get('dedup', {})
+    band_since = simhash_window_start(dedup_config.get('window_days', 21))
+    imported = 0
+    for _, delta_last_id, path in deltas:
+        if delta_last_id <= last_id:
+            continue
+        count = 0
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO items ({SEGMENT_ITEM_COLUMNS})
+                    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM archived_links WHERE link_key = ?)
+                """, [record.get(field) for field in DELTA_FIELDS[:-2]] + [record.get('link_key')])
+                if not cursor.rowcount:
+                    continue
+                item_id = record['id']
+                save_item_content(cursor, item_id, record.get('content'), record.get('download_links'))
+                index_item_text(cursor, item_id, record.get('title'), html_to_text(record.get('content')), record.get('download_links') or '')
+                simhash = record.get('simhash')
+                if simhash is not None and record.get('timestamp', '') >= band_since:
+                    cursor.executemany("INSERT OR IGNORE INTO simhash_bands (band, value, item_id, simhash, timestamp) VALUES (?, ?, ?, ?, ?)",
+                                       [(band, value, item_id, simhash, record['timestamp']) for band, value in enumerate(simhash_band_values(_to_unsigned64(simhash)))])
+                count += 1
+        conn.commit()
+        imported += count
+        print(f"已导入 {path}：新增 {count} 条")
+    print(f"增量导入完成，共新增 {imported} 条")
+    return imported
+
+# Parquet导出：按 month=YYYY-MM/site=站点 分区，供pandas、DuckDB等按列分析
+PARQUET_DIR = 'parquet'
+# 导出状态文件（以_开头，读取数据集时会被忽略）
+PARQUET_STATE_FILE = '_export_state.json'
+
+# 导出Parquet使用的固定表结构
+def get_parquet_schema(pa, with_content=False):
+    fields = [
+        ('id', pa.int64()),
+        ('title', pa.string()),
+        ('link', pa.string()),
+        ('link_key', pa.string()),
+        ('pub_date', pa.string()),
+        ('pub_ts', pa.int64()),
+        ('author', pa.string()),
+        ('category', pa.string()),
+        ('site_name', pa.string()),
+        ('timestamp', pa.timestamp('s', tz='UTC')),
+        ('simhash', pa.int64()),
+        ('cluster_id', pa.int64()),
+    ]
+    if with_content:
+        fields += [('content', pa.string()), ('download_links', pa.string())]
+    return pa.schema(fields)
+
+# 将条目导出为分区的Parquet文件
+def export_parquet(cursor, output_dir=PARQUET_DIR, with_content=False, chunk_size=100000):
+    """
+    按条目ID分块流式读取热库和已归档分段，每块按月份（北京时间）和站点分组写入
+    output_dir/month=YYYY-MM/site=站点/part-<起始ID>-<结束ID>.parquet；
+    导出的最大条目ID记录在状态文件中，再次执行时只导出新增的数据
+    
+    Args:
+        cursor: 数据库游标
+        output_dir: 输出目录
+        with_content: 是否包含正文HTML和下载链接
+        chunk_size: 每块读取的条数
+        
+    Returns:
+        int: 导出的条数
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("导出Parquet需要安装pyarrow：pip install pyarrow")
+        return 0
+    
+    state_file = os.path.join(output_dir, PARQUET_STATE_FILE)
+    state = {'last_id': 0, 'with_content': with_content}
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('with_content') != with_content:
+            print(f"{output_dir} 中已导出的数据{'不' if with_content else ''}包含正文，表结构不一致，请导出到新的目录")
+            return 0
+    
+    schema = get_parquet_schema(pa, with_content)
+    columns = [field.name for field in schema]
+    items_source = get_items_source(cursor, with_content=with_content)
+    exported = 0
+    start_time = time.time()
+    while True:
+        cursor.execute(f"""
+            SELECT {', '.join(columns)}, strftime('%Y-%m', timestamp, '+8 hours') FROM {items_source}
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (state['last_id'], chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        partitions = {}
+        for row in rows:
+            partitions.setdefault((row[-1], row[columns.index('site_name')] or 'unknown'), []).append(row)
+        for (month, site_name), partition_rows in partitions.items():
+            data = {column: [row[index] for row in partition_rows] for index, column in enumerate(columns)}
+            data['timestamp'] = [datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if value else None for value in data['timestamp']]
+            if with_content:
+                data['content'] = [decompress_text(value) for value in data['content']]
+                data['download_links'] = [decompress_text(value) for value in data['download_links']]
+            partition_dir = os.path.join(output_dir, f'month={month}', f'site={feed_slug(site_name)}')
+            os.makedirs(partition_dir, exist_ok=True)
+            part_file = os.path.join(partition_dir, f"part-{partition_rows[0][0]:010d}-{partition_rows[-1][0]:010d}.parquet")
+            pq.write_table(pa.Table.from_pydict(data, schema=schema), part_file, compression='zstd')
+        exported += len(rows)
+        state['last_id'] = rows[-1][0]
+        # 每块写完后更新状态，中断后可以从上一块继续
+        with open(state_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+    print(f"Parquet导出完成：新增 {exported} 条，最大条目ID {state['last_id']}，耗时 {time.time() - start_time:.2f} 秒")
+    return exported
+
+# 中日韩文字范围（平假名/片假名、汉字、谚文）
+CJK_CHARS = '\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af'
+FTS_CJK_RUN = re.compile(f'([{CJK_CHARS}]+)(\\*?)')
+# FTS5的unicode61分词器会把连续的汉字当作一个词，写入前先切成相邻两字的二元组，
+# 与静态站点搜索索引（tokenize_search_text）的切分方式一致；
+# 同一段文字内的二元组用不可见的连接符分隔，与前后文字之间用零宽空格分隔，显示摘要时据此还原原文
+FTS_BIGRAM_JOINER = '\u2060'
+FTS_RUN_SEPARATOR = '\u200b'
+
+# 中日韩文字段切分为二元组
+def cjk_bigrams(run):
+    return [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+
+# 生成写入全文检索表的文本
+def fts_index_text(text):
+    return FTS_CJK_RUN.sub(lambda match: FTS_RUN_SEPARATOR + FTS_BIGRAM_JOINER.join(cjk_bigrams(match.group(1))) + match.group(2) + FTS_RUN_SEPARATOR, text or '')
+
+# 将检索词中的中日韩文字转换为二元组短语，"短语"内部的文字直接展开为连续的二元组
+def fts_query_text(query):
+    parts = query.split('"')
+    for index, part in enumerate(parts):
+        if index % 2:
+            parts[index] = FTS_CJK_RUN.sub(lambda match: f" {' '.join(cjk_bigrams(match.group(1)))} {match.group(2)}", part)
+        else:
+            parts[index] = FTS_CJK_RUN.sub(lambda match: f' "{" ".join(cjk_bigrams(match.group(1)))}"{match.group(2)} ', part)
+    return '"'.join(parts)
+
+# 将摘要中的二元组还原为原文，高亮标记跟随对应的文字
+def restore_fts_snippet(snippet):
+    pieces = snippet.replace(FTS_RUN_SEPARATOR, '').split(FTS_BIGRAM_JOINER)
+    text = pieces[0]
+    for piece in pieces[1:]:
+        if piece.startswith('['):
+            # 高亮从该二元组开始：与上一个二元组重叠的字也属于高亮范围
+            text = text[:-1] + piece[2:] if text.endswith(']') else text[:-1] + '[' + text[-1:] + piece[2:]
+        else:
+            text += piece[1:]
+    return text
+
+# 全文检索的正文部分：正文和下载链接，未找到时写入的占位提示不参与检索，
+# 否则检索“登录”“下载”等词会命中几乎所有数据
+def search_body_text(text_content, download_links):
+    return ' '.join(text for text in (text_content, download_links)
+                    if text and text.strip() not in (NO_CONTENT, NO_DOWNLOAD_LINKS)).strip()
+
+# 将单条数据写入全文检索表
+def index_item_text(cursor, item_id, title, text_content, download_links):
+    cursor.execute("INSERT OR REPLACE INTO items_fts (rowid, title, body) VALUES (?, ?, ?)",
+                   (item_id, fts_index_text(title), fts_index_text(search_body_text(text_content, download_links))))
+
+# 全文检索表的写入规则版本：1 中日韩文字按二元组切分，2 不再写入占位提示
+FTS_INDEX_VERSION = 2
+
+# 写入规则变化后清空旧版本的全文检索表，由backfill_search_index按新规则重建
+def migrate_search_tokens(cursor):
+    state = get_report_state(cursor, 'migration:fts_index')
+    if state and state[0] >= FTS_INDEX_VERSION:
+        return
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM items_fts)")
+    if cursor.fetchone()[0]:
+        cursor.execute("DELETE FROM items_fts")
+        print("全文检索索引的写入规则已更新，需要重建...")
+    # 已归档的分段文件中的全文检索表同样重建
+    for path in [path for paths in list_segments().values() for path in paths]:
+        segment_conn = sqlite3.connect(path)
+        try:
+            segment_cursor = segment_conn.cursor()
+            segment_cursor.execute("DELETE FROM items_fts")
+            segment_cursor.execute("""
+                SELECT items.id, items.title, item_content.content, item_content.download_links
+                FROM items LEFT JOIN item_content ON item_content.item_id = items.id
+            """)
+            for item_id, title, content, download_links in segment_cursor.fetchall():
+                index_item_text(segment_cursor, item_id, title, html_to_text(decompress_text(content)), decompress_text(download_links))
+            segment_cursor.execute("INSERT INTO items_fts (items_fts) VALUES ('optimize')")
+            segment_conn.commit()
+        finally:
+            segment_conn.close()
+        print(f"分段文件 {path} 的全文检索索引已重建")
+    save_report_state(cursor, 'migration:fts_index', FTS_INDEX_VERSION, 0)
+
+# 为尚未建立全文检索的历史数据回填索引
+def backfill_search_index(cursor, batch_size=5000):
+    cursor.execute("SELECT (SELECT COUNT(*) FROM items) - (SELECT COUNT(*) FROM items_fts)")
+    if cursor.fetchone()[0] <= 0:
+        return
+    last_id = 0
+    total = 0
+    while True:
+        cursor.execute("""
+            SELECT items.id, items.title, item_content.content, item_content.download_links
+            FROM items LEFT JOIN items_fts ON items_fts.rowid = items.id
+            LEFT JOIN item_content ON item_content.item_id = items.id
+            WHERE items.id > ? AND items_fts.rowid IS NULL
+            ORDER BY items.id LIMIT ?
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for item_id, title, content, download_links in rows:
+            index_item_text(cursor, item_id, title, html_to_text(decompress_text(content)), decompress_text(download_links))
+        cursor.connection.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
+    if total:
+        print(f"全文检索索引回填完成，共 {total} 条")
+
+# 全文检索
+def search_items(cursor, query, site=None, since=None, limit=20):
+    """
+    在标题、正文和下载链接中全文检索，结果按bm25相关度排序（标题权重更高）
+    
+    Args:
+        cursor: 数据库游标
+        query: 检索词，支持FTS5查询语法（AND/OR/NOT、"短语"、前缀*），语法错误时按普通关键词检索；
+               中日韩文字按二元组匹配，任意连续的两个字以上的片段都可以检索到
+        site: 只检索指定站点
+        since: 只检索该日期（北京时间，YYYY-MM-DD）之后入库的数据
+        limit: 最多返回条数
+        
+    Returns:
+        list: [(title, link, site_name, 北京时间, snippet), ...]
+    """
+    conditions = ["items_fts MATCH ?"]
+    params = []
+    if site:
+        conditions.append("items.site_name = ?")
+        params.append(site)
+    if since:
+        conditions.append("items.timestamp >= ?")
+        params.append(beijing_day_start_utc(since))
+    sql = f"""
+        SELECT items.title, items.link, items.site_name, datetime(items.timestamp, '+8 hours'),
+               snippet(items_fts, 1, '[', ']', '...', 16), bm25(items_fts, 10.0, 1.0)
+        FROM {{schema}}.items_fts JOIN {{schema}}.items ON items.id = items_fts.rowid
+        WHERE {' AND '.join(conditions)}
+        ORDER BY bm25(items_fts, 10.0, 1.0)
+        LIMIT ?
+    """
+    # 热库和各个已归档的分段分别检索，再按相关度合并；分段超过附加上限时逐批附加
+    segments = list_segments()
+    paths = [path for month in sorted(segments) if not since or month >= since[:7] for path in segments[month]]
+    batches = [['main']] + [paths[i:i + MAX_ATTACHED_SEGMENTS] for i in range(0, len(paths), MAX_ATTACHED_SEGMENTS)]
+    results = []
+    for batch in batches:
+        for schema in (batch if batch == ['main'] else attach_segments(cursor, batch)):
+            try:
+                cursor.execute(sql.format(schema=schema), [fts_query_text(query)] + params + [limit])
+            except sqlite3.OperationalError:
+                # 查询语法不合法时，将每个词作为短语重新检索
+                terms = ' '.join(fts_query_text('"' + term.replace('"', '""') + '"') for term in query.split())
+                cursor.execute(sql.format(schema=schema), [terms] + params + [limit])
+            results.extend(cursor.fetchall())
+    results.sort(key=lambda row: row[5])
+    return [row[:4] + (restore_fts_snippet(row[4]),) for row in results[:limit]]
+
+# 为已有表补充新增的列
+def ensure_column(cursor, table, column, column_type):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+# 重建按天、站点预聚合的统计表
+def rebuild_item_rollup(cursor):
+    cursor.execute("DELETE FROM item_rollup")
+    cursor.execute('''INSERT INTO item_rollup (day, site_name, count)
+        SELECT date(timestamp, '+8 hours'), COALESCE(site_name, ''), COUNT(*)
+        FROM items GROUP BY 1, 2''')
+
+# 获取报告渲染状态
+def get_report_state(cursor, period):
+    """
+    获取指定周期上一次渲染时的状态
+    
+    Args:
+        cursor: 数据库游标
+        period: 周期标识，例如 daily:2026-01-05、rss_daily:2026-01-05
+        
+    Returns:
+        tuple: (last_item_id, item_count)，没有记录时返回None
+    """
+    cursor.execute("SELECT last_item_id, item_count FROM report_state WHERE period = ?", (period,))
+    return cursor.fetchone()
+
+# 保存报告渲染状态
+def save_report_state(cursor, period, last_item_id, item_count):
+    cursor.execute("""
+        INSERT OR REPLACE INTO report_state (period, last_item_id, item_count, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (period, last_item_id, item_count))
+    cursor.connection.commit()
+
+# 判断周期内的数据相对上一次渲染是否有变化
+def is_period_unchanged(cursor, period, last_item_id, item_count, files):
+    """
+    周期内最大条目ID和条目数都与上次渲染一致，且输出文件都还在时，认为无需重新生成
+    """
+    state = get_report_state(cursor, period)
+    if state is None:
+        return False
+    if tuple(state) != (last_item_id, item_count):
+        return False
+    return all(os.path.exists(f) for f in files)
+
+# 仅在内容发生变化时写文件
+def write_file_if_changed(file_path, content):
+    """
+    比较新内容与已有文件的哈希，内容一致时不写入，避免无意义的I/O和git提交
+    
+    Args:
+        file_path: 文件路径
+        content: 文件内容（str或bytes）
+        
+    Returns:
+        bool: 是否实际写入了文件
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    if os.path.exists(file_path):
+        with open(file_path, 'rb') as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return True
+
+# 获取数据并检查更新
+# 各论坛程序的帖子链接规则，捕获帖子ID，同一帖子的分页、楼层、排序等链接得到相同的去重键
+URL_CANONICAL_RULES = {
+    # XenForo：/threads/标题.12345/page-2、/threads/12345/post-678、/threads/标题.12345/unread
+    'xenforo': [re.compile(r'/threads/(?:[^/]*\.)?(\d+)(?:/|$)')],
+    # MyBB：showthread.php?tid=123&pid=456、SEO链接 thread-123-post-456.html、thread-123-page-2.html，
+    # Google SEO插件的永久链接 /Thread-标题?pid=9（不含帖子ID，以标题部分作为主题标识）
+    'mybb': [re.compile(r'/showthread\.php\?(?:.*&)?tid=(\d+)'), re.compile(r'/thread-(\d+)(?:-[^/]*)?\.html'),
+             re.compile(r'/(Thread-[^/?]+)')],
+    # IPB：/topic/12345-标题/page/2/、index.php?/topic/12345-标题/、index.php?showtopic=12345
+    'ipb': [re.compile(r'/topic/(\d+)(?:-|/|$)'), re.compile(r'[?&]showtopic=(\d+)')],
+}
+
+# 与帖子身份无关的查询参数
+URL_IGNORED_PARAMS = re.compile(r'^(utm_.*|fbclid|gclid|ref|s|sid|phpsessid|page|view|order|direction|highlight|unread)$', re.IGNORECASE)
+
+# 根据链接推断论坛程序
+def detect_forum_engine(url):
+    url = (url or '').lower()
+    if '/threads/' in url or '/forums/-/index.rss' in url or url.endswith('/index.rss'):
+        return 'xenforo'
+    if 'syndication.php' in url or 'showthread.php' in url or '/thread-' in url:
+        return 'mybb'
+    if '/topic/' in url or 'showtopic=' in url or re.search(r'/rss/\d+-', url):
+        return 'ipb'
+    return None
+
+# 链接规范化
+def canonicalize_url(url, engine=None):
+    """
+    生成链接的去重键：忽略协议、主机大小写、www前缀、默认端口、锚点、末尾斜杠和跟踪参数，
+    能识别帖子ID时直接使用 主机/论坛程序:帖子ID
+    
+    Args:
+        url: 原始链接
+        engine: 论坛程序（xenforo、mybb、ipb），优先使用该程序的规则，未匹配时再尝试其他规则
+        
+    Returns:
+        str: 去重键
+    """
+    parts = urlsplit((url or '').strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path_and_query = parts.path + (f"?{parts.query}" if parts.query else '')
+    
+    engines = [engine] if engine in URL_CANONICAL_RULES else []
+    engines += [name for name in URL_CANONICAL_RULES if name != engine]
+    for name in engines:
+        for pattern in URL_CANONICAL_RULES[name]:
+            match = pattern.search(path_and_query)
+            if match:
+                return f"{host}/{name}:{match.group(1)}"
+    
+    path = re.sub(r'/+', '/', parts.path).rstrip('/') or '/'
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not URL_IGNORED_PARAMS.match(key))
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else '')
+
+# 为已有数据回填去重键，规范化后重复的数据只保留最早的一条
+def backfill_link_keys(cursor):
+    cursor.execute("SELECT id, link FROM items WHERE link_key IS NULL ORDER BY id")
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    cursor.execute("SELECT link_key FROM items WHERE link_key IS NOT NULL")
+    seen = {row[0] for row in cursor.fetchall()}
+    updates = []
+    duplicates = []
+    for item_id, link in rows:
+        link_key = canonicalize_url(link)
+        if link_key in seen:
+            duplicates.append((item_id,))
+            # 删除不可恢复，逐条记录被删除的数据
+            print(f"删除重复数据 id={item_id}：{link}（去重键 {link_key} 已存在）")
+        else:
+            seen.add(link_key)
+            updates.append((link_key, item_id))
+    cursor.executemany("DELETE FROM items WHERE id = ?", duplicates)
+    cursor.executemany("UPDATE items SET link_key = ? WHERE id = ?", updates)
+    cursor.connection.commit()
+    print(f"链接去重键回填完成：{len(updates)} 条，删除重复数据 {len(duplicates)} 条" +
+          (f"（id: {', '.join(str(row[0]) for row in duplicates)}）" if duplicates else ''))
+
+# Aho-Corasick多模式匹配自动机
+# 词边界判断使用的单词字符：字母和数字，但不包括中日韩文字（中文词之间本来就没有分隔符）
+CJK_CHAR = re.compile(f'[{CJK_CHARS}]')
+
+def is_word_char(char):
+    return char.isalnum() and not CJK_CHAR.match(char)
+
+class AhoCorasick:
+    """
+    将关注列表中的全部关键词编译为一个自动机，对文本只扫描一遍即可找出所有命中的关键词，
+    匹配耗时只与文本长度（和命中数）有关，与关键词数量无关。匹配不区分大小写。
+    """
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.keywords = []
+        for keyword in dict.fromkeys(k.strip().lower() for k in keywords):
+            if keyword:
+                self._add(keyword)
+        self._build()
+    
+    def _add(self, keyword):
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(len(self.keywords))
+        self.keywords.append(keyword)
+    
+    def _build(self):
+        # 按BFS顺序计算失败指针，并把失败指针上的输出合并到当前状态
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail_state = self.fail[state]
+                while fail_state and char not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+    
+    def find(self, text, whole_word=True):
+        """
+        Args:
+            text: 待匹配文本
+            whole_word: 是否要求关键词两侧不是字母或数字，避免短关键词误命中更长的单词；
+                        只对首尾是拉丁/西里尔字母或数字的关键词检查，中日韩关键词在连续的正文中也能命中
+            
+        Returns:
+            list: 命中的关键词（去重，按首次出现顺序）
+        """
+        text = (text or '').lower()
+        found = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for keyword_id in self.output[state]:
+                keyword = self.keywords[keyword_id]
+                if whole_word:
+                    start = position - len(keyword) + 1
+                    end = position + 1
+                    if (is_word_char(keyword[0]) and start > 0 and is_word_char(text[start - 1])) or \
+                            (is_word_char(keyword[-1]) and end < len(text) and is_word_char(text[end])):
+                        continue
+                found.setdefault(keyword, None)
+        return list(found)
+
+# 关注列表自动机缓存：(文件路径, 修改时间, 自动机)
+_watchlist_cache = None
+
+# 加载关注列表
+def get_watchlist_matcher():
+    """
+    读取关注列表文件（每行一个关键词或域名，#开头为注释）并编译为Aho-Corasick自动机，
+    文件未修改时复用已编译的自动机
+    
+    Returns:
+        AhoCorasick: 自动机，未开启或列表为空时返回None
+    """
+    global _watchlist_cache
+    watchlist_config = load_config().get('watchlist', {})
+    if watchlist_config.get('switch', 'OFF') != 'ON':
+        return None
+    watchlist_file = watchlist_config.get('file', 'watchlist.txt')
+    try:
+        mtime = os.path.getmtime(watchlist_file)
+    except OSError:
+        print(f"未找到关注列表文件：{watchlist_file}")
+        return None
+    if _watchlist_cache and _watchlist_cache[0] == watchlist_file and _watchlist_cache[1] == mtime:
+        return _watchlist_cache[2]
+    
+    with open(watchlist_file, 'r', encoding='utf-8') as f:
+        keywords = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    matcher = AhoCorasick(keywords) if keywords else None
+    print(f"已加载关注列表：{len(keywords)} 个关键词")
+    _watchlist_cache = (watchlist_file, mtime, matcher)
+    return matcher
+
+# 匹配关注列表并记录命中
+def match_watchlist(cursor, matcher, item_id, title, text_content):
+    """
+    Returns:
+        list: 命中的关键词
+    """
+    hits = {}
+    for field, text in (('title', title), ('content', text_content)):
+        for keyword in matcher.find(text):
+            hits.setdefault(keyword, field)
+    if hits:
+        cursor.executemany("INSERT OR IGNORE INTO watchlist_hits (item_id, keyword, field) VALUES (?, ?, ?)",
+                           [(item_id, keyword, field) for keyword, field in hits.items()])
+    return list(hits)
+
+# 未找到下载链接、正文时写入的占位文本
+NO_DOWNLOAD_LINKS = '需要登录或注册才能查看下载链接'
+NO_CONTENT = '需要登录或注册才能查看详细内容'
+
+# SimHash近似重复检测
+SIMHASH_BANDS = 8
+SIMHASH_BAND_BITS = 64 // SIMHASH_BANDS
+SIMHASH_MIN_FEATURES = 4
+
+# 计算标题和正文的64位SimHash指纹
+def compute_simhash(title, text_content=''):
+    """
+    转发时标题基本不变而正文差异较大，正文特征的总权重限制为标题的四分之一
+    
+    Args:
+        title: 标题
+        text_content: 清理后的正文
+        
+    Returns:
+        int: 无符号64位指纹，特征太少（如标题过短且无正文）时返回None
+    """
+    features = {}
+    title_tokens = tokenize_search_text(title)
+    content_tokens = tokenize_search_text(text_content)
+    for token in title_tokens:
+        features[token] = features.get(token, 0) + 1 / len(title_tokens)
+    for token in content_tokens:
+        features[token] = features.get(token, 0) + 0.25 / len(content_tokens)
+    if len(features) < SIMHASH_MIN_FEATURES:
+        return None
+    vector = [0] * 64
+    for token, weight in features.items():
+        token_hash = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            vector[bit] += weight if token_hash >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(64) if vector[bit] > 0)
+
+# SQLite整数为有符号64位，存储前后需要转换
+def _to_signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+# 查找近期的近似重复数据
+def find_near_duplicate(cursor, simhash, window_days=21, max_distance=7):
+    """
+    通过分段索引查找最近window_days天内海明距离不超过max_distance的数据，
+    每条新数据只需查询8次索引并比较少量候选，不需要与全表逐条比较
+    
+    Returns:
+        int: 匹配数据所在的聚类ID，没有匹配时返回None
+    """
+    since = simhash_window_start(window_days)
+    best = None
+    for band, value in enumerate(simhash_band_values(simhash)):
+        cursor.execute("""
+            SELECT item_id, simhash FROM simhash_bands
+            WHERE band = ? AND value = ? AND timestamp >= ?
+        """, (band, value, since))
+        for item_id, candidate in cursor.fetchall():
+            distance = bin(simhash ^ _to_unsigned64(candidate)).count('1')
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, item_id)
+    if best is None:
+        return None
+    cursor.execute("SELECT cluster_id FROM items WHERE id = ?", (best[1],))
+    return cursor.fetchone()[0] or best[1]
+
+# 近似重复检测时间窗口的起点（UTC时间字符串）
+def simhash_window_start(window_days):
+    return (datetime.utcnow() - timedelta(days=window_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+# 删除时间窗口之外的指纹分段，分段表的大小只与窗口内的数据量有关
+def prune_simhash_bands(cursor, window_days=21):
+    cursor.execute("DELETE FROM simhash_bands WHERE timestamp < ?", (simhash_window_start(window_days),))
+    return cursor.rowcount
+
+# 将指纹拆分为各段的值
+def simhash_band_values(simhash):
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [simhash >> (SIMHASH_BAND_BITS * band) & mask for band in range(SIMHASH_BANDS)]
+
+# 计算并保存数据的指纹和聚类
+def assign_item_cluster(cursor, item_id, title, text_content, timestamp=None, window_days=21, max_distance=7):
+    """
+    Returns:
+        tuple: (cluster_id, 是否为已有数据的转发)
+    """
+    simhash = compute_simhash(title, text_content)
+    cluster_id = None
+    if simhash is not None:
+        cluster_id = find_near_duplicate(cursor, simhash, window_days, max_distance)
+        if timestamp is None:
+            cursor.execute("SELECT timestamp FROM items WHERE id = ?", (item_id,))
+            timestamp = cursor.fetchone()[0]
+    # 时间窗口之外的数据（如回放的历史数据）不会再被查找，不保存分段
+    if simhash is not None and timestamp >= simhash_window_start(window_days):
+        cursor.executemany("INSERT OR IGNORE INTO simhash_bands (band, value, item_id, simhash, timestamp) VALUES (?, ?, ?, ?, ?)",
+                           [(band, value, item_id, _to_signed64(simhash), timestamp) for band, value in enumerate(simhash_band_values(simhash))])
+    is_duplicate = cluster_id is not None
+    if cluster_id is None:
+        cluster_id = item_id
+    cursor.execute("UPDATE items SET simhash = ?, cluster_id = ? WHERE id = ?",
+                   (_to_signed64(simhash) if simhash is not None else None, cluster_id, item_id))
+    return cluster_id, is_duplicate
+
+# 为近期尚未计算指纹的数据回填聚类
+def backfill_item_clusters(cursor, window_days=21, max_distance=7):
+    since = simhash_window_start(window_days)
+    cursor.execute("""
+        SELECT items.id, items.title, item_content.content, items.timestamp FROM items
+        LEFT JOIN item_content ON item_content.item_id = items.id
+        WHERE items.cluster_id IS NULL AND items.timestamp >= ? ORDER BY items.id
+    """, (since,))
+    rows = cursor.fetchall()
+    for item_id, title, content, timestamp in rows:
+        content = decompress_text(content)
+        text_content = '' if content == NO_CONTENT else html_to_text(content)
+        assign_item_cluster(cursor, item_id, title, text_content, timestamp, window_days, max_distance)
+    if rows:
+        cursor.connection.commit()
+        print(f"近似重复检测回填完成，共 {len(rows)} 条")
+
+# 分类（feed标签）加减分：泄露类数据优先，卡料、广告类靠后
+CATEGORY_SCORES = [
+    (re.compile(r'database|leak|dump|breach|data|db|base|утечк|слив|баз', re.IGNORECASE), 20),
+    (re.compile(r'combo|cloud|logs|stealer|access', re.IGNORECASE), 10),
+    (re.compile(r'carding|cvv|dumps? ?pin|spam|offtopic|флуд|кардинг|реклам', re.IGNORECASE), -15),
+]
+
+# 计算推送优先级分数
+def score_item(site_name, category, download_links, watchlist_hits=None, site_weights=None):
+    """
+    Args:
+        site_name: 数据源名称，用于查找来源信誉加权（push_queue.site_weights）
+        category: feed标签/分类
+        download_links: 提取到的下载链接
+        watchlist_hits: 命中的关注列表关键词
+        site_weights: 各数据源的信誉加权
+        
+    Returns:
+        int: 分数越高越优先推送
+    """
+    score = 0
+    if watchlist_hits:
+        score += 100 + 10 * (len(watchlist_hits) - 1)
+    for pattern, category_score in CATEGORY_SCORES:
+        if category and pattern.search(category):
+            score += category_score
+            break
+    if download_links and download_links != NO_DOWNLOAD_LINKS:
+        score += 15
+    score += int((site_weights or {}).get(site_name, 0))
+    return score
+
+# 按分数排序的推送队列
+class PushQueue:
+    """
+    一轮检查中的新数据先按分数入队，全部数据源检查完后再按分数从高到低推送，
+    避免突发大量低价值数据时重要数据排在后面。
+    超出每轮推送上限的数据：分数不低于min_score的合并为一条摘要推送，低于min_score的直接丢弃。
+    """
+    def __init__(self, max_per_cycle=30, min_score=0):
+        self.max_per_cycle = max_per_cycle
+        self.min_score = min_score
+        self._heap = []
+        self._counter = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def put(self, score, title, content, is_alert=False, summary=''):
+        # 多个数据源并发抓取时会从不同线程入队；同分数按入队顺序推送
+        with self._lock:
+            heapq.heappush(self._heap, (-score, self._counter, title, content, is_alert, summary))
+            self._counter += 1
+            METRICS.set('tracker_queue_depth', len(self._heap), queue='push')
+    
+    def drain(self):
+        """
+        Returns:
+            tuple: (单独推送的普通数据数, 合并到摘要数, 丢弃数)
+        """
+        pushed = 0
+        digest = []
+        dropped = 0
+        while self._heap:
+            neg_score, _, title, content, is_alert, summary = heapq.heappop(self._heap)
+            METRICS.set('tracker_queue_depth', len(self._heap), queue='push')
+            if is_alert:
+                # 关注告警不占用每轮推送上限
+                push_message(title, content, is_alert=True)
+            elif pushed < self.max_per_cycle:
+                push_message(title, content)
+                pushed += 1
+            elif -neg_score >= self.min_score:
+                digest.append(summary or title)
+            else:
+                dropped += 1
+        if digest:
+            push_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+            push_message(f"本轮另有 {len(digest)} 条更新", '\n'.join(digest) + f"\n推送时间：{push_time}", is_digest=True)
+        if digest or dropped:
+            print(f"推送队列：单独推送 {pushed} 条，合并摘要 {len(digest)} 条，丢弃 {dropped} 条")
+        return pushed, len(digest), dropped
+
+# 按配置创建推送队列
+def create_push_queue():
+    queue_config = load_config().get('push_queue', {})
+    return PushQueue(int(queue_config.get('max_per_cycle', 30)), int(queue_config.get('min_score', 0)))
+
+# 写入一条新数据及其全文检索、关注列表、转发聚类记录
+def write_item(cursor, record, watchlist_matcher=None, dedup_config=None):
+    """
+    Args:
+        cursor: 写连接的游标（由调用方统一提交事务）
+        record: check_for_updates提取出的字段；回放历史数据时可带timestamp（UTC），默认为当前时间
+        
+    Returns:
+        dict: is_new（是否新增）、item_id、watchlist_hits、cluster_id、is_repost
+    """
+    # 链接去重键有唯一索引，并发抓取到同一帖子时只有第一条会写入；已归档的帖子不再入库
+    cursor.execute("""
+        INSERT OR IGNORE INTO items (title, link, link_key, pub_date, pub_ts, author, category, site_name, timestamp) 
+        SELECT ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP) WHERE NOT EXISTS (SELECT 1 FROM archived_links WHERE link_key = ?)
+    """, (record['title'], record['link'], record['link_key'], record['pub_date'], record['pub_ts'], record['author'],
+          record['category'], record['site_name'], record.get('timestamp'), record['link_key']))
+    if not cursor.rowcount:
+        return {'is_new': False}
+    item_id = cursor.lastrowid
+    save_item_content(cursor, item_id, record['content'], record['download_links'])
+    # 同步写入全文检索表
+    index_item_text(cursor, item_id, record['title'], record['text_content'], record['download_links'])
+    # 匹配关注列表
+    watchlist_hits = match_watchlist(cursor, watchlist_matcher, item_id, record['title'], record['text_content']) if watchlist_matcher else []
+    # 近似重复检测，其他论坛的转发归入同一聚类
+    cluster_id, is_repost = None, False
+    if dedup_config and dedup_config.get('switch', 'ON') == 'ON':
+        cluster_id, is_repost = assign_item_cluster(cursor, item_id, record['title'], record['text_content'] if record['content'] != NO_CONTENT else '',
+                                                    window_days=dedup_config['window_days'], max_distance=dedup_config['max_distance'])
+    return {'is_new': True, 'item_id': item_id, 'watchlist_hits': watchlist_hits, 'cluster_id': cluster_id, 'is_repost': is_repost}
+
+# 数据库写入线程
+class DatabaseWriter(threading.Thread):
+    """
+    持有唯一的写连接，从队列接收新数据，把队列中已积压的数据合并在一个事务中写入：队列取空即提交，
+    不等待后续数据；数据持续到达时最多合并batch_size条或flush_interval秒。
+    通过Future返回每条数据是否为新增，避免多个抓取线程争用SQLite写锁
+    """
+    def __init__(self, batch_size=500, flush_interval=0.2):
+        super().__init__(name='DatabaseWriter', daemon=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = Queue()
+        self._watchlist_matcher = get_watchlist_matcher()
+        self._dedup_config = load_config().get('dedup', {})
+        self.written = 0
+        self.start()
+    
+    def submit(self, record):
+        """
+        Returns:
+            Future: 结果为write_item的返回值
+        """
+        future = Future()
+        self._queue.put((record, future))
+        METRICS.set('tracker_queue_depth', self._queue.qsize(), queue='db_writer')
+        return future
+    
+    def close(self):
+        # 写入队列中剩余的数据后结束线程
+        self._queue.put(None)
+        self.join()
+    
+    def run(self):
+        conn = open_database()
+        cursor = conn.cursor()
+        try:
+            # 每轮检查开始时清理过期的指纹分段
+            prune_simhash_bands(cursor, self._dedup_config.get('window_days', 21))
+            conn.commit()
+            stopping = False
+            while not stopping:
+                task = self._queue.get()
+                if task is None:
+                    break
+                batch = [task]
+                deadline = time.monotonic() + self.flush_interval
+                # 只取出已在队列中的数据，队列为空时立即提交，避免空闲时等满flush_interval
+                while len(batch) < self.batch_size and time.monotonic() < deadline:
+                    try:
+                        task = self._queue.get_nowait()
+                    except Empty:
+                        break
+                    if task is None:
+                        stopping = True
+                        break
+                    batch.append(task)
+                self._write_batch(conn, cursor, batch)
+        finally:
+            conn.close()
+    
+    def _write_batch(self, conn, cursor, batch):
+        start_time = time.perf_counter()
+        try:
+            results = [write_item(cursor, record, self._watchlist_matcher, self._dedup_config) for record, _ in batch]
+            conn.commit()
+            METRICS.observe('tracker_db_write_duration_seconds', time.perf_counter() - start_time)
+            PROFILER.record('db.write', start_time, time.perf_counter() - start_time, items=len(batch))
+            METRICS.observe('tracker_db_write_batch_items', len(batch))
+            METRICS.set('tracker_queue_depth', self._queue.qsize(), queue='db_writer')
+        except Exception as e:
+            conn.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            self.written += result['is_new']
+            future.set_result(result)
+
+# 已入库链接的内存过滤器
+class SeenLinkFilter:
+    """
+    保存所有已入库（包括已归档）链接去重键的64位哈希：启动时一次流式读取排序后存入紧凑的array('Q')，
+    运行中新增的哈希放在集合中。64位哈希冲突的概率可以忽略，命中即视为已入库，不再查询数据库；
+    未命中的链接才交给数据库确认
+    """
+    def __init__(self, hashes=()):
+        self._sorted = array('Q', sorted(hashes))
+        self._recent = set()
+    
+    @staticmethod
+    def link_hash(link_key):
+        # 过滤器只存在于内存中，直接使用字符串自带的64位SipHash（进程内稳定，并缓存在字符串对象上）
+        return hash(link_key) & 0xFFFFFFFFFFFFFFFF
+    
+    @classmethod
+    def load(cls, conn):
+        hashes = array('Q')
+        for (link_key,) in conn.execute("SELECT link_key FROM items WHERE link_key IS NOT NULL UNION ALL SELECT link_key FROM archived_links"):
+            hashes.append(cls.link_hash(link_key))
+        return cls(hashes)
+    
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+    
+    def __contains__(self, link_key):
+        value = self.link_hash(link_key)
+        if value in self._recent:
+            return True
+        index = bisect.bisect_left(self._sorted, value)
+        return index < len(self._sorted) and self._sorted[index] == value
+    
+    def add(self, link_key):
+        self._recent.add(self.link_hash(link_key))
+
+_seen_link_filter = None
+# 多个抓取线程同时首次调用时只加载一次
+_seen_link_filter_lock = threading.Lock()
+
+# 获取已入库链接过滤器，首次调用时从数据库加载，之后在入库时同步更新
+def get_seen_link_filter():
+    global _seen_link_filter
+    if _seen_link_filter is None:
+        with _seen_link_filter_lock:
+            if _seen_link_filter is None:
+                start_time = time.time()
+                conn = open_database(read_only=True)
+                try:
+                    _seen_link_filter = SeenLinkFilter.load(conn)
+                finally:
+                    conn.close()
+                print(f"已加载 {len(_seen_link_filter)} 条已入库链接，耗时 {time.time() - start_time:.2f} 秒")
+    return _seen_link_filter
+
+# 查询已入库的链接去重键
+def get_existing_link_keys(link_keys):
+    existing = set()
+    if not link_keys:
+        return existing
+    conn = open_database(read_only=True)
+    try:
+        link_keys = list(link_keys)
+        # 分批查询，避免超过SQLite参数数量上限
+        for i in range(0, len(link_keys), 500):
+            chunk = link_keys[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT link_key FROM items WHERE link_key IN ({placeholders}) UNION SELECT link_key FROM archived_links WHERE link_key IN ({placeholders})",
+                chunk + chunk))
+    finally:
+        conn.close()
+    return existing
+
+def check_for_updates(feed_url, site_name, writer, send_push=True, push_queue=None, engine=None):
+    """
+    抓取数据源并提取新数据，交给写入线程入库
+    
+    Args:
+        writer: DatabaseWriter写入线程
+        engine: 论坛程序（rss_dataleak.yaml中的engine字段），未配置时根据RSS地址自动识别
+        push_queue: 推送队列，传入时新数据只入队，由调用方在本轮全部数据源检查完后统一推送；
+                    未传入时在本数据源检查完后按分数顺序推送
+    """
+    print(f"{site_name} 监控中... ")
+    data_list = []
+    site_weights = load_config().get('push_queue', {}).get('site_weights', {})
+    forum_engine = engine or detect_forum_engine(feed_url)
+    profile = EXTRACTION_PROFILES.get(forum_engine, EXTRACTION_PROFILES['generic'])
+    drain_queue = send_push and push_queue is None
+    if drain_queue:
+        push_queue = create_push_queue()
+    file_data = fetch_feed(feed_url, site_name)
+    entries = [entry for entry in file_data.entries if entry.get('title', '') and entry.get('link', '')]
+    METRICS.inc('tracker_entries_parsed_total', len(entries), site=site_name)
+    
+    # 已入库的链接由内存过滤器直接排除，其余的按规范化后的链接一次性查询数据库确认，只提取新数据
+    seen_links = get_seen_link_filter()
+    with PROFILER.stage('lookup.filter', site=site_name):
+        candidates = [(entry, link_key) for entry, link_key in
+                      ((entry, canonicalize_url(entry['link'], forum_engine)) for entry in entries) if link_key not in seen_links]
+    with PROFILER.stage('lookup.db', site=site_name):
+        existing = get_existing_link_keys({link_key for _, link_key in candidates})
+    for link_key in existing:
+        seen_links.add(link_key)
+    pending = []
+    extract_time = 0.0
+    for entry, link_key in candidates:
+        if link_key in existing:
+            continue
+        existing.add(link_key)
+        # 按论坛程序的提取规则提取字段
+        start_time = time.perf_counter()
+        record = extract_entry_fields(entry, profile)
+        duration = time.perf_counter() - start_time
+        extract_time += duration
+        PROFILER.record('extract', start_time, duration, site=site_name)
+        record.update(title=entry['title'], link=entry['link'], link_key=link_key, site_name=site_name)
+        pending.append((record, writer.submit(record)))
+    METRICS.observe('tracker_extract_duration_seconds', extract_time, site=site_name)
+    
+    for record, future in pending:
+        with PROFILER.stage('write.wait', site=site_name):
+            result = future.result()
+        seen_links.add(record['link_key'])
+        if not result['is_new']:
+            continue
+        METRICS.inc('tracker_new_items_total', site=site_name)
+        data_title, data_link = record['title'], record['link']
+        if result['is_repost']:
+            print(f"检测到转发数据（聚类 {result['cluster_id']}），不再推送：{data_title}")
+        # 只有在send_push为True时才推送，按分数进入推送队列；转发数据只入库不推送
+        elif send_push:
+            watchlist_hits = result['watchlist_hits']
+            push_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+            score = score_item(site_name, record['category'], record['download_links'], watchlist_hits, site_weights)
+            summary = f"[{site_name}] {data_title} {data_link}"
+            if watchlist_hits:
+                # 命中关注列表的数据作为告警推送
+                push_queue.put(score, f"【关注告警】{site_name}", f"标题: {data_title}\n链接: {data_link}\n推送时间：{push_time}\n命中关键词：{', '.join(watchlist_hits)}", is_alert=True, summary=summary)
+            else:
+                push_queue.put(score, f"{site_name}今日更新", f"标题: {data_title}\n链接: {data_link}\n推送时间：{push_time}", summary=summary)
+        
+        data_list.append(data_title)
+        data_list.append(data_link)
+    if drain_queue:
+        push_queue.drain()
+    return data_list
+
+# 抓取feed时的请求头
+FEED_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 抓取并解析feed
+def fetch_feed(feed_url, site_name, max_retries=3, timeout=30):
+    """
+    通过requests抓取feed（支持代理配置），记录耗时、字节数和状态码；
+    429、5xx和连接失败时按Retry-After或指数退避重试
+    
+    Returns:
+        feedparser解析结果，所有重试都失败时返回没有条目的结果
+    """
+    start_time = time.perf_counter()
+    proxies = get_proxies()
+    try:
+        for attempt in range(max_retries):
+            if attempt:
+                METRICS.inc('tracker_fetch_retries_total', site=site_name)
+            try:
+                with PROFILER.stage('fetch.download', site=site_name):
+                    response = requests.get(feed_url, headers=FEED_REQUEST_HEADERS, proxies=proxies, timeout=timeout)
+            except requests.RequestException as e:
+                METRICS.inc('tracker_fetch_responses_total', site=site_name, status='error')
+                print(f"{site_name} 抓取失败（尝试 {attempt + 1}/{max_retries}）：{str(e)}")
+                with PROFILER.stage('fetch.backoff', site=site_name):
+                    time.sleep(min(2 ** attempt, 30))
+                continue
+            METRICS.inc('tracker_fetch_responses_total', site=site_name, status=str(response.status_code))
+            METRICS.inc('tracker_fetch_bytes_total', len(response.content), site=site_name)
+            if response.status_code == 429 or response.status_code >= 500:
+                if response.status_code == 429:
+                    METRICS.inc('tracker_http_429_total', target=site_name)
+                try:
+                    retry_after = float(response.headers.get('Retry-After', ''))
+                except ValueError:
+                    retry_after = 2 ** attempt
+                print(f"{site_name} 返回HTTP {response.status_code}，{min(retry_after, 30):.0f}秒后重试（尝试 {attempt + 1}/{max_retries}）")
+                with PROFILER.stage('fetch.backoff', site=site_name):
+                    time.sleep(min(retry_after, 30))
+                continue
+            with PROFILER.stage('fetch.parse', site=site_name):
+                return feedparser.parse(response.content, response_headers=dict(response.headers))
+        return feedparser.parse(b'')
+    finally:
+        METRICS.observe('tracker_fetch_duration_seconds', time.perf_counter() - start_time, site=site_name)
+
+# 下载链接提取规则
+DOWNLOAD_LINK_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    # 匹配直接的URL链接，捕获完整URL，支持更多文件类型
+    r'(https?://[^\s"<>]+\.(?:zip|rar|7z|txt|csv|xlsx|pdf|exe|dmg|pkg|iso|img|torrent|json|xml))',
+    # 匹配HTML href属性中的链接
+    r'href=["\'](https?://[^\s"<>]+)["\']',
+    # 匹配带有download前缀的链接
+    r'[Dd]ownload\s*[:：]\s*(https?://[^\s"<>]+)',
+    # 匹配包含download或file路径的链接
+    r'(https?://[^\s"<>]+/download/[^\s"<>]+)',
+    r'(https?://[^\s"<>]+/file/[^\s"<>]+)',
+    r'(https?://[^\s"<>]+/files/[^\s"<>]+)',
+    # 匹配常见文件托管服务的链接
+    r'(https?://(?:mega\.nz|mediafire\.com|sendspace\.com|z-upload\.com|uploadfiles\.com|filefactory\.com|fileshare\.cz|rapidshare\.com|hotfile\.com|depositfiles\.com|4shared\.com)/[^\s"<>]+)',
+    # 匹配带有download参数的链接
+    r'(https?://[^\s"<>]+\?.*download=.*)'
+]]
+
+# 排除可能的图片链接和其他非下载链接
+DOWNLOAD_LINK_EXCLUDES = ['/login/', '/register/', '/signin/', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg']
+
+# 各论坛程序的清理规则
+XENFORO_CLEAN_PATTERNS = [
+    # 移除登录提示（英文和俄文）
+    re.compile(r'<div class="block-mhhide block-mhhide--link">.*?</div>', re.DOTALL),
+    # 移除需要注册才能查看的链接提示
+    re.compile(r'<div class="messageHide messageHide--link">.*?</div>', re.DOTALL),
+    # 移除需要注册才能查看的图片、附件提示
+    re.compile(r'<div class="messageHide messageHide--attach">.*?</div>', re.DOTALL),
+    # 移除需要注册才能查看链接的文本（英文）
+    re.compile(r'You must be registered for see links', re.IGNORECASE),
+    re.compile(r'You must be registered for see images attach', re.IGNORECASE),
+    # 移除需要注册才能查看链接的文本（俄文）
+    re.compile(r'Для просмотра скрытого содержимого вы должны.*?</div>', re.DOTALL),
+    # 移除Read more链接
+    re.compile(r'<a[^>]+>Read more</a>', re.DOTALL),
+]
+# 移除按钮和其他交互元素
+INPUT_CLEAN_PATTERN = re.compile(r'<input[^>]+>', re.DOTALL)
+
+# 论坛程序的提取规则：清理规则、下载链接规则、作者和分类字段
+EXTRACTION_PROFILES = {
+    'xenforo': {
+        'clean_patterns': XENFORO_CLEAN_PATTERNS + [INPUT_CLEAN_PATTERN],
+        'link_patterns': DOWNLOAD_LINK_PATTERNS,
+        'author_fields': ['author', 'dc_creator'],
+        'category_fields': ['tags', 'category'],
+    },
+    'mybb': {
+        # MyBB的syndication.php只输出纯文本摘要，没有隐藏内容提示
+        'clean_patterns': [INPUT_CLEAN_PATTERN],
+        'link_patterns': DOWNLOAD_LINK_PATTERNS,
+        'author_fields': ['author', 'dc_creator'],
+        'category_fields': ['category', 'tags'],
+    },
+    'ipb': {
+        'clean_patterns': [INPUT_CLEAN_PATTERN],
+        'link_patterns': DOWNLOAD_LINK_PATTERNS,
+        'author_fields': ['dc_creator', 'author'],
+        'category_fields': ['category', 'tags'],
+    },
+    # 无法识别论坛程序时使用全部清理规则
+    'generic': {
+        'clean_patterns': XENFORO_CLEAN_PATTERNS + [INPUT_CLEAN_PATTERN],
+        'link_patterns': DOWNLOAD_LINK_PATTERNS,
+        'author_fields': ['author', 'dc_creator'],
+        'category_fields': ['tags', 'category'],
+    },
+}
+
+# 从feed条目中提取入库字段
+def extract_entry_fields(entry, profile):
+    """
+    Args:
+        entry: feedparser解析出的条目
+        profile: EXTRACTION_PROFILES中的提取规则
+        
+    Returns:
+        dict: pub_date、pub_ts（UTC时间戳）、author、category、content（清理后的HTML）、text_content（纯文本）、download_links
+    """
+    pub_date = entry.get('published', '')
+    pub_ts = parse_pub_ts(pub_date, entry.get('published_parsed'))
+    author = next((entry[field] for field in profile['author_fields'] if entry.get(field)), '')
+    category = ''
+    for field in profile['category_fields']:
+        if field == 'tags' and entry.get('tags'):
+            category = ', '.join([tag.get('term', '') for tag in entry['tags']])
+            break
+        if field == 'category' and entry.get('category'):
+            category = entry['category']
+            break
+    
+    # 提取内容
+    content = ''
+    if 'content' in entry:
+        # 处理RSS 2.0和Atom格式的content字段
+        if isinstance(entry['content'], list):
+            content = entry['content'][0].get('value', '')
+        else:
+            content = entry['content'].get('value', '')
+    elif 'summary' in entry:
+        content = entry['summary']
+    elif 'description' in entry:
+        content = entry['description']
+    
+    # 清理内容，移除登录提示等无用信息
+    for pattern in profile['clean_patterns']:
+        content = pattern.sub('', content)
+    # 移除HTML标签和多余空白，只保留文本内容用于提取下载链接
+    text_content = html_to_text(content)
     
-    return now_bj < 7
-
-# 初始化数据库
+    # 同时从原始content和text_content中提取链接，确保只添加完整的URL
+    all_matches = []
+    for pattern in profile['link_patterns']:
+        for source in [content, text_content]:
+            all_matches.extend(match for match in pattern.findall(source) if match.startswith(('http://', 'https://')))
+    # 去重并过滤掉无效链接，保留真正的下载链接
+    valid_links = [link for link in dict.fromkeys(all_matches)
+                   if not any(exclude in link.lower() for exclude in DOWNLOAD_LINK_EXCLUDES)]
+    # 如果没有找到下载链接，添加提示
+    download_links = ', '.join(valid_links) if valid_links else NO_DOWNLOAD_LINKS
+    
+    # 如果内容为空或只包含清理后的少量文本，添加提示
+    if not content or len(text_content) < 10:
+        content = NO_CONTENT
+    
+    return {
+        'pub_date': pub_date,
+        'pub_ts': pub_ts,
+        'author': author,
+        'category': category,
+        'content': content,
+        'text_content': text_content,
+        'download_links': download_links,
+    }
 
-def init_database():
-    conn = sqlite3.connect('data_leaks.db')
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT,
-        link TEXT,
-        pub_date TEXT,
-        author TEXT,
-        category TEXT,
-        content TEXT,
-        download_links TEXT,
-        site_name TEXT,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )''')
-    conn.commit()
-    return conn
+# 规划本轮抓取：按规范化后的RSS地址合并数据源
+# RSS地址比较键：只统一协议和主机名的大小写、去掉末尾斜杠，路径和查询参数保持原样，
+# 不使用为帖子链接设计的canonicalize_url（会去掉page/order等参数并套用帖子ID规则）
+def normalize_feed_url(url):
+    parts = urlsplit((url or '').strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), parts.query, ''))
 
-# 获取数据并检查更新
-def check_for_updates(feed_url, site_name, cursor, conn, send_push=True):
-    print(f"{site_name} 监控中... ")
-    data_list = []
-    file_data = feedparser.parse(feed_url)
-    data = file_data.entries
+def plan_feed_fetches(rss_config, datasources_config):
+    """
+    多个数据源配置了相同的RSS地址时，每轮只抓取和解析一次，数据归属于第一个配置的数据源
     
-    for entry in data:
-        data_title = entry.get('title', '')
-        data_link = entry.get('link', '')
+    Args:
+        rss_config: rss_dataleak.yaml中的数据源配置
+        datasources_config: 数据源开关配置
         
-        if not data_title or not data_link:
+    Returns:
+        list: [(rss_url, website_name, engine), ...]，按配置顺序
+    """
+    plans = {}
+    for website, rss_item in rss_config.items():
+        # 检查数据源是否启用
+        if datasources_config.get(website, 1) == 0:
+            print(f"跳过禁用的数据源：{website}")
             continue
         
-        # 查询数据库中是否存在相同链接的数据泄露信息
-        cursor.execute("SELECT * FROM items WHERE link = ?", (data_link,))
-        result = cursor.fetchone()
-        if result is None:
-            # 提取更多字段
-            pub_date = entry.get('published', '')
-            author = entry.get('author', entry.get('dc_creator', ''))
-            category = ''
-            if 'tags' in entry:
-                category = ', '.join([tag.get('term', '') for tag in entry['tags']])
-            elif 'category' in entry:
-                category = entry['category']
-            
-            # 提取内容
-            content = ''
-            if 'content' in entry:
-                # 处理RSS 2.0和Atom格式的content字段
-                if isinstance(entry['content'], list):
-                    content = entry['content'][0].get('value', '')
-                else:
-                    content = entry['content'].get('value', '')
-            elif 'summary' in entry:
-                content = entry['summary']
-            elif 'description' in entry:
-                content = entry['description']
-            
-            # 清理内容，移除登录提示等无用信息
-            import re
-            # 移除登录提示（英文和俄文）
-            content = re.sub(r'<div class="block-mhhide block-mhhide--link">.*?</div>', '', content, flags=re.DOTALL)
-            # 移除需要注册才能查看的链接提示
-            content = re.sub(r'<div class="messageHide messageHide--link">.*?</div>', '', content, flags=re.DOTALL)
-            # 移除需要注册才能查看的图片提示
-            content = re.sub(r'<div class="messageHide messageHide--attach">.*?</div>', '', content, flags=re.DOTALL)
-            # 移除需要注册才能查看的附件提示
-            content = re.sub(r'<div class="messageHide messageHide--attach">.*?</div>', '', content, flags=re.DOTALL)
-            # 移除按钮和其他交互元素
-            content = re.sub(r'<input[^>]+>', '', content, flags=re.DOTALL)
-            # 移除需要注册才能查看链接的文本（英文）
-            content = re.sub(r'You must be registered for see links', '', content, flags=re.IGNORECASE)
-            content = re.sub(r'You must be registered for see images attach', '', content, flags=re.IGNORECASE)
-            # 移除需要注册才能查看链接的文本（俄文）
-            content = re.sub(r'Для просмотра скрытого содержимого вы должны.*?</div>', '', content, flags=re.DOTALL)
-            # 移除Read more链接
-            content = re.sub(r'<a[^>]+>Read more</a>', '', content, flags=re.DOTALL)
-            # 移除HTML标签，只保留文本内容用于提取下载链接
-            text_content = re.sub(r'<[^>]+>', '', content)
-            # 清理空白字符
-            text_content = re.sub(r'\s+', ' ', text_content).strip()
-            
-            # 提取下载链接（改进版，支持更多格式）
-            download_links = ''
-            # 匹配常见的下载链接格式
-            # 1. 直接的URL链接，支持更多文件类型
-            # 2. HTML href属性中的链接
-            # 3. 带有download前缀的链接
-            # 4. 包含download或file路径的链接
-            download_patterns = [
-                # 匹配直接的URL链接，捕获完整URL，支持更多文件类型
-                r'(https?://[^\s"<>]+\.(?:zip|rar|7z|txt|csv|xlsx|pdf|exe|dmg|pkg|iso|img|torrent|json|xml))',
-                # 匹配HTML href属性中的链接
-                r'href=["\'](https?://[^\s"<>]+)["\']',
-                # 匹配带有download前缀的链接
-                r'[Dd]ownload\s*[:：]\s*(https?://[^\s"<>]+)',
-                # 匹配包含download或file路径的链接
-                r'(https?://[^\s"<>]+/download/[^\s"<>]+)',
-                r'(https?://[^\s"<>]+/file/[^\s"<>]+)',
-                r'(https?://[^\s"<>]+/files/[^\s"<>]+)',
-                # 匹配常见文件托管服务的链接
-                r'(https?://(?:mega\.nz|mediafire\.com|sendspace\.com|z-upload\.com|uploadfiles\.com|filefactory\.com|fileshare\.cz|rapidshare\.com|hotfile\.com|depositfiles\.com|4shared\.com)/[^\s"<>]+)',
-                # 匹配带有download参数的链接
-                r'(https?://[^\s"<>]+\?.*download=.*)'        
-            ]
-            
-            all_matches = []
-            # 首先从原始HTML内容中提取所有可能的链接，包括href属性
-            for pattern in download_patterns:
-                # 同时从原始content和text_content中提取链接
-                for source in [content, text_content]:
-                    matches = re.findall(pattern, source, re.IGNORECASE)
-                    if matches:
-                        for match in matches:
-                            # 确保只添加完整的URL
-                            if match and (match.startswith('http://') or match.startswith('https://')):
-                                all_matches.append(match)
-            
-            # 去重并合并下载链接
-            if all_matches:
-                unique_links = list(set(all_matches))
-                # 过滤掉可能的无效链接，保留真正的下载链接
-                valid_links = []
-                for link in unique_links:
-                    # 排除可能的图片链接和其他非下载链接
-                    if not any(exclude in link.lower() for exclude in ['/login/', '/register/', '/signin/', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg']):
-                        valid_links.append(link)
-                
-                if valid_links:
-                    download_links = ', '.join(valid_links)
-            
-            # 如果没有找到下载链接，添加提示
-            if not download_links:
-                download_links = '需要登录或注册才能查看下载链接'
-            
-            # 如果内容为空或只包含清理后的少量文本，添加提示
-            if not content or len(text_content) < 10:
-                content = '需要登录或注册才能查看详细内容'
-            
-            # 存储到数据库 with a timestamp
-            cursor.execute("""
-                INSERT INTO items (title, link, pub_date, author, category, content, download_links, site_name, timestamp) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (data_title, data_link, pub_date, author, category, content, download_links, site_name))
-            conn.commit()
-            
-            # 只有在send_push为True时才发送推送
-            if send_push:
-                push_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
-                push_message(f"{site_name}今日更新", f"标题: {data_title}\n链接: {data_link}\n推送时间：{push_time}")
-            
-            data_list.append(data_title)
-            data_list.append(data_link)
-    return data_list
+        website_name = rss_item.get("website_name")
+        rss_url = rss_item.get("rss_url")
+        feed_key = normalize_feed_url(rss_url)
+        if feed_key in plans:
+            print(f"数据源 {website}（{website_name}）与 {plans[feed_key][1]} 使用相同的RSS地址 {rss_url}，本轮只抓取一次，数据归属于 {plans[feed_key][1]}，请检查rss_dataleak.yaml")
+            continue
+        engine = rss_item.get("engine") or detect_forum_engine(rss_url)
+        if engine not in EXTRACTION_PROFILES:
+            print(f"数据源 {website_name} 的论坛程序 {engine} 无效，将使用通用规则")
+            engine = 'generic'
+        plans[feed_key] = (rss_url, website_name, engine)
+    return list(plans.values())
+
+# 执行一轮数据源检查
+def run_check_cycle(rss_config, datasources_config, send_push=True):
+    """
+    各数据源在线程池中并发抓取和提取，新数据统一交给写入线程分批入库，
+    全部数据源检查完后再按分数推送
+    """
+    start_time = time.perf_counter()
+    fetch_config = load_config().get('fetch', {})
+    push_queue = create_push_queue() if send_push else None
+    writer = DatabaseWriter(fetch_config.get('batch_size', 500), fetch_config.get('flush_interval', 0.2))
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_config.get('workers', 4)) as executor:
+            futures = {executor.submit(PROFILER.wrap(check_for_updates), rss_url, website_name, writer, send_push, push_queue, engine): website_name
+                       for rss_url, website_name, engine in plan_feed_fetches(rss_config, datasources_config)}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"检查数据源 {futures[future]} 失败：{str(e)}")
+    finally:
+        writer.close()
+    print(f"本轮新增 {writer.written} 条数据")
+    # 全部数据源检查完后按分数从高到低推送
+    if push_queue is not None:
+        push_queue.drain()
+    METRICS.observe('tracker_cycle_duration_seconds', time.perf_counter() - start_time)
+    METRICS.set('tracker_last_cycle_timestamp_seconds', int(time.time()))
+    write_metrics_textfile()
+
+# 回放时传给子进程的条目字段，其余字段不参与提取，避免无谓的序列化开销
+REPLAY_ENTRY_FIELDS = ['title', 'link', 'published', 'published_parsed', 'author', 'dc_creator', 'tags', 'category', 'content', 'summary', 'description']
+
+# 在子进程中清理和提取一批条目
+def replay_extract_chunk(entries, engine):
+    """
+    Args:
+        entries: 条目列表（只包含REPLAY_ENTRY_FIELDS中的字段）
+        engine: 论坛程序
+        
+    Returns:
+        list: 与check_for_updates相同格式的记录（不含site_name），可直接交给write_item入库
+    """
+    profile = EXTRACTION_PROFILES.get(engine, EXTRACTION_PROFILES['generic'])
+    records = []
+    for entry in entries:
+        title = entry.get('title', '')
+        link = entry.get('link', '')
+        if not title or not link:
+            continue
+        record = extract_entry_fields(entry, profile)
+        # 历史数据按发布时间（UTC）入库，没有发布时间时使用入库时间
+        published = entry.get('published_parsed')
+        record.update(title=title, link=link, link_key=canonicalize_url(link, engine),
+                      timestamp=time.strftime('%Y-%m-%d %H:%M:%S', published) if published else None)
+        records.append(record)
+    return records
+
+# 回放已保存的feed归档
+def replay_feed_archives(paths, site_name, engine=None, workers=None, chunk_size=500):
+    """
+    将已保存的RSS/Atom文件重新入库：主进程解析文件并分块，清理和下载链接提取分散到进程池，
+    结果按原顺序交给写入线程，与正常采集一样经过write_item（全文检索、关注列表、近似重复检测），不推送消息
+    
+    Args:
+        paths: feed文件路径列表
+        site_name: 数据源名称
+        engine: 论坛程序，默认根据条目链接自动识别
+        workers: 进程数，默认CPU核数
+        chunk_size: 每个任务包含的条目数
+    """
+    start_time = time.time()
+    entries = []
+    for path in paths:
+        parsed = feedparser.parse(path)
+        if parsed.bozo and not parsed.entries:
+            print(f"解析feed文件失败：{path}（{parsed.get('bozo_exception')}）")
+            continue
+        entries.extend({field: entry[field] for field in REPLAY_ENTRY_FIELDS if field in entry} for entry in parsed.entries)
+    if not entries:
+        print("没有可回放的条目")
+        return
+    engine = engine or detect_forum_engine(entries[0].get('link', '')) or 'generic'
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    print(f"开始回放 {len(paths)} 个文件，共 {len(entries)} 条（论坛程序：{engine}，{len(chunks)} 个任务）")
+    
+    conn = init_database()
+    # 写入线程每批最多chunk_size条，与提取任务的粒度一致
+    writer = DatabaseWriter(batch_size=chunk_size)
+    futures = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map按提交顺序返回结果，保证入库顺序与feed顺序一致
+            for records in executor.map(replay_extract_chunk, chunks, [engine] * len(chunks)):
+                for record in records:
+                    record['site_name'] = site_name
+                    futures.append(writer.submit(record))
+    finally:
+        writer.close()
+        close_database(conn, checkpoint=True)
+    inserted = sum(future.result()['is_new'] for future in futures)
+    print(f"回放完成：新增 {inserted} 条，跳过已存在 {len(entries) - inserted} 条，耗时 {time.time() - start_time:.2f} 秒")
+    print("如需更新历史报告，请使用 --rebuild 重新生成对应日期范围")
 
 # 获取代理配置
 
@@ -394,26 +2488,30 @@ def get_proxies():
     return proxies if proxies else None
 
 # 推送函数
-def push_message(title, content, is_startup=False):
+def push_message(title, content, is_startup=False, is_alert=False, is_digest=False):
     config = load_config()
     push_config = config.get('push', {})
     
     # 钉钉推送
     if 'dingding' in push_config and push_config['dingding'].get('switch', '') == "ON":
-        send_dingding_msg(push_config['dingding'].get('webhook'), push_config['dingding'].get('secret_key'), title,
-                          content)
+        with observe_stage('push.dingding', 'tracker_push_duration_seconds', channel='dingding'):
+            send_dingding_msg(push_config['dingding'].get('webhook'), push_config['dingding'].get('secret_key'), title,
+                              content)
 
     # 飞书推送
     if 'feishu' in push_config and push_config['feishu'].get('switch', '') == "ON":
-        send_feishu_msg(push_config['feishu'].get('webhook'), title, content)
+        with observe_stage('push.feishu', 'tracker_push_duration_seconds', channel='feishu'):
+            send_feishu_msg(push_config['feishu'].get('webhook'), title, content)
 
     # Telegram Bot推送
     if 'tg_bot' in push_config and push_config['tg_bot'].get('switch', '') == "ON":
-        send_tg_bot_msg(push_config['tg_bot'].get('token'), push_config['tg_bot'].get('group_id'), title, content)
+        with observe_stage('push.tg_bot', 'tracker_push_duration_seconds', channel='tg_bot'):
+            send_tg_bot_msg(push_config['tg_bot'].get('token'), push_config['tg_bot'].get('group_id'), title, content)
     
-    # Discard推送
-    if 'discard' in push_config and push_config['discard'].get('switch', '') == "ON" and push_config['discard'].get('send_normal_msg', '') == "ON":
-        send_discard_msg(push_config['discard'].get('webhook'), title, content, is_startup=is_startup)
+    # Discard推送（关注列表告警不受普通消息开关限制）
+    if 'discard' in push_config and push_config['discard'].get('switch', '') == "ON" and (is_alert or push_config['discard'].get('send_normal_msg', '') == "ON"):
+        with observe_stage('push.discard', 'tracker_push_duration_seconds', channel='discard'):
+            send_discard_msg(push_config['discard'].get('webhook'), title, content, is_startup=is_startup, is_alert=is_alert, is_digest=is_digest)
 
 # 飞书推送
 def send_feishu_msg(webhook, title, content):
@@ -469,7 +2567,7 @@ def send_dingding_msg(webhook, secret_key, title, content):
     dingding(title, content, webhook, secret_key)
 
 # Discard推送
-def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_report=False, html_file=None, markdown_content=None, is_startup=False):
+def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_report=False, html_file=None, markdown_content=None, is_startup=False, is_alert=False, is_digest=False):
     # 检查是否是占位符
     if not webhook or webhook == "discard的webhook地址":
         print(f"Discard推送跳过：webhook地址未配置")
@@ -567,6 +2665,22 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
                 "timestamp": datetime.utcnow().isoformat() + "Z"  # ISO 8601格式
             }
             
+            data = {
+                "embeds": [embed]
+            }
+        elif is_digest:
+            # 超出每轮推送上限的数据合并为一条摘要，使用灰色卡片
+            embed = {
+                "title": title,
+                "color": 0x95A5A6,  # 灰色
+                "description": content[:4000],
+                "footer": {
+                    "text": "Power By 东方隐侠安全团队·Anonymous@ 隐侠安全客栈",
+                    "icon_url": "https://www.dfyxsec.com/favicon.ico"
+                },
+                "timestamp": datetime.utcnow().isoformat() + "Z"  # ISO 8601格式
+            }
+            
             data = {
                 "embeds": [embed]
             }
@@ -580,7 +2694,7 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
             
             embed = {
                 "title": title,
-                "color": random_color,
+                "color": 0xED4245 if is_alert else random_color,  # 关注列表告警使用红色
                 "fields": [
                     {
                         "name": "标题",
@@ -609,6 +2723,12 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
                 },
                 "timestamp": datetime.utcnow().isoformat() + "Z"  # ISO 8601格式
             }
+            if is_alert and len(lines) > 3:
+                embed["fields"].insert(2, {
+                    "name": "命中关键词",
+                    "value": lines[3].replace('命中关键词：', ''),
+                    "inline": False
+                })
             
             data = {
                 "embeds": [embed]
@@ -661,11 +2781,14 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
                     # 确保重试延迟不超过最大值
                     retry_after = min(retry_after, max_delay)
                     
+                    METRICS.inc('tracker_http_429_total', target='discard')
+                    METRICS.inc('tracker_push_retries_total', channel='discard')
                     print(f"Discard推送速率限制，将在{retry_after:.2f}秒后重试 (尝试 {attempt+1}/{max_retries})")
                     print(f"响应内容: {response.text}")
                     
                     # 等待后继续重试
-                    time.sleep(retry_after)
+                    with PROFILER.stage('push.discard.backoff'):
+                        time.sleep(retry_after)
                     continue
                 else:
                     print(f"Discard推送失败: HTTP状态码 - {response.status_code}")
@@ -683,14 +2806,18 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
                 # 超时异常，使用指数退避 + 随机抖动
                 retry_after = base_delay * (2 ** attempt) + random.uniform(0, 1)
                 retry_after = min(retry_after, max_delay)
+                METRICS.inc('tracker_push_retries_total', channel='discard')
                 print(f"Discard推送超时，将在{retry_after:.2f}秒后重试 (尝试 {attempt+1}/{max_retries})")
-                time.sleep(retry_after)
+                with PROFILER.stage('push.discard.backoff'):
+                    time.sleep(retry_after)
             except requests.exceptions.ConnectionError:
                 # 连接错误，使用指数退避 + 随机抖动
                 retry_after = base_delay * (2 ** attempt) + random.uniform(0, 1)
                 retry_after = min(retry_after, max_delay)
+                METRICS.inc('tracker_push_retries_total', channel='discard')
                 print(f"Discard推送连接错误，将在{retry_after:.2f}秒后重试 (尝试 {attempt+1}/{max_retries})")
-                time.sleep(retry_after)
+                with PROFILER.stage('push.discard.backoff'):
+                    time.sleep(retry_after)
             except requests.exceptions.RequestException as e:
                 print(f"Discard推送请求异常：{str(e)}")
                 break
@@ -700,14 +2827,177 @@ def send_discard_msg(webhook, title, content, is_daily_report=False, is_weekly_r
     except Exception as e:
         print(f"Discard推送失败: 未知错误 - {str(e)}")
 
+# Feed输出格式：rss（RSS 2.0）、atom（Atom 1.0）、json（JSON Feed 1.1）
+FEED_FORMATS = ["rss", "atom", "json"]
+FEED_SITE_URL = "https://adminlove520.github.io/DarkWeb-Forums-Tracker/"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+# XML 1.0不允许出现的控制字符，写入前去除，避免生成非法XML
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+def _xml_safe(text):
+    return XML_INVALID_CHARS.sub('', str(text or ''))
+
+def _xml_text_element(xf, tag, text, **attrs):
+    with xf.element(tag, **attrs):
+        xf.write(_xml_safe(text))
+
+def _rfc822_time(epoch):
+    return email.utils.formatdate(epoch, usegmt=True)
+
+def _rfc3339_time(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+def render_rss_xml(meta, items):
+    """
+    使用lxml增量写入器生成RSS 2.0，所有文本和属性都会被正确转义
+    
+    Args:
+        meta: feed元信息（title、description、feed_url、updated）
+        items: feed条目列表
+        
+    Returns:
+        bytes: RSS XML内容
+    """
+    buffer = io.BytesIO()
+    with etree.xmlfile(buffer, encoding='utf-8') as xf:
+        xf.write_declaration()
+        with xf.element('rss', version='2.0', nsmap={'atom': ATOM_NS}):
+            with xf.element('channel'):
+                _xml_text_element(xf, 'title', meta['title'])
+                _xml_text_element(xf, 'description', meta['description'])
+                _xml_text_element(xf, 'link', FEED_SITE_URL)
+                with xf.element(f'{{{ATOM_NS}}}link', href=meta['feed_url'], rel='self', type='application/rss+xml'):
+                    pass
+                _xml_text_element(xf, 'language', 'zh-CN')
+                _xml_text_element(xf, 'lastBuildDate', _rfc822_time(meta['updated']))
+                _xml_text_element(xf, 'ttl', '60')
+                for item in items:
+                    with xf.element('item'):
+                        _xml_text_element(xf, 'title', item['title'])
+                        _xml_text_element(xf, 'link', item['link'])
+                        _xml_text_element(xf, 'description', item['title'])
+                        if item['site_name']:
+                            _xml_text_element(xf, 'category', item['site_name'])
+                        _xml_text_element(xf, 'pubDate', _rfc822_time(item['epoch']))
+                        _xml_text_element(xf, 'guid', f"{item['link']}_{item['timestamp']}", isPermaLink='false')
+    return buffer.getvalue()
+
+def render_atom_xml(meta, items):
+    """
+    生成Atom 1.0 feed
+    """
+    buffer = io.BytesIO()
+    with etree.xmlfile(buffer, encoding='utf-8') as xf:
+        xf.write_declaration()
+        with xf.element(f'{{{ATOM_NS}}}feed', nsmap={None: ATOM_NS}):
+            _xml_text_element(xf, f'{{{ATOM_NS}}}title', meta['title'])
+            _xml_text_element(xf, f'{{{ATOM_NS}}}subtitle', meta['description'])
+            _xml_text_element(xf, f'{{{ATOM_NS}}}id', meta['feed_url'])
+            with xf.element(f'{{{ATOM_NS}}}link', href=meta['feed_url'], rel='self', type='application/atom+xml'):
+                pass
+            with xf.element(f'{{{ATOM_NS}}}link', href=FEED_SITE_URL, rel='alternate', type='text/html'):
+                pass
+            _xml_text_element(xf, f'{{{ATOM_NS}}}updated', _rfc3339_time(meta['updated']))
+            with xf.element(f'{{{ATOM_NS}}}author'):
+                _xml_text_element(xf, f'{{{ATOM_NS}}}name', 'DarkWeb-Forums-Tracker')
+            for item in items:
+                with xf.element(f'{{{ATOM_NS}}}entry'):
+                    _xml_text_element(xf, f'{{{ATOM_NS}}}title', item['title'])
+                    with xf.element(f'{{{ATOM_NS}}}link', href=_xml_safe(item['link']), rel='alternate'):
+                        pass
+                    _xml_text_element(xf, f'{{{ATOM_NS}}}id', item['link'])
+                    _xml_text_element(xf, f'{{{ATOM_NS}}}updated', _rfc3339_time(item['epoch']))
+                    if item['site_name']:
+                        with xf.element(f'{{{ATOM_NS}}}category', term=_xml_safe(item['site_name'])):
+                            pass
+    return buffer.getvalue()
+
+def render_json_feed(meta, items):
+    """
+    生成JSON Feed 1.1，紧凑输出
+    """
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': meta['title'],
+        'description': meta['description'],
+        'home_page_url': FEED_SITE_URL,
+        'feed_url': meta['feed_url'][:-len('.xml')] + '.json' if meta['feed_url'].endswith('.xml') else meta['feed_url'],
+        'language': 'zh-CN',
+        'items': [
+            {
+                'id': f"{item['link']}_{item['timestamp']}",
+                'url': item['link'],
+                'title': item['title'],
+                'content_text': item['title'],
+                'date_published': _rfc3339_time(item['epoch']),
+                'tags': ([item['site_name']] if item['site_name'] else []) + split_feed_categories(item)
+            }
+            for item in items
+        ]
+    }
+    return json.dumps(feed, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# 各格式对应的渲染函数和文件后缀
+FEED_RENDERERS = {
+    'rss': (render_rss_xml, '.xml'),
+    'atom': (render_atom_xml, '.atom.xml'),
+    'json': (render_json_feed, '.json'),
+}
+
+def write_feed_files(base_path, meta, items, formats=None):
+    """
+    从同一批条目生成多种格式的feed文件，内容未变化的文件不会重写
+    
+    Args:
+        base_path: 不带后缀的文件路径，例如 rss/daily_rss_2026-01-05
+        meta: feed元信息
+        items: feed条目列表
+        formats: 需要输出的格式列表，默认全部
+    """
+    for feed_format in formats or FEED_FORMATS:
+        if feed_format not in FEED_RENDERERS:
+            print(f"不支持的feed格式：{feed_format}")
+            continue
+        renderer, suffix = FEED_RENDERERS[feed_format]
+        write_file_if_changed(f'{base_path}{suffix}', renderer(meta, items))
+
+def split_feed_categories(item):
+    return [c.strip() for c in (item.get('category') or '').split(',') if c.strip()]
+
+def group_feed_items(items, key_func):
+    groups = {}
+    for item in items:
+        for key in key_func(item):
+            if key:
+                groups.setdefault(key, []).append(item)
+    return groups
+
+def feed_slug(name):
+    return re.sub(r'[^\w.-]+', '-', name).strip('-.') or 'unknown'
+
+def write_sub_feed(rss_dir, group_type, name, latest_name, meta, items, formats):
+    """
+    写入按站点（site）或分类（category）拆分的最新feed
+    """
+    sub_dir = f'{rss_dir}/{group_type}/{feed_slug(name)}'
+    os.makedirs(sub_dir, exist_ok=True)
+    sub_meta = dict(meta)
+    sub_meta['title'] = f"{meta['title']} - {name}"
+    sub_meta['feed_url'] = f"{FEED_SITE_URL}{sub_dir}/{latest_name}.xml"
+    sub_meta['updated'] = items[0]['epoch']
+    write_feed_files(f'{sub_dir}/{latest_name}', sub_meta, items, formats)
+
 # 生成RSS feed
-def generate_rss_feed(cursor, feed_type="daily"):
+@timed('tracker_report_duration_seconds', 'report.{report}', report='rss_{feed_type}')
+def generate_rss_feed(cursor, feed_type="daily", report_date=None, force=False):
     """
     生成RSS feed
     
     Args:
         cursor: 数据库游标
         feed_type: RSS类型，可选值：daily（日报）、weekly（周报）
+        report_date: 报告日期（YYYY-MM-DD），默认北京时间当天；周报取该日期所在的周
+        force: 是否忽略增量状态强制重新生成
         
     Returns:
         str: RSS文件路径
@@ -718,183 +3008,387 @@ def generate_rss_feed(cursor, feed_type="daily"):
     rss_dir = f'rss'
     os.makedirs(rss_dir, exist_ok=True)
     
-    # 获取当前日期和时间
-    current_date = time.strftime('%Y-%m-%d', time.localtime())
-    current_time_utc = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S GMT')
+    # 获取报告日期，历史日期重建时不更新latest文件
+    current_date = report_date or beijing_today()
+    update_latest = report_date is None
     
     # 获取数据范围
     if feed_type == "daily":
         # 日报RSS，获取当天数据
-        cursor.execute("SELECT title, link, timestamp FROM items WHERE date(timestamp) = date('now') ORDER BY timestamp DESC")
-        data_leaks = cursor.fetchall()
+        where_clause, where_params = get_period_where(current_date, current_date)
+        period = f"rss_daily:{current_date}"
         feed_title = f"数据泄露监控日报 RSS {current_date}"
         feed_description = f"每日数据泄露监控RSS feed，包含{current_date}的最新数据泄露信息"
         feed_link = f"https://adminlove520.github.io/DarkWeb-Forums-Tracker/rss/daily_rss_{current_date}.xml"
         rss_file = f'{rss_dir}/daily_rss_{current_date}.xml'
         latest_rss_file = f'{rss_dir}/latest_daily_rss.xml'
     elif feed_type == "weekly":
-        # 周报RSS，获取本周数据
-        cursor.execute("SELECT title, link, timestamp FROM items WHERE timestamp >= date('now', 'start of week', '+1 day') AND timestamp <= date('now', 'start of week', '+7 days') ORDER BY timestamp DESC")
-        data_leaks = cursor.fetchall()
-        # 获取本周的开始和结束日期
-        cursor.execute("SELECT date('now', 'start of week', '+1 day') as start_date, date('now', 'start of week', '+7 days') as end_date")
-        result = cursor.fetchone()
-        if result:
-            start_date, end_date = result
-        else:
-            # 如果获取失败，使用当前日期作为默认值
-            start_date = current_date
-            end_date = current_date
-        
-        # 确保日期不为None
-        start_date = start_date or current_date
-        end_date = end_date or current_date
+        # 周报RSS，获取本周（周一到周日）数据
+        start_date, end_date = get_week_range(current_date)
+        where_clause, where_params = get_period_where(start_date, end_date)
         feed_title = f"数据泄露监控周报 RSS {start_date} - {end_date}"
         feed_description = f"每周数据泄露监控RSS feed，包含{start_date}到{end_date}的最新数据泄露信息"
         feed_link = f"https://adminlove520.github.io/DarkWeb-Forums-Tracker/rss/weekly_rss_{start_date}_{end_date}.xml"
         rss_file = f'{rss_dir}/weekly_rss_{start_date}_{end_date}.xml'
         latest_rss_file = f'{rss_dir}/latest_weekly_rss.xml'
+        period = f"rss_weekly:{start_date}_{end_date}"
     else:
         print(f"不支持的RSS类型：{feed_type}")
         return None
     
-    # 生成RSS XML内容
-    rss_content = f"""<?xml version='1.0' encoding='UTF-8'?>
-<rss version='2.0'
-    xmlns:atom='http://www.w3.org/2005/Atom'>
-    <channel>
-        <title>{feed_title}</title>
-        <description>{feed_description}</description>
-        <link>https://adminlove520.github.io/DarkWeb-Forums-Tracker/</link>
-        <atom:link href='{feed_link}' rel='self' type='application/rss+xml' />
-        <language>zh-CN</language>
-        <lastBuildDate>{current_time_utc}</lastBuildDate>
-        <ttl>60</ttl>
-        
-"""
+    # 数据没有变化时跳过重新生成，已归档的周期从分段文件读取
+    items_source = get_items_source(cursor, *((current_date, current_date) if feed_type == "daily" else (start_date, end_date)))
+    cursor.execute(f"SELECT MAX(id), COUNT(*) FROM {items_source} WHERE {where_clause}", where_params)
+    last_item_id, item_count = cursor.fetchone()
+    expected_files = [rss_file, latest_rss_file] if update_latest else [rss_file]
+    if not force and is_period_unchanged(cursor, period, last_item_id, item_count, expected_files):
+        print(f"{feed_type} RSS feed无新增数据，跳过生成：{rss_file}")
+        return rss_file
     
-    # 添加RSS条目
-    for leak in data_leaks:
-        title, link, timestamp = leak
-        # 转换时间格式为RSS要求的格式（RFC 822）
-        rss_time = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').strftime('%a, %d %b %Y %H:%M:%S GMT')
+    time_expr, order_clause = get_item_order()
+    cursor.execute(f"SELECT title, link, timestamp, site_name, category, {time_expr} FROM {items_source} WHERE {where_clause} {order_clause}", where_params)
+    feed_items = [
+        {'title': title, 'link': link, 'timestamp': timestamp, 'site_name': site_name, 'category': category, 'epoch': epoch}
+        for title, link, timestamp, site_name, category, epoch in cursor.fetchall()
+    ]
+    
+    feed_config = load_config().get('rss_feed', {})
+    formats = feed_config.get('formats', FEED_FORMATS)
+    feed_meta = {
+        'title': feed_title,
+        'description': feed_description,
+        'feed_url': feed_link,
+        'updated': feed_items[0]['epoch'] if feed_items else int(time.time())
+    }
+    
+    # 写入RSS文件，同时写入最新RSS文件（用于外部订阅）
+    rss_base = rss_file[:-len('.xml')]
+    latest_rss_base = latest_rss_file[:-len('.xml')]
+    write_feed_files(rss_base, feed_meta, feed_items, formats)
+    if update_latest:
+        write_feed_files(latest_rss_base, feed_meta, feed_items, formats)
         
-        rss_content += f"""        <item>
-            <title>{title}</title>
-            <link>{link}</link>
-            <description>{title}</description>
-            <pubDate>{rss_time}</pubDate>
-            <guid isPermaLink='false'>{link}_{timestamp}</guid>
-        </item>
-"""
-    
-    # 结束RSS XML
-    rss_content += f"""    </channel>
-</rss>"""
-    
-    # 写入RSS文件
-    with open(rss_file, 'w', encoding='utf-8') as f:
-        f.write(rss_content)
-    
-    # 写入最新RSS文件（用于外部订阅）
-    with open(latest_rss_file, 'w', encoding='utf-8') as f:
-        f.write(rss_content)
+        # 按站点、按分类拆分的最新feed
+        latest_name = os.path.basename(latest_rss_base)
+        if feed_config.get('per_site', 'ON') == 'ON':
+            for site_name, site_items in group_feed_items(feed_items, lambda item: [item['site_name']]).items():
+                write_sub_feed(rss_dir, 'site', site_name, latest_name, feed_meta, site_items, formats)
+        if feed_config.get('per_category', 'OFF') == 'ON':
+            for category, category_items in group_feed_items(feed_items, split_feed_categories).items():
+                write_sub_feed(rss_dir, 'category', category, latest_name, feed_meta, category_items, formats)
+    
+    save_report_state(cursor, period, last_item_id, item_count)
     
     print(f"{feed_type} RSS feed已生成：{rss_file}")
-    print(f"最新{feed_type} RSS feed已更新：{latest_rss_file}")
+    if update_latest:
+        print(f"最新{feed_type} RSS feed已更新：{latest_rss_file}")
     
     return rss_file
 
+# 北京时间相对UTC的偏移，数据库中的timestamp为UTC时间
+BEIJING_OFFSET = timedelta(hours=8)
+
+# 报告周期类型：(报告名称, 统计标题, 文件名前缀)
+PERIOD_TYPES = {
+    "daily": ("日报", "今日统计", "Daily"),
+    "weekly": ("周报", "本周统计", "Weekly"),
+    "monthly": ("月报", "本月统计", "Monthly"),
+    "range": ("报告", "区间统计", "Report"),
+}
+
+# 获取北京时间的当前日期
+def beijing_today():
+    return (datetime.utcnow() + BEIJING_OFFSET).strftime('%Y-%m-%d')
+
+# 北京时间某日0点对应的UTC时间字符串，可直接与timestamp列比较
+def beijing_day_start_utc(day):
+    return (datetime.strptime(day, '%Y-%m-%d') - BEIJING_OFFSET).strftime('%Y-%m-%d %H:%M:%S')
+
+# 获取日期所在周的周一和周日
+def get_week_range(day=None):
+    """
+    Args:
+        day: 日期字符串（YYYY-MM-DD），默认北京时间当天
+        
+    Returns:
+        tuple: (start_date, end_date) 周一和周日的日期字符串
+    """
+    day = datetime.strptime(day or beijing_today(), '%Y-%m-%d')
+    start = day - timedelta(days=day.weekday())
+    end = start + timedelta(days=6)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+# 获取报告周期的日期范围
+def get_period_range(period_type, ref_date=None, end_date=None):
+    """
+    计算报告周期的日期范围（北京时间）
+    
+    Args:
+        period_type: daily（日报）、weekly（周报）、monthly（月报）、range（自定义区间）
+        ref_date: 周期内任意一天（YYYY-MM-DD），月报也可以是YYYY-MM；自定义区间时为开始日期
+        end_date: 自定义区间的结束日期（YYYY-MM-DD，包含当天）
+        
+    Returns:
+        dict: type、start_date、end_date（包含当天）、label（用于文件名）、display（用于标题）
+    """
+    ref_date = ref_date or beijing_today()
+    if period_type == "daily":
+        start_date = end_date = ref_date
+        label = display = ref_date
+    elif period_type == "weekly":
+        start_date, end_date = get_week_range(ref_date)
+        label = f"{start_date}_{end_date}"
+        display = f"{start_date} - {end_date}"
+    elif period_type == "monthly":
+        month_start = datetime.strptime(ref_date[:7], '%Y-%m')
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        start_date = month_start.strftime('%Y-%m-%d')
+        end_date = (next_month - timedelta(days=1)).strftime('%Y-%m-%d')
+        label = display = ref_date[:7]
+    elif period_type == "range":
+        start_date, end_date = ref_date, end_date or ref_date
+        if start_date > end_date:
+            start_date, end_date = end_date, start_date
+        label = f"{start_date}_{end_date}"
+        display = f"{start_date} - {end_date}"
+    else:
+        raise ValueError(f"不支持的报告类型：{period_type}")
+    return {'type': period_type, 'start_date': start_date, 'end_date': end_date, 'label': label, 'display': display}
+
+# 获取日期范围对应的查询条件
+def get_period_where(start_date, end_date):
+    """
+    日期范围统一按北京时间的左闭右开区间 [start 00:00, end+1 00:00) 查询，
+    边界换算为UTC后直接比较timestamp列，可以使用timestamp索引
+    
+    Args:
+        start_date: 开始日期（YYYY-MM-DD）
+        end_date: 结束日期（YYYY-MM-DD，包含当天）
+        
+    Returns:
+        tuple: (where_clause, params)
+    """
+    end_exclusive = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    return "timestamp >= ? AND timestamp < ?", (beijing_day_start_utc(start_date), beijing_day_start_utc(end_exclusive))
+
+# 按发布时间查询的条件
+def get_pub_time_where(start_date, end_date):
+    """
+    与get_period_where相同的北京时间左闭右开区间，按发布时间（pub_ts索引）查询
+    
+    Returns:
+        tuple: (where_clause, params)
+    """
+    end_exclusive = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    start_ts = calendar.timegm((datetime.strptime(start_date, '%Y-%m-%d') - BEIJING_OFFSET).timetuple())
+    end_ts = calendar.timegm((datetime.strptime(end_exclusive, '%Y-%m-%d') - BEIJING_OFFSET).timetuple())
+    return "pub_ts >= ? AND pub_ts < ?", (start_ts, end_ts)
+
+# 报告和feed中条目的排序方式
+def get_item_order():
+    """
+    Returns:
+        tuple: (条目时间的SQL表达式（UTC时间戳）, ORDER BY子句)；
+               item_order.order_by为pub_ts时按发布时间排序，缺少发布时间的数据使用入库时间
+    """
+    if load_config().get('item_order', {}).get('order_by') == 'pub_ts':
+        time_expr = "COALESCE(pub_ts, CAST(strftime('%s', timestamp) AS INTEGER))"
+        return time_expr, f"ORDER BY {time_expr} DESC, id DESC"
+    return "CAST(strftime('%s', timestamp) AS INTEGER)", "ORDER BY timestamp DESC"
+
 # 获取数据统计信息
-def get_data_statistics(cursor, report_type="daily"):
+def get_data_statistics(cursor, report_type="daily", start_date=None, end_date=None):
     """
-    获取数据统计信息
+    获取数据统计信息，总数、按数据源和按日期的统计都从item_rollup预聚合表读取
     
     Args:
         cursor: 数据库游标
-        report_type: 报告类型，可选值：daily（每日）、weekly（每周）
+        report_type: 报告类型，可选值：daily、weekly、monthly、range
+        start_date: 统计开始日期（YYYY-MM-DD），默认当前周期
+        end_date: 统计结束日期（YYYY-MM-DD，包含当天），默认当前周期
         
     Returns:
         dict: 统计信息字典
     """
+    if not start_date or not end_date:
+        period_range = get_period_range(report_type, start_date, end_date)
+        start_date, end_date = period_range['start_date'], period_range['end_date']
+    
     statistics = {}
     
+    # 获取周期内总数量
+    cursor.execute("SELECT COALESCE(SUM(count), 0) FROM item_rollup WHERE day >= ? AND day <= ?", (start_date, end_date))
+    statistics['total_count'] = cursor.fetchone()[0]
+    
+    # 按数据源统计数量
+    cursor.execute("SELECT site_name, SUM(count) as total FROM item_rollup WHERE day >= ? AND day <= ? GROUP BY site_name ORDER BY total DESC", (start_date, end_date))
+    statistics['by_source'] = cursor.fetchall()
+    
     if report_type == "daily":
-        # 每日统计
-        # 获取当天总数量
-        cursor.execute("SELECT COUNT(*) FROM items WHERE date(timestamp) = date('now')")
-        statistics['total_count'] = cursor.fetchone()[0]
-        
-        # 按数据源统计数量（使用site_name字段）
-        cursor.execute("SELECT site_name, COUNT(*) as count FROM items WHERE date(timestamp) = date('now') GROUP BY site_name ORDER BY count DESC")
-        statistics['by_source'] = cursor.fetchall()
-        
-        # 按小时统计数量
-        cursor.execute("SELECT strftime('%H', timestamp) as hour, COUNT(*) as count FROM items WHERE date(timestamp) = date('now') GROUP BY hour ORDER BY hour")
+        # 按小时统计数量（北京时间），只扫描当天的索引范围
+        where_clause, where_params = get_period_where(start_date, end_date)
+        cursor.execute(f"SELECT strftime('%H', timestamp, '+8 hours') as hour, COUNT(*) as count FROM {get_items_source(cursor, start_date, end_date)} WHERE {where_clause} GROUP BY hour ORDER BY hour", where_params)
         statistics['by_hour'] = cursor.fetchall()
-    elif report_type == "weekly":
-        # 每周统计
-        # 获取本周总数量（从周一到周日）
-        cursor.execute("SELECT COUNT(*) FROM items WHERE timestamp >= date('now', 'start of week', '+1 day') AND timestamp <= date('now', 'start of week', '+7 days')")
-        statistics['total_count'] = cursor.fetchone()[0]
-        
-        # 按数据源统计数量（使用site_name字段）
-        cursor.execute("SELECT site_name, COUNT(*) as count FROM items WHERE timestamp >= date('now', 'start of week', '+1 day') AND timestamp <= date('now', 'start of week', '+7 days') GROUP BY site_name ORDER BY count DESC")
-        statistics['by_source'] = cursor.fetchall()
-        
+    else:
         # 按日期统计数量
-        cursor.execute("SELECT date(timestamp) as date, COUNT(*) as count FROM items WHERE timestamp >= date('now', 'start of week', '+1 day') AND timestamp <= date('now', 'start of week', '+7 days') GROUP BY date ORDER BY date")
+        cursor.execute("SELECT day, SUM(count) FROM item_rollup WHERE day >= ? AND day <= ? GROUP BY day ORDER BY day", (start_date, end_date))
         statistics['by_date'] = cursor.fetchall()
     
     return statistics
 
-# 生成日报
+# 共享静态资源目录，所有生成的HTML页面引用同一份样式文件，不再内嵌CSS
+STATIC_DIR = 'static'
+_static_version_cache = {}
+
+# 获取静态资源版本号（内容哈希），资源内容变化后URL随之变化，浏览器缓存自动失效
+def get_static_version(asset_path):
+    mtime = os.path.getmtime(asset_path)
+    cached = _static_version_cache.get(asset_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(asset_path, 'rb') as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:10]
+    _static_version_cache[asset_path] = (mtime, version)
+    return version
+
+# 获取页面引用静态资源的相对URL
+def static_asset_url(asset_name, page_file):
+    """
+    Args:
+        asset_name: static目录下的资源文件名，例如 report.css
+        page_file: 引用该资源的页面路径，例如 archive/2026-01-05/Daily_2026-01-05.html
+        
+    Returns:
+        str: 带版本号的相对URL，例如 ../../static/report.css?v=1a2b3c4d5e
+    """
+    asset_path = f'{STATIC_DIR}/{asset_name}'
+    relative_path = os.path.relpath(asset_path, os.path.dirname(page_file) or '.').replace(os.sep, '/')
+    return f"{relative_path}?v={get_static_version(asset_path)}"
+
+HTML_COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+HTML_INDENT_PATTERN = re.compile(r'>\s*\n\s*<')
+HTML_NEWLINE_PATTERN = re.compile(r'\s*\n\s*')
+
+# 压缩HTML，只去除注释和换行缩进，不改变标签之间的行内空格
+def minify_html(html_content):
+    html_content = HTML_COMMENT_PATTERN.sub('', html_content)
+    html_content = HTML_INDENT_PATTERN.sub('><', html_content)
+    return HTML_NEWLINE_PATTERN.sub(' ', html_content).strip()
+
+# 按配置处理生成的HTML
+def finalize_html(html_content):
+    if load_config().get('html_output', {}).get('minify', 'OFF') == 'ON':
+        return minify_html(html_content)
+    return html_content
+
+# 读取并编译报告模板，模板文件未修改时复用编译结果
+_report_template_cache = {}
+
+def get_report_template(template_file='template.html'):
+    mtime = os.path.getmtime(template_file)
+    cached = _report_template_cache.get(template_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(template_file, 'r', encoding='utf-8') as f:
+        template = Template(f.read())
+    _report_template_cache[template_file] = (mtime, template)
+    return template
+
+# 获取报告文件路径
+def get_report_files(period_range):
+    prefix = PERIOD_TYPES[period_range['type']][2]
+    label = period_range['label']
+    if period_range['type'] == "daily":
+        base = f"archive/{label}/{prefix}_{label}"
+    else:
+        base = f"archive/{prefix}_{label}"
+    return f"{base}.md", f"{base}.html"
 
-def generate_daily_report(cursor):
-    print("开始生成日报...")
+# 生成周期报告
+@timed('tracker_report_duration_seconds', 'report.{report}', report='{period_type}')
+def generate_period_report(cursor, period_type, ref_date=None, end_date=None, force=False, update_index=True, send_push=True):
+    """
+    生成任意周期的报告（日报、周报、月报、自定义区间），统计数据来自预聚合表，
+    只有报告列表需要读取条目行
+    
+    Args:
+        cursor: 数据库游标
+        period_type: daily、weekly、monthly、range
+        ref_date: 周期内任意一天，自定义区间时为开始日期，默认北京时间当天
+        end_date: 自定义区间的结束日期
+        force: 是否忽略增量状态强制重新生成
+        update_index: 是否更新index.html（批量重建时最后统一更新）
+        send_push: 是否按配置推送报告（仅日报和周报）
+        
+    Returns:
+        tuple: (markdown_file, markdown_content) 报告文件路径和内容
+    """
+    report_name, statistics_title, _ = PERIOD_TYPES[period_type]
+    period_range = get_period_range(period_type, ref_date, end_date)
+    start_date, end_date = period_range['start_date'], period_range['end_date']
+    display_date = period_range['display']
+    print(f"开始生成{report_name} {display_date}...")
     
-    # 获取当前日期和时间
-    current_date = time.strftime('%Y-%m-%d', time.localtime())
-    current_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
+    # 获取当前时间
+    current_time = (datetime.utcnow() + BEIJING_OFFSET).strftime('%Y-%m-%d %H:%M:%S')
     
     # 创建目录结构
-    archive_dir = f'archive/{current_date}'
-    os.makedirs(archive_dir, exist_ok=True)
+    markdown_file, html_file = get_report_files(period_range)
+    os.makedirs(os.path.dirname(markdown_file), exist_ok=True)
     
-    # 从数据库中获取当天的所有数据泄露信息，包含来源站点
-    cursor.execute("SELECT title, link, timestamp, site_name FROM items WHERE date(timestamp) = date('now') ORDER BY timestamp DESC")
+    # 与上一次渲染相比没有新增数据时，直接跳过，不重写任何文件
+    period = f"{period_type}:{period_range['label']}"
+    where_clause, where_params = get_period_where(start_date, end_date)
+    items_source = get_items_source(cursor, start_date, end_date)
+    cursor.execute(f"SELECT MAX(id), COUNT(*) FROM {items_source} WHERE {where_clause}", where_params)
+    last_item_id, item_count = cursor.fetchone()
+    if not force and is_period_unchanged(cursor, period, last_item_id, item_count, [markdown_file, html_file]):
+        print(f"{report_name}无新增数据，跳过生成：{markdown_file}")
+        with open(markdown_file, 'r', encoding='utf-8') as f:
+            return markdown_file, f.read()
+    
+    # 从数据库中获取周期内的数据泄露信息，时间转换为北京时间展示
+    time_expr, order_clause = get_item_order()
+    cursor.execute(f"SELECT title, link, datetime({time_expr}, 'unixepoch', '+8 hours'), site_name FROM {items_source} WHERE {where_clause} {order_clause}", where_params)
     data_leaks = cursor.fetchall()
     
     # 获取统计信息
-    statistics = get_data_statistics(cursor, report_type="daily")
+    statistics = get_data_statistics(cursor, report_type=period_type, start_date=start_date, end_date=end_date)
     
-    # 生成markdown内容
-    markdown_content = f"# 数据泄露监控日报 {current_date}\n\n"
-    markdown_content += f"共收集到 {statistics['total_count']} 条数据泄露相关信息\n"
-    markdown_content += f"最后更新时间：{current_time}\n\n"
+    # 生成markdown内容，月报等大周期条目较多，先收集片段再统一拼接
+    markdown_parts = [
+        f"# 数据泄露监控{report_name} {display_date}\n\n",
+        f"共收集到 {statistics['total_count']} 条数据泄露相关信息\n",
+        f"最后更新时间：{current_time}\n\n",
+        # 添加统计信息
+        f"## {statistics_title}\n\n"
+    ]
     
-    # 添加统计信息
-    markdown_content += "## 今日统计\n\n"
+    # 按日期统计
+    if statistics.get('by_date'):
+        markdown_parts.append("### 按日期统计\n")
+        for date, count in statistics['by_date']:
+            markdown_parts.append(f"- {date}: {count} 条\n")
+        markdown_parts.append("\n")
     
     # 按数据源统计
-    markdown_content += "### 按数据源统计\n"
+    markdown_parts.append("### 按数据源统计\n")
     for source, count in statistics['by_source']:
-        markdown_content += f"- {source}: {count} 条\n"
-    markdown_content += "\n"
+        markdown_parts.append(f"- {source or '未知'}: {count} 条\n")
+    markdown_parts.append("\n")
     
     # 按小时统计
-    markdown_content += "### 按小时统计\n"
-    for hour, count in statistics['by_hour']:
-        markdown_content += f"- {hour}:00: {count} 条\n"
-    markdown_content += "\n"
+    if statistics.get('by_hour'):
+        markdown_parts.append("### 按小时统计\n")
+        for hour, count in statistics['by_hour']:
+            markdown_parts.append(f"- {hour}:00: {count} 条\n")
+        markdown_parts.append("\n")
     
     # 准备数据泄露信息，用于HTML模板
     leak_list = []
     for leak in data_leaks:
         title, link, timestamp, site_name = leak
-        markdown_content += f"## [{title}]({link})\n"
-        markdown_content += f"发布时间：{timestamp}\n"
-        markdown_content += f"来源站点：{site_name}\n\n"
+        markdown_parts.append(f"## [{title}]({link})\n发布时间：{timestamp}\n来源站点：{site_name}\n\n")
         
         # 暂时不进行实时可用性检查，避免生成报告时卡住
         # is_available = check_site_availability(site_name)
@@ -911,218 +3405,199 @@ def generate_daily_report(cursor):
         })
     
     # 添加Power By信息（纯markdown格式，避免HTML标签在Discord中显示为文本）
-    markdown_content += f"---\n"
-    markdown_content += f"Power By 东方隐侠安全团队·Anonymous@ [隐侠安全客栈](https://www.dfyxsec.com/)\n"
-    markdown_content += f"---\n"
+    markdown_parts.append("---\n")
+    markdown_parts.append("Power By 东方隐侠安全团队·Anonymous@ [隐侠安全客栈](https://www.dfyxsec.com/)\n")
+    markdown_parts.append("---\n")
+    markdown_content = ''.join(markdown_parts)
     
     # 写入markdown文件
-    markdown_file = f'{archive_dir}/Daily_{current_date}.md'
     is_update = os.path.exists(markdown_file)
-    with open(markdown_file, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    write_file_if_changed(markdown_file, markdown_content)
     
     if is_update:
-        print(f"Markdown日报已更新：{markdown_file}")
+        print(f"Markdown{report_name}已更新：{markdown_file}")
     else:
-        print(f"Markdown日报已生成：{markdown_file}")
+        print(f"Markdown{report_name}已生成：{markdown_file}")
     
     # 生成HTML内容
     try:
-        # 读取HTML模板
-        with open('template.html', 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
         # 渲染HTML模板
-        template = Template(template_content)
+        template = get_report_template()
         html_content = template.render(
-            date=current_date,
+            date=display_date,
             count=statistics['total_count'],
             update_time=current_time,
             articles=leak_list,
-            statistics=statistics
+            statistics=statistics,
+            stylesheet=static_asset_url('report.css', html_file)
         )
+        html_content = finalize_html(html_content)
         
         # 写入HTML文件
-        html_file = f'{archive_dir}/Daily_{current_date}.html'
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        write_file_if_changed(html_file, html_content)
         
         if is_update:
-            print(f"HTML日报已更新：{html_file}")
+            print(f"HTML{report_name}已更新：{html_file}")
         else:
-            print(f"HTML日报已生成：{html_file}")
+            print(f"HTML{report_name}已生成：{html_file}")
         
         # 更新index.html
-        update_index_html(current_date, leak_list, len(data_leaks))
+        if update_index:
+            update_index_html(start_date, leak_list, statistics['total_count'])
+        
+        # 记录本次渲染状态，下次无新增数据时跳过
+        save_report_state(cursor, period, last_item_id, item_count)
         
-        # Discard推送日报
+        # Discard推送日报、周报
         config = load_config()
         push_config = config.get('push', {})
-        if 'discard' in push_config and push_config['discard'].get('switch', '') == "ON" and push_config['discard'].get('send_daily_report', '') == "ON":
+        push_switch = {"daily": "send_daily_report", "weekly": "send_weekly_report"}.get(period_type)
+        if send_push and push_switch and 'discard' in push_config and push_config['discard'].get('switch', '') == "ON" and push_config['discard'].get(push_switch, '') == "ON":
             send_discard_msg(
                 push_config['discard'].get('webhook'),
-                f"数据泄露监控日报 {current_date}",
-                f"共收集到 {len(data_leaks)} 条数据泄露相关信息",
-                is_daily_report=True,
+                f"数据泄露监控{report_name} {display_date}",
+                f"共收集到 {statistics['total_count']} 条数据泄露相关信息",
+                is_daily_report=period_type == "daily",
+                is_weekly_report=period_type == "weekly",
                 html_file=html_file,
                 markdown_content=markdown_content
             )
         
     except Exception as e:
-        print(f"生成HTML日报失败：{str(e)}")
+        print(f"生成HTML{report_name}失败：{str(e)}")
     
     return markdown_file, markdown_content
 
+# 生成日报
+def generate_daily_report(cursor, force=False, report_date=None, update_index=True, send_push=True):
+    """
+    生成日报
+    
+    Args:
+        cursor: 数据库游标
+        force: 是否忽略增量状态强制重新生成
+        report_date: 报告日期（YYYY-MM-DD），默认北京时间当天
+        update_index: 是否更新index.html（批量重建时最后统一更新）
+        send_push: 是否按配置推送日报
+        
+    Returns:
+        tuple: (markdown_file, markdown_content) 日报文件路径和内容
+    """
+    return generate_period_report(cursor, "daily", report_date, force=force, update_index=update_index, send_push=send_push)
+
 # 生成周报
-# 生成周报
-def generate_weekly_report(cursor):
+def generate_weekly_report(cursor, report_date=None, update_index=True, send_push=True, force=False):
     """
     生成周报
     
     Args:
         cursor: 数据库游标
+        report_date: 周内任意一天（YYYY-MM-DD），默认本周
+        update_index: 是否更新index.html（批量重建时最后统一更新）
+        send_push: 是否按配置推送周报
+        force: 是否忽略增量状态强制重新生成
         
     Returns:
         tuple: (markdown_file, markdown_content) 周报文件路径和内容
     """
-    print("开始生成周报...")
-    
-    # 获取当前日期和时间
-    current_date = time.strftime("%Y-%m-%d", time.localtime())
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    
-    # 获取本周的开始和结束日期（周一到周日）
-    cursor.execute("SELECT date('now', 'start of week', '+1 day') as start_date, date('now', 'start of week', '+7 days') as end_date")
-    result = cursor.fetchone()
-    if result:
-        start_date, end_date = result
-    else:
-        # 如果获取失败，使用当前日期作为默认值
-        start_date = current_date
-        end_date = current_date
-    
-    # 确保日期不为None
-    start_date = start_date or current_date
-    end_date = end_date or current_date
-    
-    # 创建目录结构
-    archive_dir = f'archive/Weekly_{start_date}'
-    os.makedirs(archive_dir, exist_ok=True)
-    
-    # 从数据库中获取本周的所有数据泄露信息，包含来源站点
-    cursor.execute("SELECT title, link, timestamp, site_name FROM items WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp DESC", (start_date, end_date))
-    data_leaks = cursor.fetchall()
-    
-    # 获取统计信息
-    statistics = get_data_statistics(cursor, report_type="weekly")
-    
-    # 生成markdown内容
-    markdown_content = f'# 数据泄露监控周报 {start_date} - {end_date}'
+    return generate_period_report(cursor, "weekly", report_date, force=force, update_index=update_index, send_push=send_push)
 
-    markdown_content += f'共收集到 {statistics["total_count"]} 条数据泄露相关信息'
-    markdown_content += f'最后更新时间：{current_time}'
+# 生成月报
+def generate_monthly_report(cursor, report_date=None, update_index=True, force=False):
+    return generate_period_report(cursor, "monthly", report_date, force=force, update_index=update_index, send_push=False)
 
-    
-    # 添加统计信息
-    markdown_content += "## 本周统计\n\n"
-    
-    # 按日期统计
-    markdown_content += "### 按日期统计\n"
-    for date, count in statistics["by_date"]:
-        markdown_content += f'- {date}: {count} 条\n'
-    markdown_content += "\n"
-    
-    # 按数据源统计
-    markdown_content += "### 按数据源统计\n"
-    for source, count in statistics["by_source"]:
-        markdown_content += f'- {source}: {count} 条\n'
-    markdown_content += "\n"
-    
-    # 准备数据泄露信息，用于HTML模板
-    leak_list = []
-    for leak in data_leaks:
-        title, link, timestamp, site_name = leak
-        markdown_content += f'## [{title}]({link})'
-        markdown_content += f'发布时间：{timestamp}'
-        markdown_content += f'来源站点：{site_name}'
+# 静态站点搜索索引
+SEARCH_DIR = 'search'
+SEARCH_TOKEN_BUCKETS = 64
+SEARCH_CJK_RUN = re.compile(f'[{CJK_CHARS}]+|[^{CJK_CHARS}]+')
+SEARCH_CJK_CHAR = re.compile(f'[{CJK_CHARS}]')
+SEARCH_WORD = re.compile(r'[^\W_]+')
 
-        
-        # 暂时不进行实时可用性检查，避免生成报告时卡住
-        # is_available = check_site_availability(site_name)
-        # 默认为True，后续可以考虑异步或定时检查
-        is_available = True
-        
-        # 添加到数据泄露信息列表
-        leak_list.append({
-            'title': title,
-            'link': link,
-            'timestamp': timestamp,
-            'site_name': site_name,
-            'is_available': is_available
-        })
-    
-    # 添加Power By信息
-    markdown_content += f'---'
-    markdown_content += f'Power By 东方隐侠安全团队·Anonymous@ [隐侠安全客栈](https://www.dfyxsec.com/)'
-    markdown_content += f'---'
-    
-    # 写入markdown文件
-    markdown_file = f'archive/Weekly_{start_date}_{end_date}.md'
-    is_update = os.path.exists(markdown_file)
-    with open(markdown_file, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+# 搜索分词，规则与static/search.js保持一致：拉丁/西里尔等按单词切分，中日韩文字按二元组切分
+def tokenize_search_text(text):
+    tokens = []
+    for word in SEARCH_WORD.findall((text or '').lower()):
+        for run in SEARCH_CJK_RUN.findall(word):
+            if SEARCH_CJK_CHAR.match(run):
+                if len(run) == 1:
+                    tokens.append(run)
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            elif len(run) >= 2:
+                tokens.append(run[:32])
+    return list(dict.fromkeys(tokens))
+
+# 计算token所在的分桶（FNV-1a 32位哈希）
+def search_token_bucket(token):
+    token_hash = 0x811c9dc5
+    for byte in token.encode('utf-8'):
+        token_hash = ((token_hash ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return f"{token_hash % SEARCH_TOKEN_BUCKETS:02x}"
+
+# 生成静态站点搜索索引
+@timed('tracker_report_duration_seconds', 'report.{report}', report='search_index')
+def generate_search_index(cursor, force=False):
+    """
+    为全部归档数据生成客户端搜索索引：
+    - search/months/YYYY-MM.json：按月分片的条目（标题、站点、日期、链接）和 token → 条目下标 的倒排表
+    - search/tokens/NN.json：按token哈希分桶的 token → 月份列表，浏览器只需加载查询词所在的分桶和月份分片
+    - search/manifest.json：分桶数量和各月份条目数
+    只有数据发生变化的月份会重新查询和生成
     
-    if is_update:
-        print(f'Markdown周报已更新：{markdown_file}')
-    else:
-        print(f'Markdown周报已生成：{markdown_file}')
+    Args:
+        cursor: 数据库游标
+        force: 是否忽略增量状态重新生成所有月份
+    """
+    print("开始生成搜索索引...")
+    months_dir = f'{SEARCH_DIR}/months'
+    tokens_dir = f'{SEARCH_DIR}/tokens'
+    os.makedirs(months_dir, exist_ok=True)
+    os.makedirs(tokens_dir, exist_ok=True)
     
-    # 生成HTML内容
-    try:
-        # 读取HTML模板
-        with open('template.html', 'r', encoding='utf-8') as f:
-            template_content = f.read()
-        
-        # 渲染HTML模板
-        template = Template(template_content)
-        html_content = template.render(
-            date=f'{start_date} - {end_date}',
-            count=statistics["total_count"],
-            update_time=current_time,
-            articles=leak_list,
-            statistics=statistics
-        )
-        
-        # 写入HTML文件
-        html_file = f'archive/Weekly_{start_date}_{end_date}.html'
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+    cursor.execute("SELECT substr(day, 1, 7) AS month, SUM(count) FROM item_rollup GROUP BY month HAVING SUM(count) > 0 ORDER BY month")
+    months = cursor.fetchall()
+    
+    token_months = {}
+    rebuilt = 0
+    for month, _ in months:
+        period_range = get_period_range("monthly", month)
+        shard_file = f'{months_dir}/{month}.json'
+        where_clause, where_params = get_period_where(period_range['start_date'], period_range['end_date'])
+        items_source = get_items_source(cursor, period_range['start_date'], period_range['end_date'])
+        cursor.execute(f"SELECT MAX(id), COUNT(*) FROM {items_source} WHERE {where_clause}", where_params)
+        last_item_id, item_count = cursor.fetchone()
+        period = f"search:{month}"
         
-        if is_update:
-            print(f'HTML周报已更新：{html_file}')
+        if not force and is_period_unchanged(cursor, period, last_item_id, item_count, [shard_file]):
+            # 未变化的月份直接复用已生成分片中的token
+            with open(shard_file, 'r', encoding='utf-8') as f:
+                shard_tokens = json.load(f)['index'].keys()
         else:
-            print(f'HTML周报已生成：{html_file}')
-        
-        # 更新index.html
-        update_index_html(current_date, leak_list, statistics["total_count"])
-        
-        # Discard推送周报
-        config = load_config()
-        push_config = config.get('push', {})
-        if 'discard' in push_config and push_config['discard'].get('switch', '') == "ON" and push_config['discard'].get('send_weekly_report', '') == "ON":
-            send_discard_msg(
-                push_config['discard'].get('webhook'),
-                f'数据泄露监控周报 {start_date} - {end_date}',
-                f'共收集到 {statistics["total_count"]} 条数据泄露相关信息',
-                is_weekly_report=True,
-                html_file=html_file,
-                markdown_content=markdown_content
-            )
+            cursor.execute(f"SELECT title, site_name, date(timestamp, '+8 hours'), link FROM {items_source} WHERE {where_clause} ORDER BY timestamp DESC", where_params)
+            shard_items = []
+            shard_index = {}
+            for position, (title, site_name, day, link) in enumerate(cursor.fetchall()):
+                shard_items.append([title, site_name, day, link])
+                for token in tokenize_search_text(f"{title} {site_name or ''}"):
+                    shard_index.setdefault(token, []).append(position)
+            shard = {'month': month, 'items': shard_items, 'index': shard_index}
+            write_file_if_changed(shard_file, json.dumps(shard, ensure_ascii=False, separators=(',', ':')))
+            save_report_state(cursor, period, last_item_id, item_count)
+            shard_tokens = shard_index.keys()
+            rebuilt += 1
         
-    except Exception as e:
-        print(f'生成HTML周报失败：{str(e)}')
+        for token in shard_tokens:
+            token_months.setdefault(token, []).append(month)
     
-    return markdown_file, markdown_content
+    # 按token分桶写入 token → 月份 映射（最近的月份在前）
+    buckets = {f"{i:02x}": {} for i in range(SEARCH_TOKEN_BUCKETS)}
+    for token, token_month_list in token_months.items():
+        buckets[search_token_bucket(token)][token] = sorted(token_month_list, reverse=True)
+    for bucket, bucket_tokens in buckets.items():
+        write_file_if_changed(f'{tokens_dir}/{bucket}.json', json.dumps(bucket_tokens, ensure_ascii=False, separators=(',', ':'), sort_keys=True))
+    
+    manifest = {'version': 1, 'buckets': SEARCH_TOKEN_BUCKETS, 'months': {month: count for month, count in months}}
+    write_file_if_changed(f'{SEARCH_DIR}/manifest.json', json.dumps(manifest, ensure_ascii=False, separators=(',', ':')))
+    print(f"搜索索引已生成：{len(months)} 个月份分片（重新生成 {rebuilt} 个），{len(token_months)} 个token")
 
 def update_index_html(current_date, article_list, count):
     print("更新index.html...")
@@ -1134,484 +3609,29 @@ def update_index_html(current_date, article_list, count):
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>DarkWeb-Forums-Tracker</title>
-    <style>
-        /* 全局样式 */
-        * {
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-        }
-        
-        :root {
-            /* 终端风格配色 */
-            --bg-primary: #0a0e17;
-            --bg-secondary: #121721;
-            --bg-tertiary: #1a1f2e;
-            --bg-gradient: linear-gradient(135deg, #00ff41, #00e0ff);
-            --primary-color: #00ff41;
-            --primary-dark: #00d437;
-            --secondary-color: #00e0ff;
-            --accent-color: #ff007f;
-            --success-color: #00ff41;
-            --warning-color: #ffff00;
-            --danger-color: #ff007f;
-            --text-primary: #ffffff;
-            --text-secondary: #b0b8c1;
-            --text-muted: #6b7280;
-            --border-color: #2d3748;
-            --border-light: #222936;
-            --shadow-sm: 0 1px 2px 0 rgba(0, 255, 65, 0.1);
-            --shadow-md: 0 4px 6px -1px rgba(0, 255, 65, 0.15), 0 2px 4px -1px rgba(0, 255, 65, 0.1);
-            --shadow-lg: 0 10px 15px -3px rgba(0, 255, 65, 0.2), 0 4px 6px -2px rgba(0, 255, 65, 0.1);
-            --shadow-xl: 0 20px 25px -5px rgba(0, 255, 65, 0.25), 0 10px 10px -5px rgba(0, 255, 65, 0.15);
-            --shadow-2xl: 0 25px 50px -12px rgba(0, 255, 65, 0.3);
-            --radius-sm: 4px;
-            --radius-md: 6px;
-            --radius-lg: 8px;
-            --radius-xl: 10px;
-            --radius-2xl: 12px;
-            --transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        }
-        
-        body {
-            font-family: 'Courier New', Courier, 'Consolas', 'Monaco', 'Ubuntu Mono', monospace;
-            line-height: 1.7;
-            color: var(--text-primary);
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: var(--bg-secondary);
-            background-image: 
-                radial-gradient(circle at 10% 20%, rgba(0, 255, 65, 0.05) 0%, rgba(0, 255, 65, 0.05) 90%),
-                radial-gradient(circle at 90% 80%, rgba(0, 224, 255, 0.05) 0%, rgba(0, 224, 255, 0.05) 90%);
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-        }
-        
-        main {
-            flex: 1;
-        }
-        
-        /* 标题样式 */
-        h1 {
-            font-size: 2.5rem;
-            font-weight: 800;
-            color: var(--text-primary);
-            margin: 0;
-            line-height: 1.2;
-        }
-        
-        /* 头部标题样式 */
-        header h1 {
-            color: white;
-            text-shadow: 0 2px 4px rgba(0, 0, 0, 0.2);
-            background: none;
-            -webkit-background-clip: none;
-            -webkit-text-fill-color: white;
-        }
-        
-        h2 {
-            font-size: 1.75rem;
-            font-weight: 700;
-            color: var(--text-primary);
-            margin-bottom: 24px;
-        }
-        
-        /* 头部样式 */
-        header {
-            background: var(--bg-primary);
-            color: var(--primary-color);
-            padding: 24px 32px;
-            border: 1px solid var(--primary-color);
-            box-shadow: 0 0 15px rgba(0, 255, 65, 0.2);
-            text-align: center;
-            margin-bottom: 32px;
-            position: relative;
-            overflow: hidden;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }
-        
-        header::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            height: 2px;
-            background: linear-gradient(to right, transparent, var(--primary-color), transparent);
-            animation: scanline 2s linear infinite;
-        }
-        
-        @keyframes scanline {
-            0% {
-                transform: translateX(-100%);
-            }
-            100% {
-                transform: translateX(100%);
-            }
-        }
-        
-        header > * {
-            position: relative;
-            z-index: 1;
-        }
-        
-        header h1 {
-            color: var(--primary-color);
-            text-shadow: 0 0 10px rgba(0, 255, 65, 0.5);
-            margin: 0;
-            font-size: 2.25rem;
-        }
-        
-        header p {
-            margin-top: 16px;
-            font-size: 1.1rem;
-            color: var(--secondary-color);
-            font-weight: 500;
-            line-height: 1.5;
-        }
-        
-        /* 终端风格标题装饰 */
-        .terminal-header {
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            gap: 12px;
-            margin-bottom: 16px;
-        }
-        
-        .terminal-header::before,
-        .terminal-header::after {
-            content: '▬';
-            color: var(--primary-color);
-            font-size: 1.5rem;
-            flex: 1;
-            text-align: center;
-            letter-spacing: -2px;
-        }
-        
-        /* 报告列表样式 */
-        .report-list {
-            list-style: none;
-            padding: 0;
-            background: var(--bg-primary);
-            border: 1px solid var(--border-color);
-            box-shadow: 0 0 15px rgba(0, 255, 65, 0.1);
-        }
-        
-        .report-item {
-            background-color: var(--bg-primary);
-            padding: 12px 20px;
-            border-bottom: 1px solid var(--border-light);
-            transition: var(--transition);
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            position: relative;
-            overflow: hidden;
-            font-family: 'Courier New', monospace;
-        }
-        
-        .report-item:last-child {
-            border-bottom: none;
-        }
-        
-        .report-item:hover {
-            background-color: var(--bg-secondary);
-            border-color: var(--primary-color);
-            transform: translateX(4px);
-        }
-        
-        .report-link {
-            color: var(--secondary-color);
-            text-decoration: none;
-            font-size: 1.25rem;
-            font-weight: 700;
-            transition: var(--transition);
-            flex: 1;
-            position: relative;
-            font-family: 'Courier New', monospace;
-        }
-        
-        .report-link::before {
-            content: '📄';
-            margin-right: 8px;
-            color: var(--primary-color);
-        }
-        
-        .report-link:hover {
-            color: var(--primary-color);
-            text-decoration: none;
-            text-shadow: 0 0 8px rgba(0, 255, 65, 0.4);
-        }
-        
-        .report-info {
-            color: var(--text-secondary);
-            font-size: 0.875rem;
-            margin-top: 4px;
-            font-family: 'Courier New', monospace;
-        }
-        
-        .report-count {
-            background: var(--bg-primary);
-            color: var(--primary-color);
-            padding: 8px 16px;
-            border: 1px solid var(--primary-color);
-            font-size: 0.875rem;
-            font-weight: 600;
-            margin-left: 20px;
-            min-width: 80px;
-            text-align: center;
-            box-shadow: 0 0 10px rgba(0, 255, 65, 0.1);
-            transition: var(--transition);
-            font-family: 'Courier New', monospace;
-            text-shadow: 0 0 5px rgba(0, 255, 65, 0.5);
-        }
-        
-        .report-item:hover .report-count {
-            background: var(--primary-color);
-            color: var(--bg-primary);
-            box-shadow: 0 0 15px rgba(0, 255, 65, 0.3);
-            transform: scale(1.05);
-        }
-        
-        /* 空状态样式 */
-        .empty-state {
-            text-align: center;
-            padding: 80px 20px;
-            color: var(--text-muted);
-            background-color: var(--bg-primary);
-            border: 1px dashed var(--border-color);
-            margin-top: 24px;
-            font-family: 'Courier New', monospace;
-        }
-        
-        .empty-state h3 {
-            font-size: 1.5rem;
-            margin-bottom: 12px;
-            color: var(--secondary-color);
-            font-weight: 600;
-        }
-        
-        .empty-state p {
-            font-size: 1rem;
-            line-height: 1.6;
-        }
-        
-        /* 页脚样式 */
-        footer {
-            text-align: center;
-            margin-top: 64px;
-            padding: 24px;
-            color: var(--text-primary);
-            font-size: 0.9rem;
-            font-family: 'Courier New', monospace;
-        }
-        
-        footer p {
-            margin: 0;
-            line-height: 1.6;
-        }
-        
-        footer a {
-            color: var(--primary-color);
-            text-decoration: none;
-            transition: color 0.3s ease, text-decoration 0.3s ease;
-            font-weight: 500;
-        }
-        
-        footer a:hover {
-            color: var(--primary-dark);
-            text-decoration: underline;
-        }
-        
-        /* 响应式设计 */
-        @media (max-width: 768px) {
-            body {
-                padding: 16px;
-            }
-            
-            h1 {
-                font-size: 2rem;
-            }
-            
-            h2 {
-                font-size: 1.5rem;
-            }
-            
-            header {
-                padding: 32px 24px;
-                margin-bottom: 24px;
-            }
-            
-            header p {
-                font-size: 1.1rem;
-            }
-            
-            .report-item {
-                padding: 20px;
-                margin-bottom: 16px;
-                flex-direction: column;
-                align-items: flex-start;
-                gap: 12px;
-            }
-            
-            .report-link {
-                font-size: 1.15rem;
-            }
-            
-            .report-count {
-                margin-left: 0;
-                padding: 8px 14px;
-                min-width: 70px;
-                align-self: flex-end;
-            }
-            
-            .report-info {
-                font-size: 0.9rem;
-            }
-            
-            .empty-state {
-                padding: 64px 20px;
-            }
-            
-            footer {
-                margin: 48px -16px 0 -16px;
-                padding: 24px 16px;
-            }
-        }
-        
-        @media (max-width: 480px) {
-            body {
-                padding: 12px;
-            }
-            
-            h1 {
-                font-size: 1.75rem;
-            }
-            
-            h2 {
-                font-size: 1.35rem;
-            }
-            
-            header {
-                padding: 28px 20px;
-                margin-bottom: 20px;
-            }
-            
-            header p {
-                font-size: 1rem;
-            }
-            
-            .report-item {
-                padding: 18px;
-                margin-bottom: 14px;
-                flex-direction: column;
-                align-items: flex-start;
-                gap: 12px;
-            }
-            
-            .report-link {
-                font-size: 1.1rem;
-            }
-            
-            .report-count {
-                margin-left: 0;
-                padding: 8px 16px;
-                min-width: 80px;
-                align-self: flex-end;
-            }
-            
-            .report-info {
-                font-size: 0.85rem;
-            }
-            
-            .empty-state {
-                padding: 48px 16px;
-            }
-            
-            .empty-state h3 {
-                font-size: 1.25rem;
-            }
-            
-            footer {
-                margin: 40px -12px 0 -12px;
-                padding: 20px 12px;
-            }
-        }
-        
-        /* 滚动条样式 */
-        ::-webkit-scrollbar {
-            width: 12px;
-        }
-        
-        ::-webkit-scrollbar-track {
-            background: var(--bg-tertiary);
-            border-radius: 6px;
-        }
-        
-        ::-webkit-scrollbar-thumb {
-            background: linear-gradient(to bottom, var(--primary-color), var(--secondary-color));
-            border-radius: 6px;
-            border: 3px solid var(--bg-tertiary);
-            box-shadow: inset 0 0 0 1px rgba(255, 255, 255, 0.2);
-        }
-        
-        ::-webkit-scrollbar-thumb:hover {
-            background: linear-gradient(to bottom, var(--primary-dark), var(--secondary-color));
-        }
-        
-        /* Firefox滚动条样式 */
-        * {
-            scrollbar-width: thin;
-            scrollbar-color: var(--primary-color) var(--bg-tertiary);
-        }
-        
-        /* 加载动画效果 */
-        .report-item {
-            animation: fadeInUp 0.5s ease forwards;
-            opacity: 0;
-        }
-        
-        @keyframes fadeInUp {
-            from {
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .report-item:nth-child(1) { animation-delay: 0.1s; }
-        .report-item:nth-child(2) { animation-delay: 0.2s; }
-        .report-item:nth-child(3) { animation-delay: 0.3s; }
-        .report-item:nth-child(4) { animation-delay: 0.4s; }
-        .report-item:nth-child(5) { animation-delay: 0.5s; }
-        .report-item:nth-child(6) { animation-delay: 0.6s; }
-        .report-item:nth-child(7) { animation-delay: 0.7s; }
-        .report-item:nth-child(8) { animation-delay: 0.8s; }
-        .report-item:nth-child(9) { animation-delay: 0.9s; }
-        .report-item:nth-child(10) { animation-delay: 1s; }
-    </style>
+    <link rel="stylesheet" href="{{ stylesheet }}">
+    <script src="{{ search_script }}" defer></script>
 </head>
 <body>
-    <header style="border: 1px solid var(--primary-color); box-shadow: 0 0 20px rgba(0, 255, 65, 0.3); padding: 32px 24px; text-align: center; margin-bottom: 32px; border-radius: 16px; background: var(--bg-primary);">
-        <h1 style="color: var(--primary-color); text-shadow: 0 0 20px rgba(0, 255, 65, 0.8); font-size: 2.5rem; margin-bottom: 16px; font-family: 'Courier New', monospace;">DARKWEB论坛数据泄露监控系统</h1>
-        <p style="color: var(--secondary-color); font-weight: bold; text-shadow: 0 0 10px rgba(0, 224, 255, 0.5); font-size: 1.25rem; font-family: 'Courier New', monospace;">🌐 DARKWEB FORUMS TRACKER 监控报告</p>
+    <header>
+        <h1>DARKWEB论坛数据泄露监控系统</h1>
+        <p>🌐 DARKWEB FORUMS TRACKER 监控报告</p>
     </header>
     
     <main>
-        <div style="text-align: center; margin-bottom: 32px;">
-            <h2 style="color: var(--warning-color); text-shadow: 0 0 15px rgba(255, 255, 0, 0.6); font-size: 2rem; text-align: center; margin-bottom: 0; padding: 16px 32px; border: 1px solid var(--warning-color); border-radius: 12px; background: var(--bg-primary); font-family: 'Courier New', monospace; box-shadow: 0 0 15px rgba(255, 255, 0, 0.2); display: inline-block;">威 胁 情 报</h2>
+        <div class="section-title">
+            <h2>威 胁 情 报</h2>
         </div>
-        <ul class="report-list" style="list-style: none; padding: 0; margin: 0;">
+        <div class="search-box">
+            <input id="search-input" type="search" placeholder="搜索全部归档：标题、站点、公司名..." autocomplete="off">
+        </div>
+        <div id="search-status" class="search-status"></div>
+        <ul id="search-results" class="search-results"></ul>
+        <ul class="report-list">
             {% for report in reports %}
-            <li class="report-item" style="background: var(--bg-primary); border: 1px solid var(--primary-color); box-shadow: 0 0 15px rgba(0, 255, 65, 0.2); padding: 20px; margin-bottom: 20px; border-radius: 12px; transition: all 0.3s ease; display: flex; justify-content: space-between; align-items: center; text-align: center;">
-                <a href="{{ report.path }}" class="report-link" target="_blank" style="color: var(--secondary-color); text-decoration: none; font-size: 1.25rem; font-weight: bold; text-shadow: 0 0 8px rgba(0, 224, 255, 0.4); transition: all 0.3s ease; font-family: 'Courier New', monospace;">{{ report.date }}</a>
-                <div class="report-count" style="background: var(--bg-primary); color: var(--primary-color); padding: 10px 20px; border: 1px solid var(--primary-color); border-radius: 8px; font-size: 0.9rem; font-weight: bold; box-shadow: 0 0 10px rgba(0, 255, 65, 0.2); transition: all 0.3s ease; font-family: 'Courier New', monospace; text-shadow: 0 0 5px rgba(0, 255, 65, 0.5);">
+            <li class="report-item">
+                <a href="{{ report.path }}" class="report-link" target="_blank">{{ report.date }}</a>
+                <div class="report-count">
                     {{ report.count }} 条
                 </div>
             </li>
@@ -1619,15 +3639,15 @@ def update_index_html(current_date, article_list, count):
         </ul>
         
         {% if not reports %}
-        <div class="empty-state" style="text-align: center; padding: 60px 20px; background: var(--bg-primary); border: 1px solid var(--primary-color); border-radius: 12px; box-shadow: 0 0 15px rgba(0, 255, 65, 0.2); margin-top: 20px;">
-            <h3 style="color: var(--warning-color); font-size: 1.5rem; margin-bottom: 16px; font-family: 'Courier New', monospace;">暂无报告</h3>
-            <p style="color: var(--text-secondary); font-size: 1rem; font-family: 'Courier New', monospace;">报告将根据监控数据自动生成</p>
+        <div class="empty-state">
+            <h3>暂无报告</h3>
+            <p>报告将根据监控数据自动生成</p>
         </div>
         {% endif %}
     </main>
     
-    <footer style="text-align: center; margin-top: 64px; padding: 24px; color: var(--text-primary); font-size: 0.9rem; font-family: 'Courier New', monospace;">
-        <p>Power By 东方隐侠安全团队 Anonymous@ <a href="https://www.dfyxsec.com/" target="_blank" style="color: var(--primary-color); text-decoration: none; transition: all 0.3s ease; text-shadow: 0 0 5px rgba(0, 255, 65, 0.5);">隐侠安全客栈</a></p>
+    <footer>
+        <p>Power By 东方隐侠安全团队 Anonymous@ <a href="https://www.dfyxsec.com/" target="_blank">隐侠安全客栈</a></p>
     </footer>
 </body>
 </html>
@@ -1663,13 +3683,335 @@ def update_index_html(current_date, article_list, count):
     
     # 渲染index.html
     template = Template(index_template)
-    html_content = template.render(reports=reports)
+    html_content = template.render(
+        reports=reports,
+        stylesheet=static_asset_url('index.css', 'index.html'),
+        search_script=static_asset_url('search.js', 'index.html')
+    )
+    html_content = finalize_html(html_content)
+    
+    # 写入index.html文件，内容无变化时不重写
+    if write_file_if_changed('index.html', html_content):
+        print("index.html已更新")
+    else:
+        print("index.html无变化，跳过写入")
+
+# 在子进程中重建单个周期的报告
+def rebuild_report_task(report_type, report_date):
+    """
+    进程池任务：每个进程使用独立的数据库连接，重新渲染指定日期的日报或所在周的周报及RSS
+    
+    Args:
+        report_type: daily或weekly
+        report_date: 报告日期（YYYY-MM-DD）
+        
+    Returns:
+        tuple: (report_type, report_date)
+    """
+    conn = open_database()
+    try:
+        cursor = conn.cursor()
+        if report_type == "daily":
+            generate_daily_report(cursor, force=True, report_date=report_date, update_index=False, send_push=False)
+        else:
+            generate_weekly_report(cursor, report_date=report_date, update_index=False, send_push=False, force=True)
+        generate_rss_feed(cursor, feed_type=report_type, report_date=report_date, force=True)
+    finally:
+        conn.close()
+    return report_type, report_date
+
+# 重建历史报告
+def rebuild_reports(date_from, date_to, workers=None):
+    """
+    按日期范围从data_leaks.db重新生成日报、周报（Markdown、HTML、RSS），
+    各日期分散到进程池并行渲染，最后统一更新一次index.html
+    
+    Args:
+        date_from: 开始日期（YYYY-MM-DD）
+        date_to: 结束日期（YYYY-MM-DD，包含当天）
+        workers: 进程数，默认CPU核数
+    """
+    conn = init_database()
+    cursor = conn.cursor()
+    # 只重建有数据的日期，避免为空白日期生成空报告
+    cursor.execute("SELECT DISTINCT day FROM item_rollup WHERE day >= ? AND day <= ? AND count > 0 ORDER BY day", (date_from, date_to))
+    days = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    
+    weeks = sorted({get_week_range(day)[0] for day in days})
+    tasks = [("daily", day) for day in days] + [("weekly", week) for week in weeks]
+    print(f"开始重建 {date_from} 至 {date_to} 的报告：{len(days)} 份日报，{len(weeks)} 份周报")
+    
+    start_time = time.time()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(rebuild_report_task, report_type, day): (report_type, day) for report_type, day in tasks}
+        for future in as_completed(futures):
+            report_type, day = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"重建{report_type}报告失败（{day}）：{str(e)}")
+    
+    update_index_html(date_to, [], 0)
+    if load_config().get('search_index', {}).get('switch', 'ON') == 'ON':
+        conn = open_database()
+        generate_search_index(conn.cursor())
+        conn.close()
+    conn = open_database()
+    close_database(conn, checkpoint=True)
+    print(f"报告重建完成，共 {len(tasks)} 个任务，失败 {failed} 个，耗时 {time.time() - start_time:.2f} 秒")
+
+# 本地只读查询API
+
+# 单次查询最多返回的条数
+API_MAX_LIMIT = 500
+
+# 线程安全的LRU响应缓存
+class LRUCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+# 数据版本：items表已分配的最大ID和删除计数，用于ETag和缓存失效
+def get_data_version(cursor):
+    """
+    Returns:
+        str: 最大条目ID.删除计数，新数据入库、删除或归档到分段文件后都会变化
+    """
+    cursor.execute("""
+        SELECT (SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'items'),
+               (SELECT COALESCE(MAX(deleted), 0) FROM item_changes)
+    """)
+    return '.'.join(str(value) for value in cursor.fetchone())
+
+# 解析API的整数参数
+def api_int_param(params, name, default, maximum=None):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ValueError(f"参数{name}应为整数")
+    if value < 0:
+        raise ValueError(f"参数{name}不能为负数")
+    return min(value, maximum) if maximum else value
+
+# 解析API的日期参数（北京时间）
+def api_date_param(params, name, default=None):
+    value = params.get(name, default)
+    if value:
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise ValueError(f"参数{name}应为YYYY-MM-DD格式")
+    return value
+
+# GET /items?site=&since=&until=&before_id=&limit=
+def api_items(cursor, params):
+    """
+    按条目ID倒序返回数据，可按站点、入库日期（北京时间）过滤，before_id用于翻页
+    """
+    since = api_date_param(params, 'since')
+    until = api_date_param(params, 'until')
+    limit = api_int_param(params, 'limit', 50, API_MAX_LIMIT)
+    conditions, query_params = [], []
+    if params.get('site'):
+        conditions.append("site_name = ?")
+        query_params.append(params['site'])
+    if since:
+        conditions.append("timestamp >= ?")
+        query_params.append(beijing_day_start_utc(since))
+    if until:
+        conditions.append("timestamp < ?")
+        query_params.append(beijing_day_start_utc((datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')))
+    if params.get('before_id'):
+        conditions.append("id < ?")
+        query_params.append(api_int_param(params, 'before_id', 0))
+    # 指定了开始日期时才需要附加已归档的分段
+    items_source = get_items_source(cursor, since, until or beijing_today()) if since else 'items'
+    cursor.execute(f"""
+        SELECT id, title, link, site_name, category, author, datetime(timestamp, '+8 hours'), pub_ts FROM {items_source}
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY id DESC LIMIT ?
+    """, query_params + [limit])
+    items = [
+        {'id': item_id, 'title': title, 'link': link, 'site_name': site_name, 'category': category,
+         'author': author, 'time': bj_time, 'pub_ts': pub_ts}
+        for item_id, title, link, site_name, category, author, bj_time, pub_ts in cursor.fetchall()
+    ]
+    return {'items': items, 'count': len(items), 'next_before_id': items[-1]['id'] if len(items) == limit else None}
+
+# GET /stats?since=&until=
+def api_stats(cursor, params):
+    """
+    从预聚合表统计指定日期范围（北京时间，默认最近30天）的总数、各站点和每天的条目数
+    """
+    until = api_date_param(params, 'until', beijing_today())
+    since = api_date_param(params, 'since', (datetime.strptime(until, '%Y-%m-%d') - timedelta(days=29)).strftime('%Y-%m-%d'))
+    cursor.execute("SELECT site_name, SUM(count) AS total FROM item_rollup WHERE day >= ? AND day <= ? GROUP BY site_name HAVING total > 0 ORDER BY total DESC", (since, until))
+    by_site = dict(cursor.fetchall())
+    cursor.execute("SELECT day, SUM(count) FROM item_rollup WHERE day >= ? AND day <= ? GROUP BY day HAVING SUM(count) > 0 ORDER BY day", (since, until))
+    by_day = dict(cursor.fetchall())
+    return {'since': since, 'until': until, 'total': sum(by_site.values()), 'by_site': by_site, 'by_day': by_day}
+
+# GET /search?q=&site=&since=&limit=
+def api_search(cursor, params):
+    if not params.get('q'):
+        raise ValueError("缺少检索词参数q")
+    results = search_items(cursor, params['q'], site=params.get('site'), since=api_date_param(params, 'since'),
+                           limit=api_int_param(params, 'limit', 20, API_MAX_LIMIT))
+    return {'results': [
+        {'title': title, 'link': link, 'site_name': site_name, 'time': bj_time, 'snippet': snippet}
+        for title, link, site_name, bj_time, snippet in results
+    ]}
+
+API_ROUTES = {
+    '/items': api_items,
+    '/stats': api_stats,
+    '/search': api_search,
+}
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server_version = f"DarkWeb-Forums-Tracker/{__version__}"
+    # 支持keep-alive，所有响应都带Content-Length
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文分两次写出，关闭Nagle算法避免与延迟确认叠加出40ms的等待
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            body = METRICS.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        handler = API_ROUTES.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            self._send_json(404, {'error': f"未知的接口：{url.path}", 'endpoints': sorted(API_ROUTES) + ['/metrics']})
+            return
+        params = dict(parse_qsl(url.query))
+        cursor = self.server.get_cursor()
+        try:
+            version = get_data_version(cursor)
+        except sqlite3.Error as e:
+            self._send_json(503, {'error': f"数据库不可用：{str(e)}"})
+            return
+        # 响应由接口、参数、北京时间日期（默认日期范围）和数据版本唯一确定
+        cache_key = (url.path, tuple(sorted(params.items())), beijing_today())
+        etag = f'"{version}-{zlib.crc32(repr(cache_key).encode("utf-8")):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = self.server.get_cached(cache_key, version)
+        if body is None:
+            try:
+                data = handler(cursor, params)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            except sqlite3.Error as e:
+                self._send_json(500, {'error': f"查询失败：{str(e)}"})
+                return
+            body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.server.put_cached(cache_key, version, body)
+        self._send_body(200, body, etag)
+    
+    def _send_json(self, status, data):
+        self._send_body(status, json.dumps(data, ensure_ascii=False).encode('utf-8'))
     
-    # 写入index.html文件
-    with open('index.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    def _send_body(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
     
-    print("index.html已更新")
+    def log_message(self, format, *args):
+        # 高并发时逐条打印访问日志开销较大，只记录错误
+        pass
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    每个请求线程使用自己的只读连接（WAL模式下不阻塞采集写入），
+    响应按数据版本缓存，发现新数据入库后清空缓存；版本检查和缓存读写在同一把锁内进行，
+    避免请求线程交错时旧版本的响应写入新版本的缓存
+    """
+    daemon_threads = True
+    
+    def __init__(self, address, cache_size=256):
+        super().__init__(address, ApiRequestHandler)
+        self.cache = LRUCache(cache_size)
+        self._local = threading.local()
+        self._version = None
+        self._cache_lock = threading.Lock()
+    
+    def get_cursor(self):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = open_database(read_only=True).cursor()
+        return cursor
+    
+    def get_cached(self, cache_key, version):
+        with self._cache_lock:
+            if version != self._version:
+                self.cache.clear()
+                self._version = version
+            return self.cache.get((cache_key, version))
+    
+    def put_cached(self, cache_key, version, body):
+        # 生成响应期间数据版本已变化时不再缓存旧版本的响应
+        with self._cache_lock:
+            if version == self._version:
+                self.cache.put((cache_key, version), body)
+
+# 启动查询API
+def start_api_server(host='127.0.0.1', port=8080, cache_size=256, background=False):
+    """
+    Args:
+        background: 是否在后台线程中运行（循环执行模式下与采集同时运行）
+        
+    Returns:
+        ApiServer: 后台运行时返回server，前台运行时阻塞直到中断
+    """
+    server = ApiServer((host, port), cache_size)
+    print(f"查询API已启动：http://{host}:{port}/items、/stats、/search")
+    if background:
+        threading.Thread(target=server.serve_forever, name='ApiServer', daemon=True).start()
+        return server
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return server
 
 # Telegram Bot推送
 def tgbot(text, msg, token, group_id):
@@ -1720,10 +4062,116 @@ def main():
     parser = argparse.ArgumentParser(description='数据泄露监控脚本')
     parser.add_argument('--once', action='store_true', help='只执行一次，适合GitHub Action运行')
     parser.add_argument('--daily-report', action='store_true', help='生成日报模式，只生成日报不推送')
+    parser.add_argument('--rebuild', nargs=2, metavar=('FROM', 'TO'), help='重建指定日期范围（YYYY-MM-DD）的日报、周报和RSS，不推送')
+    parser.add_argument('--workers', type=int, default=None, help='重建报告或回放feed时使用的进程数，默认CPU核数')
+    parser.add_argument('--replay', nargs='+', metavar='FILE', help='回放已保存的RSS/Atom文件入库（需配合--site），不推送')
+    parser.add_argument('--engine', choices=['xenforo', 'mybb', 'ipb'], help='配合--replay使用，指定论坛程序，默认自动识别')
+    parser.add_argument('--report', choices=['daily', 'weekly', 'monthly'], help='只生成指定周期的报告，不采集不推送')
+    parser.add_argument('--date', help='配合--report使用，周期内任意一天（YYYY-MM-DD），月报可用YYYY-MM，默认北京时间当天')
+    parser.add_argument('--range', nargs=2, metavar=('FROM', 'TO'), help='生成自定义日期范围（YYYY-MM-DD）的报告，不采集不推送')
+    parser.add_argument('--search', metavar='QUERY', help='全文检索标题、正文和下载链接，按相关度输出结果')
+    parser.add_argument('--site', help='配合--search使用时只检索指定站点；配合--replay使用时为回放数据的数据源名称')
+    parser.add_argument('--since', help='配合--search使用，只检索该日期（YYYY-MM-DD）之后的数据')
+    parser.add_argument('--limit', type=int, default=20, help='配合--search使用，最多输出条数，默认20')
+    parser.add_argument('--export-delta', action='store_true', help='将上次导出之后新入库的数据追加导出到deltas/下的NDJSON.gz文件')
+    parser.add_argument('--import-delta', nargs='*', metavar='FILE', help='从增量文件重建或补齐data_leaks.db，默认导入deltas/下的全部文件')
+    parser.add_argument('--export-parquet', nargs='?', const=PARQUET_DIR, metavar='DIR', help='将条目按月份和站点分区导出为Parquet文件（默认parquet/），只导出上次之后新增的数据')
+    parser.add_argument('--with-content', action='store_true', help='配合--export-parquet使用，同时导出正文HTML和下载链接')
+    parser.add_argument('--serve', action='store_true', help='只启动本地只读查询API（/items、/stats、/search），不采集')
+    parser.add_argument('--profile', action='store_true', help='分阶段计时，每轮输出耗时汇总表并在profile/下保存JSON trace')
+    parser.add_argument('--profile-cprofile', action='store_true', help='配合--profile使用，同时用cProfile做函数级分析并保存.prof文件')
+    parser.add_argument('--profile-memory', action='store_true', help='配合--profile使用，同时用tracemalloc记录内存峰值和分配最多的代码行')
     args = parser.parse_args()
+    PROFILER.configure(args.profile, args.profile_cprofile, args.profile_memory)
+    
+    if args.serve:
+        api_config = load_config()['api_server']
+        init_database().close()
+        start_api_server(api_config['host'], api_config['port'], api_config['cache_size'])
+        return
+    
+    if args.export_parquet:
+        conn = open_database(read_only=True)
+        try:
+            export_parquet(conn.cursor(), args.export_parquet, with_content=args.with_content)
+        finally:
+            conn.close()
+        return
+    
+    if args.import_delta is not None:
+        conn = init_database()
+        try:
+            import_deltas(conn, args.import_delta)
+        finally:
+            close_database(conn, checkpoint=True)
+        return
+    
+    if args.export_delta:
+        conn = init_database()
+        try:
+            export_delta(conn.cursor())
+        finally:
+            close_database(conn, checkpoint=True)
+        return
+    
+    if args.replay:
+        if not args.site:
+            print("回放feed需要通过--site指定数据源名称")
+            return
+        replay_feed_archives(args.replay, args.site, engine=args.engine, workers=args.workers)
+        return
+    
+    if args.search:
+        try:
+            conn = open_database(read_only=True)
+        except sqlite3.OperationalError as e:
+            print(f"打开数据库失败：{str(e)}")
+            return
+        try:
+            start_time = time.time()
+            results = search_items(conn.cursor(), args.search, site=args.site, since=args.since, limit=args.limit)
+            for title, link, site_name, bj_time, snippet in results:
+                print(f"[{bj_time}] [{site_name}] {title}\n  {link}\n  {snippet}\n")
+            print(f"共 {len(results)} 条结果，耗时 {(time.time() - start_time) * 1000:.1f} 毫秒")
+        except ValueError:
+            print("日期格式错误，应为YYYY-MM-DD")
+        except sqlite3.OperationalError as e:
+            print(f"检索失败：{str(e)}")
+        finally:
+            conn.close()
+        return
+    
+    if args.report or args.range:
+        conn = init_database()
+        PROFILER.start_cycle()
+        try:
+            if args.range:
+                generate_period_report(conn.cursor(), "range", args.range[0], args.range[1], force=True, send_push=False)
+            else:
+                generate_period_report(conn.cursor(), args.report, args.date, force=True, send_push=False)
+        except ValueError as e:
+            print(f"生成报告失败：{str(e)}")
+        finally:
+            close_database(conn, checkpoint=True)
+            PROFILER.end_cycle('report')
+        return
     
+    if args.rebuild:
+        date_from, date_to = args.rebuild
+        try:
+            for day in (date_from, date_to):
+                datetime.strptime(day, '%Y-%m-%d')
+        except ValueError:
+            print("日期格式错误，应为YYYY-MM-DD")
+            return
+        rebuild_reports(date_from, date_to, workers=args.workers)
+        return
+    
+    # 采集使用唯一的写连接，报告生成使用独立连接，WAL模式下互不阻塞
     conn = init_database()
     cursor = conn.cursor()
+    report_conn = open_database()
+    report_cursor = report_conn.cursor()
     rss_config = {}
 
     try:
@@ -1731,12 +4179,20 @@ def main():
             rss_config = yaml.load(file, Loader=yaml.FullLoader)
     except Exception as e:
         print(f"加载rss_dataleak.yaml文件出错: {str(e)}")
+        report_conn.close()
         conn.close()
         return
 
     # 加载数据源开关配置
     config = load_config()
     datasources_config = config.get('datasources', {})
+    search_index_enabled = config.get('search_index', {}).get('switch', 'ON') == 'ON'
+    # 为升级前入库的近期数据回填近似重复聚类
+    if config['dedup']['switch'] == 'ON':
+        backfill_item_clusters(cursor, config['dedup']['window_days'], config['dedup']['max_distance'])
+    # 已结束的月份归档到分段文件，热库只保留最近几个月
+    if config['archive']['switch'] == 'ON':
+        archive_closed_months(conn, config['archive']['hot_months'])
     
     # 输出已开启监控的数据源
     enabled_datasources = [source for source, enabled in datasources_config.items() if enabled == 1]
@@ -1763,39 +4219,31 @@ def main():
         if args.daily_report:
             # 日报模式，先收集数据，再生成日报
             print("使用日报模式")
-            # 先收集所有RSS源的数据
-            for website, config in rss_config.items():
-                # 检查数据源是否启用
-                if datasources_config.get(website, 1) == 0:
-                    print(f"跳过禁用的数据源：{website}")
-                    continue
-                    
-                website_name = config.get("website_name")
-                rss_url = config.get("rss_url")
-                # 日报模式下不发送推送，send_push=False
-                check_for_updates(rss_url, website_name, cursor, conn, send_push=False)
+            PROFILER.start_cycle()
+            # 先收集所有RSS源的数据，日报模式下不发送推送，send_push=False
+            run_check_cycle(rss_config, datasources_config, send_push=False)
             # 收集完数据后生成日报
-            generate_daily_report(cursor)
+            generate_daily_report(report_cursor)
             # 生成日报RSS feed
-            generate_rss_feed(cursor, feed_type="daily")
+            generate_rss_feed(report_cursor, feed_type="daily")
+            # 更新静态站点搜索索引
+            if search_index_enabled:
+                generate_search_index(report_cursor)
+            PROFILER.end_cycle('daily_report')
         elif args.once:
             # 单次执行模式，适合GitHub Action
             print("使用单次执行模式")
-            for website, rss_item in rss_config.items():
-                # 检查数据源是否启用
-                if datasources_config.get(website, 1) == 0:
-                    print(f"跳过禁用的数据源：{website}")
-                    continue
-                    
-                website_name = rss_item.get("website_name")
-                rss_url = rss_item.get("rss_url")
-                check_for_updates(rss_url, website_name, cursor, conn)
+            PROFILER.start_cycle()
+            run_check_cycle(rss_config, datasources_config)
             
             # 检查是否需要生成日报
             if config.get('daily_report', {}).get('switch', 'ON') == 'ON':
-                generate_daily_report(cursor)
+                generate_daily_report(report_cursor)
                 # 生成日报RSS feed
-                generate_rss_feed(cursor, feed_type="daily")
+                generate_rss_feed(report_cursor, feed_type="daily")
+                # 更新静态站点搜索索引
+                if search_index_enabled:
+                    generate_search_index(report_cursor)
             
             # 检查是否需要生成周报（如果是周五，基于北京时间）
             # 获取当前UTC时间，转换为北京时间（UTC+8）
@@ -1803,11 +4251,14 @@ def main():
             now_bj = now_utc + timedelta(hours=8)
             if now_bj.weekday() == 4:  # 4表示周五
                 if config.get('weekly_report', {}).get('switch', 'ON') == 'ON':
-                    generate_weekly_report(cursor)
+                    generate_weekly_report(report_cursor)
                     # 生成周报RSS feed
-                    generate_rss_feed(cursor, feed_type="weekly")
+                    generate_rss_feed(report_cursor, feed_type="weekly")
+            PROFILER.end_cycle('once')
         else:
-            # 循环执行模式，适合本地运行
+            # 循环执行模式，适合本地运行；开启api_server时在后台同时提供查询API
+            if config['api_server']['switch'] == 'ON':
+                start_api_server(config['api_server']['host'], config['api_server']['port'], config['api_server']['cache_size'], background=True)
             while True:
                 try:
                     # 检查是否需要夜间休眠
@@ -1817,21 +4268,17 @@ def main():
                         time.sleep(sleep_hours * 3600)
                         continue
                     
-                    for website, rss_item in rss_config.items():
-                        # 检查数据源是否启用
-                        if datasources_config.get(website, 1) == 0:
-                            print(f"跳过禁用的数据源：{website}")
-                            continue
-                            
-                        website_name = rss_item.get("website_name")
-                        rss_url = rss_item.get("rss_url")
-                        check_for_updates(rss_url, website_name, cursor, conn)
+                    PROFILER.start_cycle()
+                    run_check_cycle(rss_config, datasources_config)
 
                     # 检查是否需要生成日报
                     if config.get('daily_report', {}).get('switch', 'ON') == 'ON':
-                        generate_daily_report(cursor)
+                        generate_daily_report(report_cursor)
                         # 生成日报RSS feed
-                        generate_rss_feed(cursor, feed_type="daily")
+                        generate_rss_feed(report_cursor, feed_type="daily")
+                        # 更新静态站点搜索索引
+                        if search_index_enabled:
+                            generate_search_index(report_cursor)
                     
                     # 检查是否需要生成周报（如果是周五，基于北京时间）
                     # 获取当前UTC时间，转换为北京时间（UTC+8）
@@ -1839,9 +4286,10 @@ def main():
                     now_bj = now_utc + timedelta(hours=8)
                     if now_bj.weekday() == 4:  # 4表示周五
                         if config.get('weekly_report', {}).get('switch', 'ON') == 'ON':
-                            generate_weekly_report(cursor)
+                            generate_weekly_report(report_cursor)
                             # 生成周报RSS feed
-                            generate_rss_feed(cursor, feed_type="weekly")
+                            generate_rss_feed(report_cursor, feed_type="weekly")
+                    PROFILER.end_cycle('cycle')
 
                     # 每二小时执行一次
                     time.sleep(10800)
@@ -1852,7 +4300,10 @@ def main():
     except Exception as e:
         print("主程序发生异常：", str(e))
     finally:
-        conn.close()
+        report_conn.close()
+        close_database(conn, checkpoint=True)
+        # 包含本次报告生成耗时的最终指标
+        write_metrics_textfile()
         print("监控程序已结束")
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+// 静态站点全文搜索：按需加载分片索引，无需服务端
+// 分词和分桶规则与 DarkWeb-Forums-Tracker.py 中的 tokenize_search_text / search_token_bucket 保持一致
+(function () {
+    var BASE = 'search/';
+    var CJK_RUN = /[぀-ヿ㐀-鿿가-힯]+|[^぀-ヿ㐀-鿿가-힯]+/g;
+    var CJK_CHAR = /[぀-ヿ㐀-鿿가-힯]/;
+    var MAX_RESULTS = 200;
+    var cache = {};
+    var manifest = null;
+
+    function tokenize(text) {
+        var tokens = [];
+        var words = text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+        words.forEach(function (word) {
+            (word.match(CJK_RUN) || []).forEach(function (run) {
+                if (CJK_CHAR.test(run[0])) {
+                    if (run.length === 1) {
+                        tokens.push(run);
+                    }
+                    for (var i = 0; i < run.length - 1; i++) {
+                        tokens.push(run.substr(i, 2));
+                    }
+                } else if (run.length >= 2) {
+                    tokens.push(run.substr(0, 32));
+                }
+            });
+        });
+        return tokens.filter(function (t, i) { return tokens.indexOf(t) === i; });
+    }
+
+    // FNV-1a 32位哈希（UTF-8字节）
+    function bucketOf(token, buckets) {
+        var bytes = new TextEncoder().encode(token);
+        var hash = 0x811c9dc5;
+        for (var i = 0; i < bytes.length; i++) {
+            hash ^= bytes[i];
+            hash = Math.imul(hash, 0x01000193) >>> 0;
+        }
+        return ('0' + (hash % buckets).toString(16)).slice(-2);
+    }
+
+    function load(path) {
+        if (!cache[path]) {
+            cache[path] = fetch(BASE + path).then(function (r) {
+                return r.ok ? r.json() : {};
+            }).catch(function () { return {}; });
+        }
+        return cache[path];
+    }
+
+    function intersect(lists) {
+        lists.sort(function (a, b) { return a.length - b.length; });
+        return lists[0].filter(function (x) {
+            return lists.every(function (list) { return list.indexOf(x) !== -1; });
+        });
+    }
+
+    function search(query) {
+        var tokens = tokenize(query);
+        if (!tokens.length) {
+            return Promise.resolve([]);
+        }
+        return load('manifest.json').then(function (m) {
+            manifest = m;
+            return Promise.all(tokens.map(function (token) {
+                return load('tokens/' + bucketOf(token, m.buckets) + '.json').then(function (bucket) {
+                    return bucket[token] || [];
+                });
+            }));
+        }).then(function (monthLists) {
+            var months = intersect(monthLists).sort().reverse();
+            return Promise.all(months.map(function (month) {
+                return load('months/' + month + '.json');
+            }));
+        }).then(function (shards) {
+            var results = [];
+            shards.forEach(function (shard) {
+                if (results.length >= MAX_RESULTS || !shard.items) {
+                    return;
+                }
+                var postings = tokens.map(function (token) { return shard.index[token] || []; });
+                intersect(postings).forEach(function (i) {
+                    if (results.length < MAX_RESULTS) {
+                        results.push(shard.items[i]);
+                    }
+                });
+            });
+            return results;
+        });
+    }
+
+    function render(results, query) {
+        var list = document.getElementById('search-results');
+        var status = document.getElementById('search-status');
+        list.innerHTML = '';
+        status.textContent = query ? '找到 ' + results.length + (results.length >= MAX_RESULTS ? '+' : '') + ' 条结果' : '';
+        results.forEach(function (item) {
+            var li = document.createElement('li');
+            li.className = 'search-result';
+            var a = document.createElement('a');
+            a.href = item[3];
+            a.target = '_blank';
+            a.rel = 'noopener noreferrer';
+            a.textContent = item[0];
+            var meta = document.createElement('div');
+            meta.className = 'search-meta';
+            meta.textContent = item[2] + ' · ' + (item[1] || '未知');
+            li.appendChild(a);
+            li.appendChild(meta);
+            list.appendChild(li);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var input = document.getElementById('search-input');
+        if (!input) {
+            return;
+        }
+        var timer = null;
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                var query = input.value.trim();
+                search(query).then(function (results) { render(results, query); });
+            }, 200);
+        });
+    });
+})();
@@ -0,0 +1,31 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# 主程序文件名包含连字符，不能直接import，按文件路径加载一次
+@pytest.fixture(scope='session')
+def tracker():
+    spec = importlib.util.spec_from_file_location('tracker', os.path.join(ROOT, 'DarkWeb-Forums-Tracker.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['tracker'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# 数据库、分段和增量文件都使用相对路径，每个测试在独立的临时目录中运行
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def db(tracker, workdir):
+    conn = tracker.init_database()
+    yield conn
+    conn.close()
@@ -0,0 +1,115 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+
+@pytest.fixture
+def api(tracker, db):
+    server = tracker.start_api_server('127.0.0.1', 0, cache_size=16, background=True)
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, etag=None):
+    request = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get('ETag'), json.loads(response.read() or 'null')
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        return e.code, e.headers.get('ETag'), json.loads(body) if body else None
+
+
+def add_item(db, title):
+    db.execute("INSERT INTO items (title, link, link_key, site_name) VALUES (?, ?, ?, 'test')",
+               (title, f'https://a.example/{title}', f'a.example/{title}'))
+    db.commit()
+
+
+def test_lru_cache_evicts_least_recently_used(tracker):
+    cache = tracker.LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_etag_not_modified_until_insert(api, db):
+    add_item(db, 'first')
+    status, etag, body = get(f'{api}/items')
+    assert status == 200 and [item['title'] for item in body['items']] == ['first']
+    assert get(f'{api}/items', etag)[0] == 304
+    assert get(f'{api}/items?limit=1', etag)[1] != etag
+    add_item(db, 'second')
+    status, new_etag, body = get(f'{api}/items', etag)
+    assert status == 200 and new_etag != etag
+    assert [item['title'] for item in body['items']] == ['second', 'first']
+
+
+def test_delete_invalidates_cache_and_etag(api, db):
+    add_item(db, 'first')
+    add_item(db, 'second')
+    status, etag, body = get(f'{api}/items')
+    assert body['count'] == 2
+    db.execute("DELETE FROM items WHERE title = 'second'")
+    db.commit()
+    status, new_etag, body = get(f'{api}/items', etag)
+    assert status == 200 and new_etag != etag
+    assert [item['title'] for item in body['items']] == ['first']
+
+
+def test_invalid_params_return_chinese_errors(api):
+    assert get(f'{api}/items?since=bad') == (400, None, {'error': '参数since应为YYYY-MM-DD格式'})
+    assert get(f'{api}/items?limit=x') == (400, None, {'error': '参数limit应为整数'})
+    assert get(f'{api}/unknown')[0] == 404
+
+
+def test_archive_changes_data_version(tracker, db):
+    db.execute("INSERT INTO items (title, link, link_key, site_name, timestamp) VALUES ('old', 'https://a.example/old', 'a.example/old', 'test', '2020-01-15 00:00:00')")
+    db.commit()
+    version = tracker.get_data_version(db.cursor())
+    assert tracker.archive_closed_months(db, 2)
+    assert tracker.get_data_version(db.cursor()) != version
+
+
+def test_stale_response_is_not_cached(tracker, workdir):
+    server = tracker.ApiServer(('127.0.0.1', 0), cache_size=16)
+    try:
+        assert server.get_cached('items', '1.0') is None
+        # 生成响应期间有新数据入库，其他请求线程已切换到新版本
+        assert server.get_cached('stats', '2.0') is None
+        server.put_cached('items', '1.0', b'old')
+        server.put_cached('stats', '2.0', b'new')
+        assert server.get_cached('stats', '2.0') == b'new'
+        assert server.cache.get(('items', '1.0')) is None
+    finally:
+        server.server_close()
+
+
+def test_concurrent_cache_access_keeps_single_version(tracker, workdir):
+    server = tracker.ApiServer(('127.0.0.1', 0), cache_size=64)
+
+    def worker(index):
+        for round_index in range(300):
+            version = f'{round_index % 3}.0'
+            key = f'key{(index + round_index) % 8}'
+            if server.get_cached(key, version) is None:
+                server.put_cached(key, version, b'body')
+
+    try:
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert {version for _, version in server.cache._items} <= {server._version}
+    finally:
+        server.server_close()
@@ -0,0 +1,57 @@
+import pytest
+
+
+@pytest.mark.parametrize('url, engine, expected', [
+    # XenForo：标题、分页、楼层链接都指向同一主题
+    ('https://xss.is/threads/acme-dump.12345/', 'xenforo', 'xss.is/xenforo:12345'),
+    ('https://www.XSS.is/threads/acme-dump.12345/page-2', 'xenforo', 'xss.is/xenforo:12345'),
+    ('http://xss.is/threads/12345/post-678', 'xenforo', 'xss.is/xenforo:12345'),
+    # MyBB：tid参数、SEO链接和Google SEO永久链接
+    ('https://forum.example/showthread.php?tid=123&pid=456#pid456', 'mybb', 'forum.example/mybb:123'),
+    ('https://forum.example/showthread.php?pid=456&tid=123', 'mybb', 'forum.example/mybb:123'),
+    ('https://forum.example/thread-123-post-456.html', 'mybb', 'forum.example/mybb:123'),
+    ('https://forum.example/thread-123-page-2.html', 'mybb', 'forum.example/mybb:123'),
+    ('https://forum.example/Thread-Acme-Database-Leak?pid=9#pid9', 'mybb', 'forum.example/mybb:Thread-Acme-Database-Leak'),
+    ('https://forum.example/Thread-Acme-Database-Leak', None, 'forum.example/mybb:Thread-Acme-Database-Leak'),
+    # IPB
+    ('https://board.example/topic/4567-acme-leak/page/2/', 'ipb', 'board.example/ipb:4567'),
+    ('https://board.example/index.php?showtopic=4567&st=20', 'ipb', 'board.example/ipb:4567'),
+    # 无法识别帖子ID时按通用规则规范化
+    ('HTTPS://Example.com:443//a//b/?utm_source=x&b=2&a=1&page=3#top', None, 'example.com/a/b?a=1&b=2'),
+    ('http://example.com:8080/a', None, 'example.com:8080/a'),
+    ('', None, '/'),
+])
+def test_canonicalize_url(tracker, url, engine, expected):
+    assert tracker.canonicalize_url(url, engine) == expected
+
+
+def test_mybb_permalinks_of_different_threads_stay_distinct(tracker):
+    first = tracker.canonicalize_url('https://forum.example/Thread-Acme-Leak?pid=1', 'mybb')
+    second = tracker.canonicalize_url('https://forum.example/Thread-Acme-Leak-Part-2?pid=1', 'mybb')
+    assert first != second
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://xss.is/forums/-/index.rss', 'xenforo'),
+    ('https://forum.example/syndication.php?fid=2', 'mybb'),
+    ('https://forum.example/Thread-Acme-Leak', 'mybb'),
+    ('https://board.example/rss/1-latest.xml/', 'ipb'),
+    ('https://example.com/feed.xml', None),
+])
+def test_detect_forum_engine(tracker, url, expected):
+    assert tracker.detect_forum_engine(url) == expected
+
+
+def test_backfill_link_keys_keeps_earliest_and_logs_removed(tracker, db, capsys):
+    cursor = db.cursor()
+    links = ['https://forum.example/Thread-Acme-Leak?pid=1',
+             'https://forum.example/Thread-Acme-Leak?pid=2',
+             'https://forum.example/Thread-Other?pid=3']
+    cursor.executemany("INSERT INTO items (title, link, site_name) VALUES ('t', ?, 'test')", [(link,) for link in links])
+    db.commit()
+    capsys.readouterr()
+    tracker.backfill_link_keys(cursor)
+    cursor.execute("SELECT id, link_key FROM items ORDER BY id")
+    assert cursor.fetchall() == [(1, 'forum.example/mybb:Thread-Acme-Leak'), (3, 'forum.example/mybb:Thread-Other')]
+    output = capsys.readouterr().out
+    assert 'id=2' in output and '删除重复数据 1 条（id: 2）' in output
@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+def make_record(index):
+    return {'title': f'leak {index}', 'link': f'http://example.onion/{index}', 'link_key': f'k{index}', 'site_name': 's',
+            'pub_date': '', 'pub_ts': None, 'author': '', 'category': '',
+            'content': 'body', 'text_content': 'body', 'download_links': ''}
+
+
+# 队列空闲时写入线程立即提交，不等满flush_interval
+def test_idle_queue_commits_immediately(tracker, db):
+    writer = tracker.DatabaseWriter(batch_size=500, flush_interval=5)
+    try:
+        start_time = time.monotonic()
+        assert writer.submit(make_record(0)).result(timeout=2)['is_new']
+        assert time.monotonic() - start_time < 1
+    finally:
+        writer.close()
+    assert db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+
+
+# 写入线程忙碌时积压在队列中的数据仍合并在同一个事务中写入
+def test_backlog_is_written_in_one_batch(tracker, db):
+    class DeferredWriter(tracker.DatabaseWriter):
+        batches = []
+
+        def start(self):
+            pass
+
+        def _write_batch(self, conn, cursor, batch):
+            self.batches.append(len(batch))
+            super()._write_batch(conn, cursor, batch)
+
+    writer = DeferredWriter(batch_size=4, flush_interval=5)
+    futures = [writer.submit(make_record(index)) for index in range(10)]
+    threading.Thread.start(writer)
+    writer.close()
+    assert all(future.result()['is_new'] for future in futures)
+    assert writer.batches == [4, 4, 2]
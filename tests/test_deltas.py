@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import shutil
+
+
+def add_item(tracker, conn, index, timestamp):
+    cursor = conn.cursor()
+    title = f'Acme 招商银行 database leak part {index}'
+    link = f'https://xss.is/threads/leak.{index}/'
+    cursor.execute("INSERT INTO items (title, link, link_key, site_name, timestamp) VALUES (?, ?, ?, 'xss', ?)",
+                   (title, link, tracker.canonicalize_url(link), timestamp))
+    item_id = cursor.lastrowid
+    content = f'<p>客户数据 {index}</p>'
+    tracker.save_item_content(cursor, item_id, content, f'https://mega.nz/{index}')
+    tracker.index_item_text(cursor, item_id, title, tracker.html_to_text(content), f'https://mega.nz/{index}')
+    tracker.assign_item_cluster(cursor, item_id, title, tracker.html_to_text(content), timestamp)
+    conn.commit()
+    return item_id
+
+
+def snapshot(conn):
+    return conn.execute(f"""
+        SELECT {', '.join('items.' + column for column in ['id', 'title', 'link', 'link_key', 'site_name', 'timestamp', 'simhash', 'cluster_id'])},
+               item_content.content, item_content.download_links
+        FROM items LEFT JOIN item_content ON item_content.item_id = items.id ORDER BY items.id
+    """).fetchall()
+
+
+def test_export_is_incremental_and_deterministic(tracker, db, monkeypatch):
+    monkeypatch.setattr(tracker, 'DELTA_MAX_ROWS', 2)
+    now = tracker.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    for index in range(3):
+        add_item(tracker, db, index, now)
+    files = tracker.export_delta(db.cursor())
+    assert [os.path.basename(path) for path in files] == ['items_0000000001-0000000002.ndjson.gz',
+                                                         'items_0000000003-0000000003.ndjson.gz']
+    assert tracker.export_delta(db.cursor()) == []
+    with gzip.open(files[0], 'rt', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record['id'] for record in records] == [1, 2]
+    assert records[0]['content'] == '<p>客户数据 0</p>'
+    # 相同数据重新导出的文件逐字节相同
+    first_bytes = open(files[0], 'rb').read()
+    shutil.rmtree(tracker.DELTA_DIR)
+    assert open(tracker.export_delta(db.cursor())[0], 'rb').read() == first_bytes
+
+    add_item(tracker, db, 3, now)
+    assert [os.path.basename(path) for path in tracker.export_delta(db.cursor())] == ['items_0000000004-0000000004.ndjson.gz']
+
+
+def test_import_rebuilds_database(tracker, db, workdir):
+    now = tracker.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    for index in range(3):
+        add_item(tracker, db, index, now)
+    tracker.export_delta(db.cursor())
+    expected = snapshot(db)
+    db.close()
+    os.rename(tracker.DATABASE_FILE, 'original.db')
+
+    conn = tracker.init_database()
+    try:
+        assert tracker.import_deltas(conn) == 3
+        assert snapshot(conn) == expected
+        assert sorted(row[1] for row in tracker.search_items(conn.cursor(), '招商银行')) == \
+            [f'https://xss.is/threads/leak.{index}/' for index in range(3)]
+        # SimHash分段一起重建，之后入库的转发仍能被识别
+        assert conn.execute("SELECT COUNT(*) FROM simhash_bands").fetchone()[0] == 3 * tracker.SIMHASH_BANDS
+        # 重复导入不会新增数据
+        assert tracker.import_deltas(conn) == 0
+        assert snapshot(conn) == expected
+    finally:
+        conn.close()
+
+
+def test_import_skips_archived_links(tracker, db):
+    now = tracker.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    add_item(tracker, db, 0, now)
+    add_item(tracker, db, 1, now)
+    tracker.export_delta(db.cursor())
+    db.execute("DELETE FROM items")
+    db.execute("DELETE FROM sqlite_sequence WHERE name = 'items'")
+    db.execute("INSERT INTO archived_links (link_key, month) VALUES (?, '2025-01')",
+               (tracker.canonicalize_url('https://xss.is/threads/leak.0/'),))
+    db.commit()
+    assert tracker.import_deltas(db) == 1
+    assert [row[0] for row in db.execute("SELECT id FROM items")] == [2]
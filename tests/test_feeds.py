@@ -0,0 +1,33 @@
+def feed(url, name, **extra):
+    return dict(rss_url=url, website_name=name, **extra)
+
+
+def test_plan_feed_fetches_merges_same_feed(tracker, capsys):
+    rss_config = {
+        'a': feed('https://XSS.is/forums/-/index.rss', 'A'),
+        'b': feed('https://xss.is/forums/-/index.rss/', 'B'),
+    }
+    plans = tracker.plan_feed_fetches(rss_config, {})
+    assert plans == [('https://XSS.is/forums/-/index.rss', 'A', 'xenforo')]
+    output = capsys.readouterr().out
+    assert 'b（B）' in output and '归属于 A' in output
+
+
+def test_plan_feed_fetches_keeps_feeds_differing_in_query(tracker):
+    # page/order等参数对帖子链接无意义，但对feed地址是不同的订阅
+    rss_config = {
+        'a': feed('https://forum.example/syndication.php?fid=2&order=desc', 'A'),
+        'b': feed('https://forum.example/syndication.php?fid=2&order=asc', 'B'),
+        'c': feed('https://forum.example/syndication.php?fid=2&page=2', 'C'),
+        'd': feed('https://board.example/topic/1-news/?view=rss', 'D', engine='ipb'),
+        'e': feed('https://board.example/topic/1-news/?view=atom', 'E', engine='ipb'),
+    }
+    assert [plan[1] for plan in tracker.plan_feed_fetches(rss_config, {})] == ['A', 'B', 'C', 'D', 'E']
+
+
+def test_plan_feed_fetches_skips_disabled_and_invalid_engine(tracker):
+    rss_config = {
+        'a': feed('https://a.example/feed', 'A'),
+        'b': feed('https://b.example/feed', 'B', engine='unknown'),
+    }
+    assert tracker.plan_feed_fetches(rss_config, {'a': 0}) == [('https://b.example/feed', 'B', 'generic')]
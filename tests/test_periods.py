@@ -0,0 +1,40 @@
+import pytest
+
+
+def test_beijing_day_start_utc(tracker):
+    assert tracker.beijing_day_start_utc('2026-01-05') == '2026-01-04 16:00:00'
+    assert tracker.beijing_day_start_utc('2026-03-01') == '2026-02-28 16:00:00'
+
+
+def test_period_where_is_half_open(tracker):
+    assert tracker.get_period_where('2026-01-05', '2026-01-05') == \
+        ('timestamp >= ? AND timestamp < ?', ('2026-01-04 16:00:00', '2026-01-05 16:00:00'))
+
+
+@pytest.mark.parametrize('period_type, ref_date, end_date, expected', [
+    ('daily', '2026-01-05', None, ('2026-01-05', '2026-01-05', '2026-01-05')),
+    ('weekly', '2026-01-11', None, ('2026-01-05', '2026-01-11', '2026-01-05_2026-01-11')),
+    ('weekly', '2026-01-05', None, ('2026-01-05', '2026-01-11', '2026-01-05_2026-01-11')),
+    ('monthly', '2028-02', None, ('2028-02-01', '2028-02-29', '2028-02')),
+    ('monthly', '2026-12-15', None, ('2026-12-01', '2026-12-31', '2026-12')),
+    ('range', '2026-01-10', '2026-01-01', ('2026-01-01', '2026-01-10', '2026-01-01_2026-01-10')),
+])
+def test_get_period_range(tracker, period_type, ref_date, end_date, expected):
+    period = tracker.get_period_range(period_type, ref_date, end_date)
+    assert (period['start_date'], period['end_date'], period['label']) == expected
+
+
+def test_unknown_period_type(tracker):
+    with pytest.raises(ValueError):
+        tracker.get_period_range('yearly')
+
+
+def test_rollup_counts_by_beijing_day(tracker, db):
+    # UTC 15:59 仍是北京时间1月4日，UTC 16:00 已是北京时间1月5日
+    for timestamp in ('2026-01-04 15:59:59', '2026-01-04 16:00:00', '2026-01-05 15:59:59'):
+        db.execute("INSERT INTO items (title, link, link_key, site_name, timestamp) VALUES ('t', ?, ?, 's', ?)",
+                   (timestamp, timestamp, timestamp))
+    db.commit()
+    assert db.execute("SELECT day, count FROM item_rollup ORDER BY day").fetchall() == [('2026-01-04', 1), ('2026-01-05', 2)]
+    where, params = tracker.get_period_where('2026-01-05', '2026-01-05')
+    assert db.execute(f"SELECT COUNT(*) FROM items WHERE {where}", params).fetchone()[0] == 2
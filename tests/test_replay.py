@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+
+def write_feed(path, entries):
+    items = ''.join(f'''
+        <item>
+            <title>{title}</title>
+            <link>{link}</link>
+            <pubDate>{published.strftime('%a, %d %b %Y %H:%M:%S +0000')}</pubDate>
+            <description>&lt;p&gt;{body}&lt;/p&gt;</description>
+        </item>''' for title, link, published, body in entries)
+    path.write_text(f'<?xml version="1.0"?><rss version="2.0"><channel><title>x</title>{items}</channel></rss>', encoding='utf-8')
+    return str(path)
+
+
+def test_replay_goes_through_normal_ingest(tracker, db, workdir, monkeypatch):
+    monkeypatch.setenv('WATCHLIST_SWITCH', 'ON')
+    (workdir / 'watchlist.txt').write_text('acme\n', encoding='utf-8')
+    published = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    title = 'Acme Corp customer database 2026 full dump 1.2M rows'
+    body = 'Full customer table with emails, phones and hashed passwords'
+    path = write_feed(workdir / 'feed.xml', [
+        (title, 'https://xss.is/threads/acme.1/', published, body),
+        (title, 'https://other.example/threads/acme-mirror.2/', published, body),
+        (title, 'https://xss.is/threads/acme.1/page-2', published, body),
+    ])
+    tracker.replay_feed_archives([path], 'xss', engine='xenforo', workers=1)
+
+    rows = db.execute("SELECT id, link_key, site_name, timestamp, simhash, cluster_id FROM items ORDER BY id").fetchall()
+    assert [row[1] for row in rows] == ['xss.is/xenforo:1', 'other.example/xenforo:2']
+    assert all(row[2] == 'xss' and row[3] == published.strftime('%Y-%m-%d %H:%M:%S') for row in rows)
+    # 与正常采集一样计算指纹、归入转发聚类并记录关注列表命中
+    assert rows[0][4] is not None and [row[5] for row in rows] == [rows[0][0], rows[0][0]]
+    assert db.execute("SELECT item_id, keyword FROM watchlist_hits ORDER BY item_id").fetchall() == [(rows[0][0], 'acme'), (rows[1][0], 'acme')]
+    assert len(tracker.search_items(db.cursor(), 'customer')) == 2
+
+    # 重复回放不会新增数据
+    tracker.replay_feed_archives([path], 'xss', engine='xenforo', workers=1)
+    assert db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
@@ -0,0 +1,24 @@
+import os
+import shutil
+
+from conftest import ROOT
+
+
+# 报告页面和首页的样式都应来自static目录下的共享样式表，而不是逐个元素的内联style属性
+def test_generated_pages_have_no_inline_styles(tracker, db):
+    shutil.copy(os.path.join(ROOT, 'template.html'), 'template.html')
+    shutil.copytree(os.path.join(ROOT, 'static'), 'static')
+    for index in range(3):
+        db.execute("INSERT INTO items (title, link, link_key, site_name, timestamp) VALUES (?, ?, ?, 's', '2026-01-05 02:00:00')",
+                   (f'leak {index}', f'http://example.onion/{index}', f'k{index}'))
+    db.commit()
+
+    tracker.generate_daily_report(db.cursor(), force=True, report_date='2026-01-05', send_push=False)
+
+    with open('archive/2026-01-05/Daily_2026-01-05.html', encoding='utf-8') as f:
+        report_html = f.read()
+    with open('index.html', encoding='utf-8') as f:
+        index_html = f.read()
+    assert 'leak 0' in report_html
+    assert 'style=' not in report_html
+    assert 'style=' not in index_html
@@ -0,0 +1,62 @@
+import pytest
+
+
+def add_item(tracker, conn, title, content, link):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO items (title, link, link_key, site_name) VALUES (?, ?, ?, 'test')",
+                   (title, link, tracker.canonicalize_url(link)))
+    item_id = cursor.lastrowid
+    tracker.save_item_content(cursor, item_id, content, '')
+    tracker.index_item_text(cursor, item_id, title, tracker.html_to_text(content), '')
+    conn.commit()
+    return item_id
+
+
+@pytest.mark.parametrize('query', ['招商银行', '银行', '客户数据', '"银行客户"', '招商*', 'acme 银行'])
+def test_search_matches_cjk_inside_running_text(tracker, db, query):
+    add_item(tracker, db, '招商银行数据泄露 acme dump', '<p>出售招商银行客户数据，共100万条</p>', 'https://a.example/t/1')
+    results = tracker.search_items(db.cursor(), query)
+    assert [row[0] for row in results] == ['招商银行数据泄露 acme dump']
+
+
+def test_search_does_not_match_unrelated_cjk(tracker, db):
+    add_item(tracker, db, '招商银行数据泄露', '<p>客户数据</p>', 'https://a.example/t/1')
+    assert tracker.search_items(db.cursor(), '工商银行') == []
+    assert tracker.search_items(db.cursor(), '招商银行 NOT 客户') == []
+
+
+def test_snippet_restores_original_text(tracker, db):
+    add_item(tracker, db, '标题', '<p>出售招商银行客户数据，共100万条</p>', 'https://a.example/t/1')
+    snippet = tracker.search_items(db.cursor(), '银行客户')[0][4]
+    assert snippet == '出售招商[银行客户]数据，共100万条'
+
+
+def test_sqlite_and_static_index_tokenize_alike(tracker):
+    # 二元组与静态站点搜索索引的切分一致
+    assert tracker.cjk_bigrams('招商银行') == tracker.tokenize_search_text('招商银行')
+
+
+def test_placeholders_are_not_searchable(tracker, db):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO items (title, link, link_key) VALUES ('acme dump', 'https://a.example/1', 'a.example/1')")
+    tracker.save_item_content(cursor, cursor.lastrowid, tracker.NO_CONTENT, tracker.NO_DOWNLOAD_LINKS)
+    tracker.index_item_text(cursor, cursor.lastrowid, 'acme dump', tracker.NO_CONTENT, tracker.NO_DOWNLOAD_LINKS)
+    add_item(tracker, db, '论坛账号', '<p>登录后台的管理员账号</p>', 'https://a.example/2')
+    for query in ('登录', '注册', '下载链接'):
+        assert [row[0] for row in tracker.search_items(db.cursor(), query)] == (['论坛账号'] if query == '登录' else [])
+    assert tracker.search_items(db.cursor(), 'acme')[0][4] == ''
+
+
+def test_upgrade_reindexes_placeholder_rows(tracker, db):
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO items (title, link, link_key) VALUES ('acme dump', 'https://a.example/1', 'a.example/1')")
+    tracker.save_item_content(cursor, cursor.lastrowid, tracker.NO_CONTENT, tracker.NO_DOWNLOAD_LINKS)
+    # 旧版本写入的检索文本包含占位提示
+    cursor.execute("INSERT INTO items_fts (rowid, title, body) VALUES (?, 'acme dump', ?)",
+                   (cursor.lastrowid, tracker.fts_index_text(f'{tracker.NO_CONTENT} {tracker.NO_DOWNLOAD_LINKS}')))
+    cursor.execute("UPDATE report_state SET last_item_id = 1 WHERE period = 'migration:fts_index'")
+    db.commit()
+    assert len(tracker.search_items(cursor, '登录')) == 1
+    tracker.init_database().close()
+    assert tracker.search_items(cursor, '登录') == []
+    assert len(tracker.search_items(cursor, 'acme')) == 1
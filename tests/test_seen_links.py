@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+def test_seen_link_filter(tracker, db):
+    cursor = db.cursor()
+    cursor.executemany("INSERT INTO items (title, link, link_key) VALUES ('t', ?, ?)",
+                       [(f'https://a.example/t/{i}', f'a.example/t/{i}') for i in range(100)])
+    cursor.execute("INSERT INTO archived_links (link_key, month) VALUES ('a.example/old', '2025-01')")
+    db.commit()
+    seen = tracker.SeenLinkFilter.load(db)
+    assert len(seen) == 101
+    assert 'a.example/t/5' in seen and 'a.example/old' in seen
+    assert 'a.example/t/100' not in seen
+    seen.add('a.example/t/100')
+    assert 'a.example/t/100' in seen
+
+
+def test_get_seen_link_filter_loads_once_across_threads(tracker, db, monkeypatch):
+    loads = []
+    original_load = tracker.SeenLinkFilter.load
+
+    def counting_load(conn):
+        loads.append(threading.get_ident())
+        # 模拟大库加载耗时，让其他线程在加载完成前进入
+        time.sleep(0.05)
+        return original_load(conn)
+
+    monkeypatch.setattr(tracker.SeenLinkFilter, 'load', staticmethod(counting_load))
+    monkeypatch.setattr(tracker, '_seen_link_filter', None)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(tracker.get_seen_link_filter())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,77 @@
+def test_band_values_cover_all_bits(tracker):
+    simhash = 0x0123456789ABCDEF
+    values = tracker.simhash_band_values(simhash)
+    assert len(values) == tracker.SIMHASH_BANDS
+    assert sum(value << (tracker.SIMHASH_BAND_BITS * band) for band, value in enumerate(values)) == simhash
+
+
+def test_signed_conversion_round_trip(tracker):
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << 64) - 1):
+        signed = tracker._to_signed64(value)
+        assert -(1 << 63) <= signed < 1 << 63
+        assert tracker._to_unsigned64(signed) == value
+
+
+def test_short_title_has_no_fingerprint(tracker):
+    assert tracker.compute_simhash('leak') is None
+
+
+def insert(db, title, timestamp):
+    cursor = db.execute("INSERT INTO items (title, link, link_key, timestamp) VALUES (?, ?, ?, ?)",
+                        (title, f'https://a.example/{title}', f'a.example/{title}', timestamp))
+    return cursor.lastrowid
+
+
+def test_find_near_duplicate_by_band_lookup(tracker, db):
+    cursor = db.cursor()
+    now = tracker.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    title = 'Acme Corp customer database 2026 full dump 1.2M rows'
+    original = insert(db, title, now)
+    assert tracker.assign_item_cluster(cursor, original, title, '', now) == (original, False)
+
+    repost = insert(db, title + ' repost', now)
+    assert tracker.assign_item_cluster(cursor, repost, title + '!', '', now) == (original, True)
+
+    other_title = 'Globex internal emails and VPN credentials'
+    other = insert(db, other_title, now)
+    assert tracker.assign_item_cluster(cursor, other, other_title, '', now) == (other, False)
+
+
+def test_near_duplicate_window(tracker, db):
+    cursor = db.cursor()
+    old = (tracker.datetime.utcnow() - tracker.timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    title = 'Acme Corp customer database 2026 full dump 1.2M rows'
+    item_id = insert(db, title, old)
+    tracker.assign_item_cluster(cursor, item_id, title, '', old, window_days=45)
+    simhash = tracker.compute_simhash(title)
+    assert tracker.find_near_duplicate(cursor, simhash, window_days=21) is None
+    assert tracker.find_near_duplicate(cursor, simhash, window_days=45) == item_id
+    # 海明距离超过阈值时不匹配
+    assert tracker.find_near_duplicate(cursor, simhash ^ 0xFF, window_days=45, max_distance=7) is None
+    assert tracker.find_near_duplicate(cursor, simhash ^ 0x7F, window_days=45, max_distance=7) == item_id
+
+
+def test_bands_outside_window_are_not_kept(tracker, db):
+    cursor = db.cursor()
+    now = tracker.datetime.utcnow()
+    title = 'Acme Corp customer database 2026 full dump 1.2M rows'
+    # 入库时已在窗口之外的数据不保存分段，也不会被匹配
+    old = (now - tracker.timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    old_id = insert(db, title, old)
+    assert tracker.assign_item_cluster(cursor, old_id, title, '', old) == (old_id, False)
+    assert cursor.execute("SELECT COUNT(*) FROM simhash_bands WHERE item_id = ?", (old_id,)).fetchone()[0] == 0
+    # 入库后过期的分段在下一轮检查开始时清理
+    recent = (now - tracker.timedelta(days=20)).strftime('%Y-%m-%d %H:%M:%S')
+    recent_id = insert(db, title + ' again', recent)
+    assert tracker.assign_item_cluster(cursor, recent_id, title, '', recent) == (recent_id, False)
+    cursor.execute("UPDATE simhash_bands SET timestamp = ?", (old,))
+    db.commit()
+    tracker.DatabaseWriter().close()
+    assert cursor.execute("SELECT COUNT(*) FROM simhash_bands").fetchone()[0] == 0
+    assert tracker.find_near_duplicate(cursor, tracker.compute_simhash(title)) is None
+
+
+def test_band_lookup_uses_index(tracker, db):
+    plan = db.execute("""EXPLAIN QUERY PLAN SELECT item_id, simhash FROM simhash_bands
+                         WHERE band = 0 AND value = 1 AND timestamp >= '2026-01-01'""").fetchall()
+    assert 'idx_simhash_bands_lookup' in plan[0][3]
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.mark.parametrize('keywords, text, expected', [
+    (['招商银行'], '招商银行客户数据泄露', ['招商银行']),
+    (['招商银行'], '出售招商银行数据', ['招商银行']),
+    (['招商银行'], 'Leak: 招商银行, 100k rows', ['招商银行']),
+    (['acme'], 'acme招商数据', ['acme']),
+    (['acme'], 'ACME Corp database', ['acme']),
+    (['acme'], 'acmecorp database', []),
+    (['acme'], 'bigacme database', []),
+    (['acme.com'], 'dump of acme.com users', ['acme.com']),
+    (['acme.com'], 'dump of notacme.com users', []),
+    (['v1'], 'v10 release', []),
+    (['he', 'she', 'hers'], 'she sells hers', ['she', 'hers']),
+])
+def test_find_whole_word(tracker, keywords, text, expected):
+    assert tracker.AhoCorasick(keywords).find(text) == expected
+
+
+def test_find_substring_when_whole_word_disabled(tracker):
+    assert tracker.AhoCorasick(['acme']).find('bigacme', whole_word=False) == ['acme']
+
+
+def test_find_overlapping_and_duplicate_keywords(tracker):
+    matcher = tracker.AhoCorasick(['招商', '招商银行', '银行', ' 招商 '])
+    assert matcher.find('招商银行，招商银行') == ['招商', '招商银行', '银行']
+
+
+def test_empty_inputs(tracker):
+    assert tracker.AhoCorasick([]).find('anything') == []
+    assert tracker.AhoCorasick(['acme']).find(None) == []